@@ -3,14 +3,14 @@
 Script to explore Galaxy history and find collection #402
 """
 
-from bioblend.galaxy import GalaxyInstance
+from galaxy_utils.instrumentation import galaxy_instance
 
 # Galaxy credentials from script.md
 GALAXY_URL = "https://usegalaxy.org"
 API_KEY = "YOUR_GALAXY_API_KEY"
 
 # Connect to Galaxy instance
-gi = GalaxyInstance(url=GALAXY_URL, key=API_KEY)
+gi = galaxy_instance(GALAXY_URL, API_KEY)
 
 # Get the history ID from the URL
 # URL format: https://usegalaxy.org/u/cartman/h/prjna904261
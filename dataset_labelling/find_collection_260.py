@@ -3,7 +3,7 @@
 Script to locate and inspect collection #260
 """
 
-from bioblend.galaxy import GalaxyInstance
+from galaxy_utils.instrumentation import galaxy_instance
 
 # Galaxy credentials
 GALAXY_URL = "https://usegalaxy.org"
@@ -11,7 +11,7 @@ API_KEY = "YOUR_GALAXY_API_KEY"
 HISTORY_ID = "bbd44e69cb8906b5713a37cc4e6846ea"
 
 # Connect to Galaxy instance
-gi = GalaxyInstance(url=GALAXY_URL, key=API_KEY)
+gi = galaxy_instance(GALAXY_URL, API_KEY)
 
 print("Fetching history contents to find collection #260...")
 history_contents = gi.histories.show_history(history_id=HISTORY_ID, contents=True)
@@ -3,7 +3,7 @@
 Script to inspect collection #402 and its elements
 """
 
-from bioblend.galaxy import GalaxyInstance
+from galaxy_utils.instrumentation import galaxy_instance
 
 # Galaxy credentials from script.md
 GALAXY_URL = "https://usegalaxy.org"
@@ -14,7 +14,7 @@ HISTORY_ID = "bbd44e69cb8906b5713a37cc4e6846ea"
 COLLECTION_ID = "92456119b5c0275e"
 
 # Connect to Galaxy instance
-gi = GalaxyInstance(url=GALAXY_URL, key=API_KEY)
+gi = galaxy_instance(GALAXY_URL, API_KEY)
 
 print("Fetching collection #402 details...")
 # The correct method is show_dataset_collection with dataset_collection_id
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Batched tag application for collection elements based on labels.tsv.
+
+One show_dataset_collection call provides every element's current tags; the
+diff against labels.tsv decides which datasets need an update, only those are
+sent (in parallel, rate limited), and each update is verified from the tags in
+its own response instead of a second full collection fetch.
+"""
+
+import csv
+import threading
+import time
+
+from galaxy_utils.fetch import MAX_CONCURRENCY, call_with_backoff, fetch_concurrently
+
+# Upper bound on update requests started per second
+MAX_REQUESTS_PER_SECOND = 5.0
+
+
+class RateLimiter:
+    """Spaces out request starts across threads to at most per_second"""
+
+    def __init__(self, per_second):
+        self.interval = 1.0 / per_second
+        self.lock = threading.Lock()
+        self.next_slot = 0.0
+
+    def wait(self):
+        with self.lock:
+            now = time.monotonic()
+            slot = max(now, self.next_slot)
+            self.next_slot = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+def read_labels(labels_file):
+    """Read element identifier -> expected tag from a two-column TSV"""
+    label_mapping = {}
+    with open(labels_file, 'r') as f:
+        reader = csv.reader(f, delimiter='\t')
+        for row in reader:
+            if len(row) >= 2:
+                label_mapping[row[0]] = row[1]
+    return label_mapping
+
+
+def conflicting_tags(tags, expected_tag):
+    """Tags with the same name as expected_tag (e.g. another group:) but a different value"""
+    if ':' not in expected_tag:
+        return []
+    prefix = expected_tag.split(':', 1)[0] + ':'
+    return [tag for tag in tags if tag.startswith(prefix) and tag != expected_tag]
+
+
+def compute_tag_diff(elements, label_mapping):
+    """
+    Compare current element tags with labels.tsv.
+
+    Returns (updates, skipped, unlabeled): updates is a list of
+    (identifier, dataset_id, expected_tag, new_tags, removed_tags) for
+    elements missing their tag or carrying a conflicting one (another
+    group: value, which would put the dataset in two DESeq2 levels; it is
+    removed in new_tags); skipped lists identifiers that already have
+    exactly their tag; unlabeled lists identifiers with no entry in
+    labels.tsv.
+    """
+    updates = []
+    skipped = []
+    unlabeled = []
+
+    for element in elements:
+        identifier = element['element_identifier']
+        dataset = element['object']
+        current_tags = dataset.get('tags', [])
+        expected_tag = label_mapping.get(identifier)
+
+        if expected_tag is None:
+            unlabeled.append(identifier)
+            continue
+        removed = conflicting_tags(current_tags, expected_tag)
+        if expected_tag in current_tags and not removed:
+            skipped.append(identifier)
+            continue
+        new_tags = [tag for tag in current_tags if tag not in removed]
+        if expected_tag not in new_tags:
+            new_tags.append(expected_tag)
+        updates.append((identifier, dataset['id'], expected_tag, new_tags, removed))
+
+    return updates, skipped, unlabeled
+
+
+def apply_tag_updates(gi, history_id, updates, max_workers=MAX_CONCURRENCY,
+                      requests_per_second=MAX_REQUESTS_PER_SECOND):
+    """
+    Send the needed updates in parallel and verify each from its response.
+
+    Returns a dict of identifier -> error message for failed updates.
+    """
+    limiter = RateLimiter(requests_per_second)
+    by_identifier = {identifier: (dataset_id, expected_tag, new_tags)
+                     for identifier, dataset_id, expected_tag, new_tags, _ in updates}
+
+    def update_one(identifier):
+        dataset_id, expected_tag, new_tags = by_identifier[identifier]
+        limiter.wait()
+        response = gi.histories.update_dataset(history_id, dataset_id, tags=new_tags)
+        tags = response.get('tags') if isinstance(response, dict) else None
+        if tags is None:
+            # Older servers do not echo tags; check just this dataset
+            limiter.wait()
+            tags = gi.datasets.show_dataset(dataset_id).get('tags', [])
+        if expected_tag not in tags:
+            raise RuntimeError(f"tag '{expected_tag}' missing after update (has {tags})")
+        if conflicting_tags(tags, expected_tag):
+            raise RuntimeError(f"conflicting tags {conflicting_tags(tags, expected_tag)} left after update")
+        return tags
+
+    results = fetch_concurrently(update_one, list(by_identifier), max_workers=max_workers)
+    return {identifier: str(result) for identifier, result in results.items()
+            if isinstance(result, Exception)}
+
+
+def sync_collection_tags(gi, history_id, collection_id, label_mapping, dry_run=False,
+                         max_workers=MAX_CONCURRENCY, requests_per_second=MAX_REQUESTS_PER_SECOND):
+    """Apply labels.tsv tags to a collection and print an apply/skip/fail summary"""
+    collection_details = call_with_backoff(
+        gi.histories.show_dataset_collection, history_id, collection_id
+    )
+    elements = collection_details['elements']
+    updates, skipped, unlabeled = compute_tag_diff(elements, label_mapping)
+
+    print(f"\nCollection has {len(elements)} elements")
+    for identifier, dataset_id, expected_tag, new_tags, removed in updates:
+        if removed:
+            action = f"replace {', '.join(repr(tag) for tag in removed)} with '{expected_tag}'"
+        else:
+            action = f"add '{expected_tag}'"
+        print(f"  + {identifier}: {action} (dataset {dataset_id})")
+    for identifier in unlabeled:
+        print(f"  ? {identifier}: No label specified in labels.tsv")
+
+    failed = {}
+    if updates and not dry_run:
+        print(f"\nApplying {len(updates)} tag updates...")
+        failed = apply_tag_updates(gi, history_id, updates, max_workers, requests_per_second)
+        for identifier, error in failed.items():
+            print(f"  ✗ {identifier}: {error}")
+
+    applied = len(updates) - len(failed)
+    print("\n" + "="*60)
+    if dry_run:
+        print("DRY RUN - no changes sent")
+        print(f"  Would apply: {len(updates)}")
+    else:
+        print(f"  Applied: {applied}")
+    print(f"  Skipped (already tagged): {len(skipped)}")
+    print(f"  Failed: {len(failed)}")
+    print(f"  Unlabeled: {len(unlabeled)}")
+
+    return {'applied': 0 if dry_run else applied, 'skipped': len(skipped),
+            'failed': len(failed), 'unlabeled': len(unlabeled)}
@@ -3,9 +3,10 @@
 Script to verify that the tags in collection #402 match labels.tsv
 """
 
-from bioblend.galaxy import GalaxyInstance
 import csv
 
+from galaxy_utils.instrumentation import galaxy_instance
+
 # Galaxy credentials from script.md
 GALAXY_URL = "https://usegalaxy.org"
 API_KEY = "YOUR_GALAXY_API_KEY"
@@ -26,7 +27,7 @@ with open('labels.tsv', 'r') as f:
         print(f"  {srr_id} -> {group_tag}")
 
 # Connect to Galaxy
-gi = GalaxyInstance(url=GALAXY_URL, key=API_KEY)
+gi = galaxy_instance(GALAXY_URL, API_KEY)
 
 print("\nFetching collection #402 details...")
 collection_details = gi.histories.show_dataset_collection(
@@ -3,9 +3,10 @@
 Script to verify that tags were correctly applied to collection #260
 """
 
-from bioblend.galaxy import GalaxyInstance
 import csv
 
+from galaxy_utils.instrumentation import galaxy_instance
+
 # Galaxy credentials
 GALAXY_URL = "https://usegalaxy.org"
 API_KEY = "YOUR_GALAXY_API_KEY"
@@ -21,7 +22,7 @@ with open('labels.tsv', 'r') as f:
         label_mapping[row[0]] = row[1]
 
 # Connect to Galaxy
-gi = GalaxyInstance(url=GALAXY_URL, key=API_KEY)
+gi = galaxy_instance(GALAXY_URL, API_KEY)
 
 print("\nFetching collection #260 details...")
 collection_details = gi.histories.show_dataset_collection(
@@ -0,0 +1,12 @@
+"""
+Galaxy API helpers shared by the scripts of every project in this repository.
+
+- fetch: bounded concurrent fetching with retry and backoff
+- session: pooled requests session for calls that bypass bioblend
+- instrumentation: galaxy_instance(), with per-request tracing under GALAXY_TRACE
+- sample_groups: matching of collection elements to sample groups
+
+Install once with `pip install -e .` from the repository root; the scripts
+then import e.g. `from galaxy_utils.fetch import fetch_concurrently` from
+whichever directory they are run in.
+"""
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Concurrent Galaxy metadata fetching with a bounded thread pool and backoff.
+
+Collection element tags are read straight from the elements[*].object.tags
+payload of one show_dataset_collection call (as apply_tags_260.py does);
+per-dataset show_dataset calls are only made, concurrently, for elements whose
+payload carries no tags field.
+"""
+
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from bioblend import ConnectionError as GalaxyConnectionError
+
+# Default number of simultaneous requests against the Galaxy server
+MAX_CONCURRENCY = 8
+
+# HTTP statuses worth retrying: rate limiting and transient server errors
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+_retry_state = threading.local()
+
+
+def current_attempt():
+    """Retry number of the call_with_backoff attempt running in this thread (0 = first try)"""
+    return getattr(_retry_state, 'attempt', 0)
+
+
+def call_with_backoff(func, *args, max_retries=5, base_delay=1.0, max_delay=30.0, **kwargs):
+    """
+    Call func(*args, **kwargs), retrying 429/5xx and dropped connections.
+
+    Delays grow exponentially from base_delay up to max_delay, with jitter so
+    that parallel workers do not retry in lockstep.
+    """
+    # Nested calls (a retried helper that itself retries) restore the outer number
+    outer_attempt = current_attempt()
+    try:
+        for attempt in range(max_retries + 1):
+            _retry_state.attempt = attempt
+            try:
+                return func(*args, **kwargs)
+            except GalaxyConnectionError as e:
+                if e.status_code not in RETRY_STATUS or attempt == max_retries:
+                    raise
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+                if attempt == max_retries:
+                    raise
+            delay = min(max_delay, base_delay * 2 ** attempt)
+            time.sleep(delay * random.uniform(0.5, 1.0))
+    finally:
+        _retry_state.attempt = outer_attempt
+
+
+def fetch_concurrently(func, keys, max_workers=MAX_CONCURRENCY, **backoff):
+    """
+    Run func(key) for every key with at most max_workers requests in flight.
+
+    Returns a dict of key -> result; keys whose call still failed after
+    retries map to the raised exception instead.
+    """
+    keys = list(keys)
+
+    def fetch_one(key):
+        try:
+            return call_with_backoff(func, key, **backoff)
+        except Exception as e:
+            return e
+
+    if not keys:
+        return {}
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(keys))) as pool:
+        return dict(zip(keys, pool.map(fetch_one, keys)))
+
+
+def collection_elements_with_tags(gi, history_id, collection_id, max_workers=MAX_CONCURRENCY):
+    """
+    Return a collection's elements with element['object']['tags'] filled in.
+
+    Tags come from the single show_dataset_collection payload; only elements
+    whose object lacks a tags field are fetched with show_dataset, in parallel.
+    Elements whose fallback fetch failed get an 'error' key.
+    """
+    details = call_with_backoff(gi.histories.show_dataset_collection, history_id, collection_id)
+    elements = details.get('elements', [])
+
+    missing = [
+        elem['object']['id'] for elem in elements
+        if elem.get('object') and 'tags' not in elem['object']
+    ]
+    if missing:
+        fetched = fetch_concurrently(gi.datasets.show_dataset, missing, max_workers=max_workers)
+        for elem in elements:
+            obj = elem.get('object') or {}
+            result = fetched.get(obj.get('id'))
+            if isinstance(result, Exception):
+                elem['error'] = result
+                obj['tags'] = []
+            elif result is not None:
+                obj['tags'] = result.get('tags', [])
+
+    return elements
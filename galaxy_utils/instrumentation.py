@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+Per-request instrumentation for bioblend GalaxyInstance calls.
+
+Scripts build their client with galaxy_instance(GALAXY_URL, API_KEY). With
+GALAXY_TRACE unset that is a plain GalaxyInstance; with GALAXY_TRACE set it is
+an InstrumentedGalaxyInstance that records, for every HTTP request, the
+endpoint (ids replaced by {id}), status, latency, request and response size
+and the call_with_backoff retry number, and prints a per-endpoint summary
+table when the script exits.
+
+    GALAXY_TRACE=1 python split_collection.py            # summary only
+    GALAXY_TRACE=calls.jsonl python split_collection.py  # summary + JSONL trace
+
+Sizes of POST/PUT/PATCH responses are measured on the re-encoded JSON, since
+bioblend only hands back the decoded body for those.
+"""
+
+import atexit
+import json
+import os
+import re
+import threading
+import time
+from collections import namedtuple
+from urllib.parse import urlparse
+
+from bioblend import ConnectionError as GalaxyConnectionError
+from bioblend.galaxy import GalaxyInstance
+
+from galaxy_utils.fetch import current_attempt
+
+TRACE_ENV = 'GALAXY_TRACE'
+
+# Galaxy encodes database ids as 16+ hex characters
+ID_PATTERN = re.compile(r'/[0-9a-f]{16,}(?=/|$)')
+
+CallRecord = namedtuple('CallRecord', [
+    'time', 'method', 'endpoint', 'status', 'latency', 'request_bytes', 'response_bytes', 'attempt', 'error'
+])
+
+
+def endpoint_of(url):
+    """Path of a request URL with object ids collapsed, e.g. /api/histories/{id}/contents"""
+    return ID_PATTERN.sub('/{id}', urlparse(url).path)
+
+
+def json_size(data):
+    return 0 if data is None else len(json.dumps(data))
+
+
+class InstrumentedGalaxyInstance(GalaxyInstance):
+    """GalaxyInstance that records every request it makes"""
+
+    def __init__(self, url, key=None, trace_path=None, summary_at_exit=True, **kwargs):
+        super().__init__(url=url, key=key, **kwargs)
+        self.calls = []
+        self._calls_lock = threading.Lock()
+        self._trace = open(trace_path, 'a', buffering=1) if trace_path else None
+        if summary_at_exit:
+            atexit.register(self.print_summary)
+        if self._trace:
+            atexit.register(self._trace.close)
+
+    def record_call(self, method, url, status, latency, request_bytes=0, response_bytes=0, error=None):
+        """Add one request to the log; also used by download_manager for streamed downloads"""
+        record = CallRecord(time.time(), method, endpoint_of(url), status, latency,
+                            request_bytes, response_bytes, current_attempt(), error)
+        with self._calls_lock:
+            self.calls.append(record)
+            if self._trace:
+                self._trace.write(json.dumps(record._asdict()) + '\n')
+
+    def _timed(self, method, url, request_bytes, send, response_size):
+        start = time.perf_counter()
+        try:
+            result = send()
+        except GalaxyConnectionError as e:
+            self.record_call(method, url, e.status_code, time.perf_counter() - start, request_bytes,
+                             error=str(e)[:200])
+            raise
+        except Exception as e:
+            self.record_call(method, url, None, time.perf_counter() - start, request_bytes,
+                             error=f"{type(e).__name__}: {e}"[:200])
+            raise
+        status, response_bytes = response_size(result)
+        self.record_call(method, url, status, time.perf_counter() - start, request_bytes, response_bytes)
+        return result
+
+    def make_get_request(self, url, **kwargs):
+        # Streamed bodies are not read here, so their size is unknown
+        stream = kwargs.get('stream')
+        send = super().make_get_request
+        return self._timed('GET', url, 0, lambda: send(url, **kwargs),
+                           lambda r: (r.status_code, 0 if stream else len(r.content)))
+
+    def make_delete_request(self, url, payload=None, params=None):
+        send = super().make_delete_request
+        return self._timed('DELETE', url, json_size(payload), lambda: send(url, payload, params),
+                           lambda r: (r.status_code, len(r.content)))
+
+    def make_post_request(self, url, payload=None, params=None, files_attached=False):
+        request_bytes = 0 if files_attached else json_size(payload)
+        send = super().make_post_request
+        return self._timed('POST', url, request_bytes, lambda: send(url, payload, params, files_attached),
+                           lambda result: (200, json_size(result)))
+
+    def make_put_request(self, url, payload=None, params=None):
+        send = super().make_put_request
+        return self._timed('PUT', url, json_size(payload), lambda: send(url, payload, params),
+                           lambda result: (200, json_size(result)))
+
+    def make_patch_request(self, url, payload=None, params=None):
+        send = super().make_patch_request
+        return self._timed('PATCH', url, json_size(payload), lambda: send(url, payload, params),
+                           lambda result: (200, json_size(result)))
+
+    # Reporting
+
+    def summary(self):
+        """Per-endpoint totals, busiest endpoint (by total latency) first"""
+        with self._calls_lock:
+            calls = list(self.calls)
+        groups = {}
+        for call in calls:
+            groups.setdefault((call.method, call.endpoint), []).append(call)
+
+        rows = []
+        for (method, endpoint), group in groups.items():
+            latencies = sorted(call.latency for call in group)
+            rows.append({
+                'method': method,
+                'endpoint': endpoint,
+                'calls': len(group),
+                'retries': sum(1 for call in group if call.attempt),
+                'errors': sum(1 for call in group if call.error or (call.status or 0) >= 400),
+                'total_s': sum(latencies),
+                'mean_ms': 1000 * sum(latencies) / len(latencies),
+                'p95_ms': 1000 * latencies[min(len(latencies) - 1, int(0.95 * len(latencies)))],
+                'sent_kb': sum(call.request_bytes for call in group) / 1024,
+                'received_kb': sum(call.response_bytes for call in group) / 1024,
+            })
+        return sorted(rows, key=lambda row: row['total_s'], reverse=True)
+
+    def print_summary(self):
+        rows = self.summary()
+        if not rows:
+            return
+        width = max(len(row['endpoint']) for row in rows) + 2
+        print(f"\n{'='*(width + 74)}")
+        print("GALAXY API CALLS")
+        print(f"{'='*(width + 74)}")
+        print(f"{'Method':<8}{'Endpoint':<{width}}{'Calls':>6}{'Retry':>6}{'Err':>5}"
+              f"{'Total s':>9}{'Mean ms':>9}{'p95 ms':>9}{'Sent KB':>9}{'Recv KB':>9}")
+        for row in rows:
+            print(f"{row['method']:<8}{row['endpoint']:<{width}}{row['calls']:>6}{row['retries']:>6}"
+                  f"{row['errors']:>5}{row['total_s']:>9.2f}{row['mean_ms']:>9.1f}{row['p95_ms']:>9.1f}"
+                  f"{row['sent_kb']:>9.1f}{row['received_kb']:>9.1f}")
+        print(f"{'Total':<{width + 8}}{sum(r['calls'] for r in rows):>6}{sum(r['retries'] for r in rows):>6}"
+              f"{sum(r['errors'] for r in rows):>5}{sum(r['total_s'] for r in rows):>9.2f}")
+
+def galaxy_instance(url, key, **kwargs):
+    """
+    Connect to Galaxy; instrumented when the GALAXY_TRACE environment variable is set.
+
+    GALAXY_TRACE=1 (or true/yes) prints the call summary at exit; any other
+    value is also taken as the path of a JSONL file to append one record per
+    request to.
+    """
+    trace = os.environ.get(TRACE_ENV, '').strip()
+    if not trace or trace.lower() in ('0', 'false', 'no'):
+        return GalaxyInstance(url=url, key=key, **kwargs)
+    trace_path = None if trace.lower() in ('1', 'true', 'yes') else trace
+    return InstrumentedGalaxyInstance(url, key, trace_path=trace_path, **kwargs)
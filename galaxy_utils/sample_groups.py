@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Matching of Galaxy collection elements to sample groups.
+
+A spec maps group name -> run accessions: a column of a samples TSV (e.g.
+strain in samples.tsv), one TSV per group (samples_in_vitro.tsv /
+samples_in_vivo.tsv) or a collection_groups.json file. GroupIndex turns it
+into a hash index from accession (and sample-name alias) to group, so every
+element is matched with a few exact dictionary lookups on the accessions in
+its identifier and on its tags: O(elements) overall, and '82' can never match
+inside an '87' sample. Elements matching no group, or more than one, are
+reported rather than guessed.
+"""
+
+import csv
+import json
+import os
+import re
+from collections import namedtuple
+
+# SRA / ENA / DDBJ run accessions
+ACCESSION_PATTERN = re.compile(r'[DES]RR\d+')
+
+# groups: group -> matched elements (spec order); ambiguous: (element, sorted groups) pairs
+GroupMatch = namedtuple('GroupMatch', ['groups', 'unmatched', 'ambiguous'])
+
+
+def read_samples(path):
+    """Rows of a tab-separated samples file"""
+    with open(path) as f:
+        return list(csv.DictReader(f, delimiter='\t'))
+
+
+def row_aliases(row, key_column, alias_columns):
+    """{alias: accession} for the non-empty alias columns of a samples row"""
+    return {row[column]: row[key_column] for column in alias_columns if row.get(column)}
+
+
+class GroupIndex:
+    """Hash index from run accessions and aliases to group names"""
+
+    def __init__(self, groups, aliases=None, tags=None):
+        """
+        groups: {group name: [run accessions]}
+        aliases: optional {alias (e.g. sample name): run accession}
+        tags: optional {group name: [tags for the group's collection]}
+        """
+        self.groups = {group: list(keys) for group, keys in groups.items()}
+        self.tags = {group: list((tags or {}).get(group, ())) for group in self.groups}
+        self.index = {}
+        for group, keys in self.groups.items():
+            for key in keys:
+                self._add(key, group)
+        for alias, key in (aliases or {}).items():
+            if key in self.index:
+                self._add(alias, self.index[key])
+
+    def _add(self, key, group):
+        existing = self.index.get(key)
+        if existing is not None and existing != group:
+            raise ValueError(f"'{key}' is assigned to both {existing} and {group}")
+        self.index[key] = group
+
+    @classmethod
+    def from_tsv(cls, path, group_column, key_column='Run', alias_columns=('Sample Name',)):
+        """One group per distinct value of group_column"""
+        groups, aliases = {}, {}
+        for row in read_samples(path):
+            groups.setdefault(row[group_column], []).append(row[key_column])
+            aliases.update(row_aliases(row, key_column, alias_columns))
+        return cls(groups, aliases)
+
+    @classmethod
+    def from_files(cls, files, key_column='Run', alias_columns=('Sample Name',)):
+        """One group per samples TSV; files is {group name: path}"""
+        groups, aliases = {}, {}
+        for group, path in files.items():
+            groups[group] = []
+            for row in read_samples(path):
+                groups[group].append(row[key_column])
+                aliases.update(row_aliases(row, key_column, alias_columns))
+        return cls(groups, aliases)
+
+    @classmethod
+    def from_json(cls, path):
+        """
+        Load collection_groups.json. Each group is a list of accessions, a
+        samples TSV path, or {"samples": <either>, "tags": [collection tags]}.
+
+        TSV paths are relative to the JSON file.
+        """
+        with open(path) as f:
+            spec = json.load(f)
+        base = os.path.dirname(os.path.abspath(path))
+        groups, aliases, tags = {}, {}, {}
+        for group, keys in spec.items():
+            if isinstance(keys, dict):
+                tags[group] = keys.get('tags', [])
+                keys = keys['samples']
+            if isinstance(keys, str):
+                groups[group] = []
+                for row in read_samples(os.path.join(base, keys)):
+                    groups[group].append(row['Run'])
+                    aliases.update(row_aliases(row, 'Run', ('Sample Name',)))
+            else:
+                groups[group] = list(keys)
+        return cls(groups, aliases, tags)
+
+    def element_keys(self, element):
+        """Exact lookup keys of an element: its identifier, run accessions in it, and its tags"""
+        identifier = element.get('element_identifier', '')
+        keys = {identifier, *ACCESSION_PATTERN.findall(identifier)}
+        for tag in (element.get('object') or {}).get('tags') or []:
+            keys.add(tag)
+            # 'group:82_Bio_1' and 'name:82_Bio_1' both stand for '82_Bio_1'
+            keys.add(tag.split(':', 1)[-1])
+        return keys
+
+    def groups_of(self, element):
+        return {self.index[key] for key in self.element_keys(element) if key in self.index}
+
+    def match(self, elements):
+        """Assign every element to at most one group"""
+        groups = {group: [] for group in self.groups}
+        unmatched, ambiguous = [], []
+        for element in elements:
+            found = self.groups_of(element)
+            if len(found) == 1:
+                groups[found.pop()].append(element)
+            elif found:
+                ambiguous.append((element, sorted(found)))
+            else:
+                unmatched.append(element)
+        return GroupMatch(groups, unmatched, ambiguous)
+
+
+def print_match_report(match):
+    for group, elements in match.groups.items():
+        print(f"  {group}: {len(elements)} element(s)")
+    for element in match.unmatched:
+        print(f"  Warning: Element '{element.get('element_identifier')}' not matched to any group")
+    for element, groups in match.ambiguous:
+        print(f"  Warning: Element '{element.get('element_identifier')}' matches several groups: "
+              f"{', '.join(groups)}")
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Pooled HTTP session for Galaxy API code that does not go through bioblend.
+
+One requests.Session per process keeps TLS connections alive across calls
+(so creating a collection per condition reuses a single connection), caps
+the pool at pool_size connections, asks for gzip-compressed responses,
+applies a default timeout and retries 429/502/503 with exponential backoff,
+honouring Retry-After. POSTs are only retried on 429, which Galaxy returns
+before doing any work; a 502/503 on a POST may hide a request that did run.
+"""
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from galaxy_utils.fetch import MAX_CONCURRENCY
+
+POOL_SIZE = MAX_CONCURRENCY
+MAX_RETRIES = 5
+BACKOFF_FACTOR = 1.0
+RETRY_STATUS = (429, 502, 503)
+
+# (connect, read) timeout for requests that do not pass their own
+DEFAULT_TIMEOUT = (30, 120)
+
+
+class GalaxyRetry(Retry):
+    """urllib3 retry policy that also resends non-idempotent requests after a 429"""
+
+    def is_retry(self, method, status_code, has_retry_after=False):
+        if status_code == 429 and self.total:
+            return True
+        return super().is_retry(method, status_code, has_retry_after)
+
+
+class GalaxySession(requests.Session):
+    """requests.Session with a default timeout"""
+
+    def __init__(self, timeout=DEFAULT_TIMEOUT):
+        super().__init__()
+        self.timeout = timeout
+
+    def request(self, method, url, **kwargs):
+        kwargs.setdefault('timeout', self.timeout)
+        return super().request(method, url, **kwargs)
+
+
+def galaxy_session(api_key=None, pool_size=POOL_SIZE, retries=MAX_RETRIES, backoff_factor=BACKOFF_FACTOR,
+                   timeout=DEFAULT_TIMEOUT):
+    """
+    Build a pooled session for the Galaxy API.
+
+    With retries=0 failed requests surface immediately (for callers with
+    their own retry logic, such as resumable downloads). After the last retry
+    the final response is returned rather than raised, so callers check
+    status codes as they would without retries.
+    """
+    retry = GalaxyRetry(
+        total=retries,
+        backoff_factor=backoff_factor,
+        status_forcelist=RETRY_STATUS,
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+
+    session = GalaxySession(timeout=timeout)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    session.headers['Accept-Encoding'] = 'gzip, deflate'
+    if api_key:
+        session.headers['x-api-key'] = api_key
+    return session
@@ -6,8 +6,10 @@ Final comprehensive comparison with proper gene ID mapping
 import pandas as pd
 import numpy as np
 
-# Load gene ID mapping
-mapping = pd.read_csv('gene_id_mapping_v2_to_v3.tsv', sep='\t')
+from gene_ids import load_mapping, report_problems
+
+# Load the official v2 <-> v3 gene ID mapping
+mapping = load_mapping()
 
 # Load our DESeq2 results
 our_vitro = pd.read_csv("deseq2_in_vitro_results.tsv", sep='\t', header=None,
@@ -30,18 +32,11 @@ paper_vivo.columns = ['Gene_ID_v2', 'LFC', 'FDR', 'Gene_name', 'Description']
 paper_vivo['LFC'] = pd.to_numeric(paper_vivo['LFC'], errors='coerce')
 paper_vivo = paper_vivo.dropna(subset=['LFC'])
 
-# Add v3 gene IDs to paper's data
-def normalize_gene_id(gene_id):
-    if not isinstance(gene_id, str):
-        return gene_id
-    parts = gene_id.split('_')
-    if len(parts) == 2 and parts[0] == 'B9J08':
-        numeric = parts[1].lstrip('0') or '0'
-        return f"B9J08_{numeric.zfill(5)}"
-    return gene_id
-
-paper_vitro['Gene_ID_v3'] = paper_vitro['Gene_ID_v2'].apply(normalize_gene_id)
-paper_vivo['Gene_ID_v3'] = paper_vivo['Gene_ID_v2'].apply(normalize_gene_id)
+# Add v3 gene IDs to paper's data (official mapping; unmapped IDs stay missing)
+report_problems(paper_vitro['Gene_ID_v2'], mapping, 'v2', "paper in vitro IDs")
+report_problems(paper_vivo['Gene_ID_v2'], mapping, 'v2', "paper in vivo IDs")
+paper_vitro['Gene_ID_v3'] = mapping.translate(paper_vitro['Gene_ID_v2'], 'v2', 'v3')
+paper_vivo['Gene_ID_v3'] = mapping.translate(paper_vivo['Gene_ID_v2'], 'v2', 'v3')
 
 print("="*80)
 print("FINAL COMPREHENSIVE ANALYSIS")
@@ -70,10 +65,13 @@ print("\n" + "="*80)
 print("3. KEY GENES ANALYSIS (with corrected gene IDs & reversed LFC)")
 print("="*80)
 
+key_genes_v2 = {
+    'SCF1': 'B9J08_001458',
+    'ALS4112': 'B9J08_004112',
+    'IFF4109': 'B9J08_004109'
+}
 key_genes = {
-    'SCF1': ('B9J08_001458', 'B9J08_01458'),
-    'ALS4112': ('B9J08_004112', 'B9J08_04112'),
-    'IFF4109': ('B9J08_004109', 'B9J08_04109')
+    name: (gene_v2, mapping.get(gene_v2, 'v2', 'v3', 'NOT_MAPPED')) for name, gene_v2 in key_genes_v2.items()
 }
 
 for gene_name, (gene_v2, gene_v3) in key_genes.items():
@@ -151,7 +149,7 @@ print("="*80)
 print("\n1. ✓ Annotation version issue: IDENTIFIED")
 print("   - Paper used B8441 v2 (6-digit IDs)")
 print("   - You used B8441 v3 (5-digit IDs)")
-print("   - Mapping created: gene_id_mapping_v2_to_v3.tsv")
+print("   - Official NCBI mapping used: official_mapping_v2_to_v3.tsv")
 print("\n2. ✓ Comparison direction: REVERSED")
 print("   - Your results need LFC sign reversed (-LFC)")
 print("\n3. Next steps:")
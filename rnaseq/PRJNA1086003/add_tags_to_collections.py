@@ -4,7 +4,10 @@ Add tags from Sample Name column to datasets in Galaxy collections.
 """
 
 import csv
-from bioblend.galaxy import GalaxyInstance
+
+from galaxy_utils.fetch import call_with_backoff, collection_elements_with_tags
+from galaxy_utils.instrumentation import galaxy_instance
+from history_resolver import find_history
 
 # Galaxy connection details
 GALAXY_URL = "https://usegalaxy.org"
@@ -20,19 +23,12 @@ def read_sample_mapping(tsv_file):
             mapping[row['Run']] = row['Sample Name']
     return mapping
 
-def add_tags_to_collection(gi, history_id, collection_hid, sample_mapping, collection_name):
+def add_tags_to_collection(gi, resolver, history_id, collection_hid, sample_mapping, collection_name):
     """Add tags to datasets in a collection."""
     print(f"\nProcessing collection #{collection_hid}: {collection_name}")
 
-    # Get history contents to find the collection
-    history_contents = gi.histories.show_history(history_id, contents=True)
-
-    # Find the collection
-    collection = None
-    for item in history_contents:
-        if item.get('hid') == collection_hid and item.get('history_content_type') == 'dataset_collection':
-            collection = item
-            break
+    # Find the collection by hid without listing the whole history
+    collection = resolver.content_by_hid(history_id, collection_hid)
 
     if not collection:
         print(f"Error: Collection #{collection_hid} not found")
@@ -40,13 +36,8 @@ def add_tags_to_collection(gi, history_id, collection_hid, sample_mapping, colle
 
     print(f"Found collection: {collection['name']}")
 
-    # Get collection details
-    collection_details = gi.histories.show_dataset_collection(
-        history_id,
-        collection['id']
-    )
-
-    elements = collection_details.get('elements', [])
+    # Get collection elements; tags come from the collection payload itself
+    elements = collection_elements_with_tags(gi, history_id, collection['id'])
     print(f"Collection has {len(elements)} elements")
 
     # Process each element
@@ -68,18 +59,20 @@ def add_tags_to_collection(gi, history_id, collection_hid, sample_mapping, colle
             dataset = element.get('object', {})
             dataset_id = dataset.get('id')
 
-            if dataset_id:
+            if 'error' in element:
+                print(f"  ✗ Error reading tags for '{element_name}': {element['error']}")
+            elif dataset_id:
                 try:
-                    # Get current tags
-                    dataset_info = gi.datasets.show_dataset(dataset_id)
-                    current_tags = dataset_info.get('tags', [])
+                    # Current tags were fetched with the collection
+                    current_tags = list(dataset.get('tags', []))
 
                     # Add the new tag if not already present
                     if matched_sample not in current_tags:
                         current_tags.append(matched_sample)
 
                         # Update dataset with new tags using histories API
-                        gi.histories.update_dataset(
+                        call_with_backoff(
+                            gi.histories.update_dataset,
                             history_id,
                             dataset_id,
                             tags=current_tags
@@ -97,23 +90,13 @@ def add_tags_to_collection(gi, history_id, collection_hid, sample_mapping, colle
 
 def main():
     # Connect to Galaxy
-    gi = GalaxyInstance(url=GALAXY_URL, key=API_KEY)
+    gi = galaxy_instance(GALAXY_URL, API_KEY)
 
     # Get the history
-    all_histories = gi.histories.get_histories()
-    history = None
-    for h in all_histories:
-        if HISTORY_NAME.lower() in h['name'].lower():
-            history = h
-            break
-
-    if not history:
-        print(f"Error: History containing '{HISTORY_NAME}' not found")
+    resolver, history_id = find_history(gi, HISTORY_NAME)
+    if not history_id:
         return
 
-    history_id = history['id']
-    print(f"Found history: {history['name']} (ID: {history_id})")
-
     # Read sample mappings
     in_vitro_mapping = read_sample_mapping('samples_in_vitro.tsv')
     in_vivo_mapping = read_sample_mapping('samples_in_vivo.tsv')
@@ -122,8 +105,8 @@ def main():
     print(f"In vivo mapping: {len(in_vivo_mapping)} samples")
 
     # Add tags to both collections
-    add_tags_to_collection(gi, history_id, 621, in_vitro_mapping, "PRJNA1086003_in_vitro")
-    add_tags_to_collection(gi, history_id, 629, in_vivo_mapping, "PRJNA1086003_in_vivo")
+    add_tags_to_collection(gi, resolver, history_id, 621, in_vitro_mapping, "PRJNA1086003_in_vitro")
+    add_tags_to_collection(gi, resolver, history_id, 629, in_vivo_mapping, "PRJNA1086003_in_vivo")
 
     print("\n✓ Tagging completed!")
 
@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+"""
+Persistent SQLite annotation index (locus_tag <-> protein_id <-> coordinates).
+
+The GFF and NCBI feature table for each assembly are parsed once into
+.cache/annotation_index.sqlite, keyed by assembly accession. Every open
+compares the source files' size and mtime with what was recorded at build
+time (falling back to a SHA-1 of the content when only the mtime moved) and
+rebuilds that accession automatically when a source has changed.
+"""
+
+import csv
+import hashlib
+import os
+import re
+import sqlite3
+from contextlib import closing
+
+from gff_reader import open_text, read_gff
+from interval_overlap import Feature
+
+INDEX_PATH = os.path.join('.cache', 'annotation_index.sqlite')
+
+# Source files per assembly; missing files are skipped
+ASSEMBLIES = {
+    'GCA_002759435.2': {
+        'gff': 'GCA_002759435.2_genomic.gff',
+    },
+    'GCA_002759435.3': {
+        'gff': 'GCA_002759435.3_genomic.gff',
+        'feature_table': 'v3_feature_table.txt',
+    },
+    # B11221 (clade III)
+    'GCA_002775015.1': {
+        'gff': 'GCA_002775015.1_genomic.gff',
+        'feature_table': 'GCA_002775015.1_feature_table.txt',
+    },
+}
+
+OLD_LOCUS_TAG_RE = re.compile(r'old_locus_tag=([^;,\s]+)')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sources (
+    accession TEXT NOT NULL,
+    path TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    sha1 TEXT NOT NULL,
+    PRIMARY KEY (accession, path)
+);
+CREATE TABLE IF NOT EXISTS features (
+    accession TEXT NOT NULL,
+    feature TEXT NOT NULL,
+    locus_tag TEXT NOT NULL,
+    old_locus_tag TEXT,
+    protein_id TEXT,
+    seqid TEXT NOT NULL,
+    start INTEGER NOT NULL,
+    end INTEGER NOT NULL,
+    strand TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS features_locus_tag ON features (accession, locus_tag);
+CREATE INDEX IF NOT EXISTS features_old_locus_tag ON features (accession, old_locus_tag);
+CREATE INDEX IF NOT EXISTS features_protein_id ON features (accession, protein_id);
+"""
+
+
+def file_sha1(path):
+    """SHA-1 of a file, read in 1 MB chunks"""
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def source_paths(accession):
+    """Existing source files for an accession"""
+    sources = ASSEMBLIES.get(accession, {})
+    return [path for path in sources.values() if os.path.exists(path)]
+
+
+def read_feature_table_rows(path):
+    """Yield (feature, locus_tag, old_locus_tag, protein_id, seqid, start, end, strand) from an NCBI feature table"""
+    with open_text(path) as f:
+        reader = csv.reader(f, delimiter='\t')
+        header = [col.lstrip('# ') for col in next(reader)]
+        col = {name: i for i, name in enumerate(header)}
+
+        for row in reader:
+            if len(row) < len(header):
+                continue
+            feature = row[col['feature']]
+            if feature not in ('gene', 'CDS'):
+                continue
+            locus_tag = row[col['locus_tag']]
+            if not locus_tag:
+                continue
+
+            match = OLD_LOCUS_TAG_RE.search(row[col['attributes']])
+            old_locus_tag = match.group(1) if match else None
+
+            yield (
+                feature,
+                locus_tag,
+                old_locus_tag,
+                row[col['product_accession']] or None,
+                row[col['genomic_accession']],
+                int(row[col['start']]),
+                int(row[col['end']]),
+                row[col['strand']],
+            )
+
+
+def read_gff_rows(path):
+    """Yield the same row layout as read_feature_table_rows from a GFF3 file"""
+    for rec in read_gff(path, feature_types={'gene', 'CDS'}):
+        locus_tag = rec.attributes.get('locus_tag')
+        if not locus_tag:
+            continue
+        yield (
+            rec.type,
+            locus_tag,
+            rec.attributes.get('old_locus_tag'),
+            rec.attributes.get('protein_id'),
+            rec.seqid,
+            rec.start,
+            rec.end,
+            rec.strand,
+        )
+
+
+def build_accession(conn, accession):
+    """(Re)build the index rows for one accession from its source files"""
+    sources = ASSEMBLIES.get(accession, {})
+    gff = sources.get('gff')
+    feature_table = sources.get('feature_table')
+
+    if gff and os.path.exists(gff):
+        rows = list(read_gff_rows(gff))
+    elif feature_table and os.path.exists(feature_table):
+        rows = list(read_feature_table_rows(feature_table))
+    else:
+        raise FileNotFoundError(f"No annotation source found for {accession}")
+
+    conn.execute("DELETE FROM features WHERE accession = ?", (accession,))
+    conn.execute("DELETE FROM sources WHERE accession = ?", (accession,))
+    conn.executemany(
+        "INSERT INTO features VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        ((accession,) + row for row in rows)
+    )
+
+    # The feature table is the authoritative source of old_locus_tag
+    if feature_table and os.path.exists(feature_table) and gff and os.path.exists(gff):
+        old_tags = {
+            row[1]: row[2]
+            for row in read_feature_table_rows(feature_table)
+            if row[0] == 'gene' and row[2]
+        }
+        conn.executemany(
+            "UPDATE features SET old_locus_tag = ? WHERE accession = ? AND locus_tag = ?",
+            ((old, accession, new) for new, old in old_tags.items())
+        )
+
+    for path in source_paths(accession):
+        st = os.stat(path)
+        conn.execute(
+            "INSERT INTO sources VALUES (?, ?, ?, ?, ?)",
+            (accession, path, st.st_size, st.st_mtime_ns, file_sha1(path))
+        )
+    conn.commit()
+
+
+def is_stale(conn, accession):
+    """True if the accession was never indexed or any source file changed"""
+    recorded = {
+        path: (size, mtime_ns, sha1)
+        for path, size, mtime_ns, sha1 in conn.execute(
+            "SELECT path, size, mtime_ns, sha1 FROM sources WHERE accession = ?", (accession,)
+        )
+    }
+    current = source_paths(accession)
+    if not recorded or set(recorded) != set(current):
+        return True
+
+    for path in current:
+        size, mtime_ns, sha1 = recorded[path]
+        st = os.stat(path)
+        if st.st_size != size:
+            return True
+        if st.st_mtime_ns != mtime_ns:
+            # Touched but possibly unchanged: only the hash decides
+            if file_sha1(path) != sha1:
+                return True
+            conn.execute(
+                "UPDATE sources SET mtime_ns = ? WHERE accession = ? AND path = ?",
+                (st.st_mtime_ns, accession, path)
+            )
+            conn.commit()
+    return False
+
+
+def open_index(accession, index_path=INDEX_PATH):
+    """Open the index, rebuilding this accession first if it is missing or stale"""
+    os.makedirs(os.path.dirname(index_path) or '.', exist_ok=True)
+    conn = sqlite3.connect(index_path)
+    conn.executescript(SCHEMA)
+    if is_stale(conn, accession):
+        print(f"  Building annotation index for {accession}...")
+        build_accession(conn, accession)
+    return conn
+
+
+def locus_tag_to_protein_id(accession):
+    """Dict of locus_tag -> protein_id for CDS features"""
+    with closing(open_index(accession)) as conn:
+        return dict(conn.execute(
+            "SELECT locus_tag, protein_id FROM features "
+            "WHERE accession = ? AND feature = 'CDS' AND protein_id IS NOT NULL",
+            (accession,)
+        ))
+
+
+def cds_features(accession):
+    """All CDS segments as interval_overlap.Feature records"""
+    with closing(open_index(accession)) as conn:
+        return [
+            Feature(*row) for row in conn.execute(
+                "SELECT locus_tag, seqid, start, end, strand FROM features "
+                "WHERE accession = ? AND feature = 'CDS' ORDER BY rowid",
+                (accession,)
+            )
+        ]
+
+
+def old_locus_tag_mapping(accession):
+    """Dict of locus_tag -> old_locus_tag for gene features"""
+    with closing(open_index(accession)) as conn:
+        return dict(conn.execute(
+            "SELECT locus_tag, old_locus_tag FROM features "
+            "WHERE accession = ? AND feature = 'gene' AND old_locus_tag IS NOT NULL",
+            (accession,)
+        ))
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Batch uploads to a Galaxy history through one fetch API request.
+
+Every item, whether a file on disk or an in-memory string (factor files,
+generated FASTA), becomes one element of a single POST to /api/tools/fetch.
+Small items are pasted straight into the request body; files above
+CHUNKED_THRESHOLD are first sent with resumable tus uploads (in parallel,
+chunked, resumed from .cache/tus_uploads.json after an interruption) and then
+referenced by their session ids. The created dataset ids come back in the
+fetch response, in item order, so callers never rescan the history to find
+what they uploaded.
+"""
+
+import io
+import os
+from collections import namedtuple
+
+import tusclient.client
+import tusclient.storage.filestorage
+from bioblend.galaxyclient import UPLOAD_CHUNK_SIZE
+
+from galaxy_utils.fetch import MAX_CONCURRENCY, fetch_concurrently
+
+# Files larger than this go through chunked tus uploads instead of the request body
+CHUNKED_THRESHOLD = 10 * 1024 * 1024
+
+TUS_STORAGE_PATH = os.path.join('.cache', 'tus_uploads.json')
+
+# One dataset to create: Galaxy name, datatype and either a path or in-memory content
+UploadItem = namedtuple('UploadItem', ['name', 'file_type', 'path', 'content'], defaults=(None, None))
+
+
+def item_size(item):
+    """Size of an item in bytes"""
+    if item.content is not None:
+        return len(item.content.encode() if isinstance(item.content, str) else item.content)
+    return os.path.getsize(item.path)
+
+
+def read_text(item):
+    """Content of a small item as text for a pasted element"""
+    if item.content is not None:
+        return item.content if isinstance(item.content, str) else item.content.decode()
+    with open(item.path) as f:
+        return f.read()
+
+
+def tus_upload(gi, item, chunk_size=UPLOAD_CHUNK_SIZE, storage_path=TUS_STORAGE_PATH):
+    """Send one large item with the tus protocol and return its session id"""
+    os.makedirs(os.path.dirname(storage_path) or '.', exist_ok=True)
+    client = tusclient.client.TusClient(gi.url + '/upload/resumable_upload', headers={'x-api-key': gi.key})
+    source = {'file_path': item.path}
+    if item.content is not None:
+        data = item.content.encode() if isinstance(item.content, str) else item.content
+        source = {'file_stream': io.BytesIO(data)}
+    uploader = client.uploader(
+        **source,
+        chunk_size=chunk_size,
+        metadata={'filename': item.name},
+        retries=3,
+        retry_delay=5,
+        store_url=True,
+        url_storage=tusclient.storage.filestorage.FileStorage(storage_path),
+    )
+    uploader.upload()
+    return uploader.session_id
+
+
+def fetch_payload(history_id, items, session_ids):
+    """Build the single fetch request; session_ids maps item index -> tus session id"""
+    elements = []
+    payload = {'history_id': history_id, 'auto_decompress': False}
+    file_index = 0
+    for i, item in enumerate(items):
+        element = {'ext': item.file_type, 'dbkey': '?', 'name': item.name, 'to_posix_lines': True}
+        if i in session_ids:
+            # 'files' elements are matched to files_N|file_data in order
+            element['src'] = 'files'
+            payload[f'files_{file_index}|file_data'] = {'session_id': session_ids[i], 'name': item.name}
+            file_index += 1
+        else:
+            element['src'] = 'pasted'
+            element['paste_content'] = read_text(item)
+        elements.append(element)
+    payload['targets'] = [{'destination': {'type': 'hdas'}, 'elements': elements}]
+    return payload
+
+
+def upload_batch(gi, history_id, items, max_workers=MAX_CONCURRENCY, chunked_threshold=CHUNKED_THRESHOLD):
+    """
+    Upload all items in one fetch request.
+
+    Returns (datasets, jobs): datasets maps item name -> created dataset
+    (dict with at least 'id' and 'hid'), jobs is the list of upload job ids.
+    """
+    items = list(items)
+    large = [i for i, item in enumerate(items) if item_size(item) > chunked_threshold]
+
+    session_ids = {}
+    if large:
+        results = fetch_concurrently(lambda i: tus_upload(gi, items[i]), large, max_workers=max_workers)
+        for i, result in results.items():
+            if isinstance(result, Exception):
+                raise RuntimeError(f"Chunked upload of {items[i].name} failed: {result}") from result
+            session_ids[i] = result
+
+    payload = fetch_payload(history_id, items, session_ids)
+    response = gi.tools._post(payload, url=f"{gi.url}/tools/fetch")
+
+    outputs = response.get('outputs', [])
+    if len(outputs) != len(items):
+        raise RuntimeError(f"Fetch request created {len(outputs)} datasets for {len(items)} items")
+    datasets = {item.name: output for item, output in zip(items, outputs)}
+    jobs = [job['id'] for job in response.get('jobs', [])]
+    return datasets, jobs
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Benchmark the bioblend scripts offline against the local mock Galaxy server.
+
+Each script runs as a subprocess pointed at the mock server through
+GALAXY_URL / GALAXY_API_KEY, in a scratch directory holding copies of its
+input files. Every script is run twice in the same directory: a cold run
+(empty .cache/) and a warm run that can reuse the history and download caches.
+The mock is reset before every run, so the API call counts are comparable.
+Add --latency / --jitter to mimic a remote server and --failure-rate to
+exercise the retry paths.
+
+Before the scripts run, every collection_groups.json shipped in rnaseq/ is
+loaded with GroupIndex.from_json, so a spec the loader cannot read fails the
+run.
+"""
+
+import argparse
+import glob
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+from galaxy_utils.sample_groups import GroupIndex
+from mock_galaxy import SCRIPT_DIR, MockGalaxy, start_server
+
+LABELLING_DIR = os.path.join(SCRIPT_DIR, '..', '..', 'dataset_labelling')
+
+# (name, script path, input files copied into the scratch directory)
+SCRIPTS = [
+    ('split_collection.py', os.path.join(SCRIPT_DIR, 'split_collection.py'),
+     [os.path.join(SCRIPT_DIR, 'samples_in_vitro.tsv'), os.path.join(SCRIPT_DIR, 'samples_in_vivo.tsv')]),
+    ('apply_tags_260.py', os.path.join(LABELLING_DIR, 'apply_tags_260.py'),
+     [os.path.join(LABELLING_DIR, 'labels.tsv')]),
+    ('run_deseq2_with_tags.py', os.path.join(SCRIPT_DIR, 'run_deseq2_with_tags.py'),
+     [os.path.join(SCRIPT_DIR, 'samples.tsv')]),
+    ('resume_deseq2_jobs.py', os.path.join(SCRIPT_DIR, 'resume_deseq2_jobs.py'), []),
+]
+
+SCRIPT_TIMEOUT = 600
+
+GROUP_SPECS = os.path.join(SCRIPT_DIR, '..', '*', 'collection_groups.json')
+
+
+def check_group_specs(pattern=GROUP_SPECS):
+    """Load every shipped collection_groups.json; return the number that failed"""
+    failed = 0
+    for path in sorted(glob.glob(pattern)):
+        name = os.path.relpath(path, os.path.join(SCRIPT_DIR, '..'))
+        try:
+            index = GroupIndex.from_json(path)
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            print(f"✗ {name}: {e}")
+            failed += 1
+            continue
+        print(f"✓ {name}: {len(index.groups)} groups, {len(index.index)} accessions")
+    return failed
+
+
+def run_script(galaxy, url, script_path, workdir, verbose=False):
+    """Run one script against a freshly reset mock; return (seconds, exit code, request counts)"""
+    galaxy.reset()
+    env = dict(os.environ, GALAXY_URL=url, GALAXY_API_KEY='mock-api-key', PYTHONUNBUFFERED='1')
+    # Scripts import their sibling modules
+    env['PYTHONPATH'] = os.pathsep.join(filter(None, [os.path.dirname(script_path), env.get('PYTHONPATH')]))
+
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, script_path], cwd=workdir, env=env,
+        capture_output=True, text=True, timeout=SCRIPT_TIMEOUT
+    )
+    elapsed = time.perf_counter() - start
+
+    if verbose or result.returncode != 0:
+        print(result.stdout)
+        print(result.stderr, file=sys.stderr)
+    with galaxy.lock:
+        requests = galaxy.requests.copy()
+    return elapsed, result.returncode, requests
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the Galaxy scripts against a mock server")
+    parser.add_argument('--latency', type=float, default=0.05, help="seconds added to every request")
+    parser.add_argument('--jitter', type=float, default=0.0, help="extra random latency, up to this many seconds")
+    parser.add_argument('--failure-rate', type=float, default=0.0, help="fraction of requests answered with 503")
+    parser.add_argument('--endpoints', action='store_true', help="show the API calls per endpoint")
+    parser.add_argument('--verbose', action='store_true', help="show script output")
+    parser.add_argument('scripts', nargs='*', help="only run these scripts (default: all)")
+    args = parser.parse_args()
+
+    print(f"{'='*70}")
+    print("GROUP SPECS")
+    print(f"{'='*70}")
+    spec_failures = check_group_specs()
+
+    galaxy = MockGalaxy()
+    server, url = start_server(galaxy, latency=args.latency, jitter=args.jitter,
+                               failure_rate=args.failure_rate)
+    print(f"Mock Galaxy at {url} (latency {args.latency}s, jitter {args.jitter}s, "
+          f"failure rate {args.failure_rate:.0%})")
+
+    results = []
+    try:
+        for name, script_path, inputs in SCRIPTS:
+            if args.scripts and name not in args.scripts:
+                continue
+            with tempfile.TemporaryDirectory(prefix='galaxy_bench_') as workdir:
+                for path in inputs:
+                    shutil.copy(path, workdir)
+                for run in ('cold', 'warm'):
+                    print(f"\n{'='*70}")
+                    print(f"{name} ({run})")
+                    print(f"{'='*70}")
+                    elapsed, returncode, requests = run_script(galaxy, url, script_path, workdir, args.verbose)
+                    results.append((name, run, elapsed, returncode, requests))
+                    status = 'ok' if returncode == 0 else f'exit {returncode}'
+                    print(f"{sum(requests.values())} API calls in {elapsed:.2f}s ({status})")
+                    if args.endpoints:
+                        for endpoint, count in requests.most_common():
+                            print(f"  {count:5d}  {endpoint}")
+    finally:
+        server.shutdown()
+
+    print(f"\n{'='*70}")
+    print("SUMMARY")
+    print(f"{'='*70}")
+    print(f"{'Script':<28}{'Run':<7}{'API calls':>10}{'Wall time':>12}  Status")
+    for name, run, elapsed, returncode, requests in results:
+        status = 'ok' if returncode == 0 else f'exit {returncode}'
+        print(f"{name:<28}{run:<7}{sum(requests.values()):>10}{elapsed:>11.2f}s  {status}")
+    if spec_failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
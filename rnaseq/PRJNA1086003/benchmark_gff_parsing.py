@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Benchmark the streaming GFF3 reader against the old per-line regex parsing
+"""
+
+import os
+import re
+import sys
+import time
+
+from gff_reader import open_text, read_gff
+
+GFF_FILES = [
+    'GCA_002759435.2_genomic.gff',
+    'GCA_002759435.3_genomic.gff',
+]
+REPEATS = 5
+
+print("="*80)
+print("BENCHMARK: GFF3 PARSING (regex vs streaming reader)")
+print("="*80)
+
+def parse_regex(gff_file):
+    """Old approach: split every line, then two re.search calls per CDS line"""
+    mapping = {}
+    with open_text(gff_file) as f:
+        for line in f:
+            if line.startswith('#'):
+                continue
+            parts = line.strip().split('\t')
+            if len(parts) < 9:
+                continue
+            if parts[2] != 'CDS':
+                continue
+
+            attributes = parts[8]
+            locus_tag_match = re.search(r'locus_tag=([^;]+)', attributes)
+            protein_id_match = re.search(r'protein_id=([^;]+)', attributes)
+
+            if locus_tag_match and protein_id_match:
+                mapping[locus_tag_match.group(1)] = protein_id_match.group(1)
+    return mapping
+
+def parse_streaming(gff_file):
+    """New approach: shared streaming reader with type filtering"""
+    mapping = {}
+    for rec in read_gff(gff_file, feature_types={'CDS'}):
+        locus_tag = rec.attributes.get('locus_tag')
+        protein_id = rec.attributes.get('protein_id')
+        if locus_tag and protein_id:
+            mapping[locus_tag] = protein_id
+    return mapping
+
+def best_time(func, gff_file):
+    """Best wall time over REPEATS runs, plus the last result"""
+    timings = []
+    result = None
+    for _ in range(REPEATS):
+        t0 = time.perf_counter()
+        result = func(gff_file)
+        timings.append(time.perf_counter() - t0)
+    return min(timings), result
+
+gff_files = sys.argv[1:] or GFF_FILES
+
+for gff_file in gff_files:
+    if not os.path.exists(gff_file):
+        print(f"\n✗ {gff_file} not found, skipping")
+        continue
+
+    size_mb = os.path.getsize(gff_file) / 1e6
+    print(f"\n{gff_file} ({size_mb:.1f} MB, best of {REPEATS})")
+
+    regex_time, regex_map = best_time(parse_regex, gff_file)
+    stream_time, stream_map = best_time(parse_streaming, gff_file)
+
+    print(f"  regex:     {regex_time*1000:8.1f} ms  ({size_mb/regex_time:6.1f} MB/s)")
+    print(f"  streaming: {stream_time*1000:8.1f} ms  ({size_mb/stream_time:6.1f} MB/s)")
+    print(f"  speedup:   {regex_time/stream_time:.2f}x")
+
+    # The regex also matches inside old_locus_tag=, so results can legitimately differ
+    differing = {k for k in regex_map.keys() | stream_map.keys()
+                 if regex_map.get(k) != stream_map.get(k)}
+    print(f"  mappings:  regex={len(regex_map)} streaming={len(stream_map)} differing={len(differing)}")
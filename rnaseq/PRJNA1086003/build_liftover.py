@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Build the scored locus tag liftover between the C. auris assemblies
+
+    python build_liftover.py                                   # every assembly in liftover.ASSEMBLIES
+    python build_liftover.py GCA_002759435.2 GCA_002759435.3   # only these
+
+Stores every pair in .cache/liftover.sqlite and writes
+liftover_<source>_to_<target>.tsv per pair.
+"""
+
+import argparse
+
+from gene_ids import load_mapping
+from liftover import ASSEMBLIES, MIN_SCORE, build_liftover, save_liftover
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the locus tag liftover between assemblies")
+    parser.add_argument('accessions', nargs='*', help="assemblies to pair (default: all configured)")
+    parser.add_argument('--max-workers', type=int, default=None, help="processes (default: one per core)")
+    parser.add_argument('--min-score', type=float, default=MIN_SCORE, help="score needed to count a pair")
+    args = parser.parse_args()
+
+    print("="*80)
+    print("BUILDING LOCUS TAG LIFTOVER")
+    print("="*80)
+
+    tables = build_liftover(args.accessions or None, args.max_workers, args.min_score)
+    if not tables:
+        print("\nFewer than two assemblies have an annotation or proteome here; nothing to build.")
+        return
+    save_liftover(tables)
+
+    for (source, target), table in tables.items():
+        labels = f"{ASSEMBLIES.get(source, {}).get('label', source)} → {ASSEMBLIES.get(target, {}).get('label', target)}"
+        confident = table[table['score'] >= args.min_score]
+        print(f"\n{source} → {target} ({labels})")
+        print(f"  Pairs: {len(table)} ({len(confident)} with score >= {args.min_score})")
+        print(f"  Official: {int((table['official'] > 0).sum())}, "
+              f"identical protein: {int((table['protein'] > 0).sum())}, "
+              f"coordinate overlap: {int((table['overlap_bp'] > 0).sum())}")
+        for relation, count in confident['relation'].value_counts().sort_index().items():
+            print(f"  {relation}: {count}")
+
+        path = f'liftover_{source}_to_{target}.tsv'
+        table.to_csv(path, sep='\t', index=False)
+        print(f"✓ Saved {path}")
+
+        if (source, target) == ('GCA_002759435.2', 'GCA_002759435.3'):
+            check_official(confident)
+
+
+def check_official(table):
+    """Compare the 1:1 v2 → v3 liftover with official_mapping_v2_to_v3.tsv"""
+    mapping = load_mapping()
+    unique = table[table['relation'] == '1:1']
+    official = mapping.translate(unique['source_tag'], 'v2', 'v3')
+    agree = (official == unique['target_tag']).sum()
+    disagree = (official.notna() & (official != unique['target_tag'])).sum()
+    print(f"  Against the official mapping: {agree} agree, {disagree} disagree, "
+          f"{official.isna().sum()} not in it")
+
+
+if __name__ == "__main__":
+    main()
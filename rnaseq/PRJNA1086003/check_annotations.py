@@ -3,7 +3,9 @@
 Download and check the gene annotation file
 """
 
-from bioblend.galaxy import GalaxyInstance
+from download_manager import download_dataset
+from galaxy_utils.instrumentation import galaxy_instance
+from history_resolver import find_history
 
 # Galaxy connection
 GALAXY_URL = "https://usegalaxy.org"
@@ -13,37 +15,23 @@ ANNOTATION_HID = 87
 
 def main():
     # Connect to Galaxy
-    gi = GalaxyInstance(url=GALAXY_URL, key=API_KEY)
+    gi = galaxy_instance(GALAXY_URL, API_KEY)
 
     # Get history ID
-    histories = gi.histories.get_histories(name=HISTORY_NAME)
-    if not histories:
-        print(f"Error: History '{HISTORY_NAME}' not found")
+    resolver, history_id = find_history(gi, HISTORY_NAME)
+    if not history_id:
         return
 
-    history_id = histories[0]['id']
-    print(f"Found history: {HISTORY_NAME} (ID: {history_id})")
-
-    # Get all datasets
-    datasets = gi.histories.show_history(history_id, contents=True)
-
-    # Find annotation dataset
-    annotation_dataset = None
-    for dataset in datasets:
-        if dataset['hid'] == ANNOTATION_HID:
-            annotation_dataset = dataset
-            print(f"\nFound annotation dataset #{ANNOTATION_HID}: {dataset['name']}")
-            break
+    # Find annotation dataset by hid
+    annotation_dataset = resolver.content_by_hid(history_id, ANNOTATION_HID, content_type='dataset')
+    if annotation_dataset:
+        print(f"\nFound annotation dataset #{ANNOTATION_HID}: {annotation_dataset['name']}")
 
     if annotation_dataset:
         print(f"\nDownloading annotation file...")
         try:
-            gi.datasets.download_dataset(
-                dataset_id=annotation_dataset['id'],
-                file_path="gene_annotations.tsv",
-                use_default_filename=False
-            )
-            print("✓ Saved to: gene_annotations.tsv")
+            status = download_dataset(gi, annotation_dataset['id'], "gene_annotations.tsv")
+            print(f"✓ gene_annotations.tsv: {status}")
 
             # Show first few lines
             print("\nFirst 10 lines of annotation file:")
@@ -3,7 +3,10 @@
 Check if DESeq2 results were created and find the appropriate tool parameters.
 """
 
-from bioblend.galaxy import GalaxyInstance
+from galaxy_utils.instrumentation import galaxy_instance
+from history_resolver import find_history
+from history_snapshot import history_snapshot
+from tool_registry import DESEQ2_TOOL, ToolRegistry
 
 # Galaxy connection details
 GALAXY_URL = "https://usegalaxy.org"
@@ -12,27 +15,18 @@ HISTORY_NAME = "prjna1086003"
 
 def main():
     # Connect to Galaxy
-    gi = GalaxyInstance(url=GALAXY_URL, key=API_KEY)
+    gi = galaxy_instance(GALAXY_URL, API_KEY)
 
     # Get the history
-    all_histories = gi.histories.get_histories()
-    history = None
-    for h in all_histories:
-        if HISTORY_NAME.lower() in h['name'].lower():
-            history = h
-            break
-
-    if not history:
-        print(f"Error: History containing '{HISTORY_NAME}' not found")
+    resolver, history_id = find_history(gi, HISTORY_NAME)
+    if not history_id:
         return
 
-    history_id = history['id']
-    print(f"Found history: {history['name']} (ID: {history_id})")
-
-    # Get recent datasets to find DESeq2 outputs
-    history_contents = gi.histories.show_history(history_id, contents=True, deleted=False)
+    # DESeq2 outputs from the local snapshot (only changed items are fetched)
+    snapshot = history_snapshot(gi, history_id)
+    history_contents = snapshot.query(name='deseq')
 
-    print(f"\nRecent datasets in history (showing last 20):")
+    print("\nRecent DESeq2 datasets in history (showing last 20):")
     print(f"{'HID':<6} {'State':<10} {'Name':<60}")
     print("=" * 76)
 
@@ -49,20 +43,12 @@ def main():
             print(f"#{hid:<5} {state:<10} {name} ({item_type})")
 
     # Also check for DESeq2 tool information
-    print(f"\n\nSearching for DESeq2 tool...")
-    tools = gi.tools.get_tools(name="deseq2")
-    if tools:
-        print(f"Found {len(tools)} DESeq2 tool(s):")
-        for tool in tools[:3]:
-            print(f"  - {tool['name']} ({tool['id']})")
-
-            # Get tool details
-            try:
-                tool_details = gi.tools.show_tool(tool['id'])
-                print(f"    Version: {tool_details.get('version', 'N/A')}")
-            except:
-                pass
-    else:
+    print("\n\nSearching for DESeq2 tool...")
+    try:
+        tool = ToolRegistry(gi).resolve(DESEQ2_TOOL)
+        print(f"  - {tool['name']} ({tool['id']})")
+        print(f"    Version: {tool['version']}")
+    except LookupError:
         print("No DESeq2 tools found")
 
     # List all DESeq2-related datasets
@@ -72,5 +58,15 @@ def main():
         for ds in deseq_datasets[-10:]:  # Show last 10
             print(f"  #{ds.get('hid')}: {ds.get('name')} - {ds.get('state')}")
 
+    # States of all DESeq2 outputs, answered from the snapshot
+    print("\nDESeq2 outputs by state:")
+    for state, count in sorted(snapshot.state_counts(name='deseq').items(), key=lambda kv: str(kv[0])):
+        print(f"  {state}: {count}")
+    stalled = snapshot.query(name='deseq', states=('error', 'paused'))
+    if stalled:
+        print(f"\nDESeq2 outputs in error or paused state: {len(stalled)}")
+        for ds in stalled:
+            print(f"  #{ds.get('hid')}: {ds.get('name')} - {ds.get('state')}")
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Idempotent, content-addressed collection creation.
+
+A collection's fingerprint is a hash of its type and its sorted
+(dataset id, element identifier) pairs. Before creating a collection,
+ensure_collection looks for a live collection in the history with the same
+fingerprint and returns that instead, so rerunning split_collection.py or
+run_deseq2_with_tags.py no longer piles up identical _AR0382/_AR0387 or
+in_vitro/in_vivo collections.
+
+Fingerprints are kept per Galaxy instance and history in
+.cache/collection_fingerprints.json. A collection's elements never change,
+so each collection is read at most once; later runs cost a single listing
+of the history's live collections, which also drops deleted ones from the
+index. Collections are created with copy_elements=False so their elements
+are the source datasets themselves and the fingerprint can be recomputed
+from the server.
+"""
+
+import hashlib
+import json
+import os
+import threading
+
+from galaxy_utils.fetch import MAX_CONCURRENCY, fetch_concurrently
+from history_resolver import query_history_contents
+
+FINGERPRINT_CACHE_PATH = os.path.join('.cache', 'collection_fingerprints.json')
+
+_cache_lock = threading.Lock()
+
+
+def collection_fingerprint(collection_type, elements):
+    """Hex fingerprint of a collection; elements is an iterable of (dataset id, identifier)"""
+    digest = hashlib.sha256(collection_type.encode())
+    for dataset_id, identifier in sorted(elements):
+        digest.update(f"\0{dataset_id}\t{identifier}".encode())
+    return digest.hexdigest()
+
+
+def fingerprint_of_payload(collection_type, element_identifiers):
+    """Fingerprint of a collection about to be created from an element_identifiers payload"""
+    return collection_fingerprint(collection_type, [(e['id'], e['name']) for e in element_identifiers])
+
+
+def fingerprint_of_collection(details):
+    """Fingerprint of an existing collection from its show_dataset_collection payload"""
+    return collection_fingerprint(
+        details['collection_type'],
+        [(e['object']['id'], e['element_identifier']) for e in details.get('elements', [])]
+    )
+
+
+class FingerprintIndex:
+    """Fingerprints of the live collections of one history, cached on disk"""
+
+    def __init__(self, gi, history_id, cache_path=FINGERPRINT_CACHE_PATH):
+        self.gi = gi
+        self.history_id = history_id
+        self.cache_path = cache_path
+        # collection id -> {'fingerprint', 'name', 'hid'}
+        self.collections = self._load()
+        self._lock = threading.Lock()
+        self._refreshed = False
+
+    def _load(self):
+        try:
+            with open(self.cache_path) as f:
+                cache = json.load(f)
+        except (OSError, ValueError):
+            cache = {}
+        return cache.get(self.gi.base_url, {}).get(self.history_id, {})
+
+    def _save(self):
+        # Other histories (or processes) may share the file; merge into what is there
+        with _cache_lock:
+            try:
+                with open(self.cache_path) as f:
+                    cache = json.load(f)
+            except (OSError, ValueError):
+                cache = {}
+            cache.setdefault(self.gi.base_url, {})[self.history_id] = self.collections
+            os.makedirs(os.path.dirname(self.cache_path) or '.', exist_ok=True)
+            tmp_path = self.cache_path + '.tmp'
+            with open(tmp_path, 'w') as f:
+                json.dump(cache, f, indent=1)
+            os.replace(tmp_path, self.cache_path)
+
+    def refresh(self, max_workers=MAX_CONCURRENCY):
+        """Sync with the history: forget deleted collections, fingerprint new ones"""
+        live = query_history_contents(self.gi, self.history_id, content_type='dataset_collection')
+        live = {item['id']: item for item in live}
+        self.collections = {cid: entry for cid, entry in self.collections.items() if cid in live}
+
+        new = [cid for cid in live if cid not in self.collections]
+        fetched = fetch_concurrently(
+            lambda cid: self.gi.histories.show_dataset_collection(self.history_id, cid),
+            new, max_workers=max_workers
+        )
+        for cid, details in fetched.items():
+            # Unreadable or still-populating collections are retried on the next refresh
+            if isinstance(details, Exception) or details.get('populated_state', 'ok') != 'ok':
+                continue
+            self.collections[cid] = {
+                'fingerprint': fingerprint_of_collection(details),
+                'name': live[cid]['name'],
+                'hid': live[cid]['hid'],
+            }
+        self._save()
+
+    def find(self, fingerprint, name=None):
+        """A collection with this fingerprint ({'id', 'name', 'hid'}), preferring one called name"""
+        with self._lock:
+            if not self._refreshed:
+                self.refresh()
+                self._refreshed = True
+            found = [
+                {'id': cid, 'name': entry['name'], 'hid': entry['hid']}
+                for cid, entry in self.collections.items() if entry['fingerprint'] == fingerprint
+            ]
+        found.sort(key=lambda c: (c['name'] != name, c['hid'] or 0))
+        return found[0] if found else None
+
+    def add(self, fingerprint, collection):
+        with self._lock:
+            self.collections[collection['id']] = {
+                'fingerprint': fingerprint, 'name': collection['name'], 'hid': collection.get('hid'),
+            }
+            self._save()
+
+
+def ensure_collection(gi, history_id, name, element_identifiers, collection_type='list', index=None):
+    """
+    Return (collection, created): an existing identical collection if the
+    history has one, otherwise a newly created one. collection has at least
+    'id', 'name' and 'hid'.
+    """
+    index = index or FingerprintIndex(gi, history_id)
+    fingerprint = fingerprint_of_payload(collection_type, element_identifiers)
+    existing = index.find(fingerprint, name)
+    if existing:
+        return existing, False
+
+    collection = gi.histories.create_dataset_collection(
+        history_id=history_id,
+        collection_description={
+            'collection_type': collection_type,
+            'name': name,
+            'element_identifiers': element_identifiers,
+        },
+        copy_elements=False
+    )
+    index.add(fingerprint, collection)
+    return collection, True
@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+"""
+Creation of one Galaxy collection per sample group.
+
+Elements are matched to groups with galaxy_utils.sample_groups.GroupIndex;
+all target collections are then created in one concurrent batch, reusing
+identical ones that already exist.
+"""
+
+from collection_fingerprints import FingerprintIndex, ensure_collection
+from galaxy_utils.fetch import MAX_CONCURRENCY, fetch_concurrently
+
+
+def element_identifiers(elements, rename=None):
+    """element_identifiers payload for already-uploaded datasets"""
+    return [
+        {
+            'id': elem['object']['id'],
+            'name': rename(elem) if rename else elem['element_identifier'],
+            'src': 'hda'
+        }
+        for elem in elements
+    ]
+
+
+def create_group_collections(gi, history_id, match, names=None, collection_type='list', rename=None,
+                             max_workers=MAX_CONCURRENCY):
+    """
+    Create one collection per non-empty group, all requests in flight at once.
+
+    names maps group -> collection name (default: the group name); rename
+    optionally maps an element to its identifier in the new collection.
+    Groups whose identical collection already exists reuse it. Returns
+    {group: (collection, created)}, or the exception if creation failed.
+    """
+    names = names or {}
+    index = FingerprintIndex(gi, history_id)
+
+    def create(group):
+        return ensure_collection(
+            gi, history_id, names.get(group, group), element_identifiers(match.groups[group], rename),
+            collection_type=collection_type, index=index
+        )
+
+    # Collection creation is not idempotent, so no automatic retries
+    targets = [group for group, elements in match.groups.items() if elements]
+    return fetch_concurrently(create, targets, max_workers=max_workers, max_retries=0)
@@ -4,71 +4,76 @@ Compare protein sequences between v2 and v3 annotations to test if
 the same proteins have different gene IDs
 """
 
-from Bio import SeqIO
-from collections import defaultdict
+import numpy as np
 import pandas as pd
 
+from fasta_index import IndexedFasta
+from gene_ids import load_mapping
+from protein_fingerprints import fingerprints, join_fingerprints
+from protein_search import search_proteins
+
+ID_CHANGES_PATH = 'protein_id_changes.tsv'
+NEAR_MATCHES_PATH = 'protein_near_matches.tsv'
+V3_PROTEOME = 'GCA_002759435.3_protein.faa'
+
 print("="*80)
 print("COMPARING PROTEIN SEQUENCES BETWEEN ANNOTATION VERSIONS")
 print("="*80)
 
-def load_sequences(fasta_file):
-    """Load sequences into dict by gene_id and by sequence"""
-    by_id = {}
-    by_seq = defaultdict(list)
+mapping = load_mapping()
+id_changes = []
+v2_only_queries = {}
 
-    for rec in SeqIO.parse(fasta_file, "fasta"):
-        gene_id = rec.id
-        seq_str = str(rec.seq)
-        by_id[gene_id] = seq_str
-        by_seq[seq_str].append(gene_id)
 
-    return by_id, by_seq
-
-def compare_versions(v2_file, v3_file, description):
+def compare_versions(v2_file, v3_file, description, id_column='ids'):
     """Compare sequences between v2 and v3 annotations"""
     print(f"\n{description}")
     print("-" * 80)
 
-    v2_by_id, v2_by_seq = load_sequences(v2_file)
-    v3_by_id, v3_by_seq = load_sequences(v3_file)
-
-    print(f"  v2 sequences: {len(v2_by_id)}")
-    print(f"  v3 sequences: {len(v3_by_id)}")
+    v2_prints = fingerprints(v2_file)
+    v3_prints = fingerprints(v3_file)
 
-    # Find sequence overlaps
-    v2_seqs = set(v2_by_seq.keys())
-    v3_seqs = set(v3_by_seq.keys())
+    print(f"  v2 sequences: {len(v2_prints)}")
+    print(f"  v3 sequences: {len(v3_prints)}")
 
-    common_seqs = v2_seqs & v3_seqs
-    v2_only = v2_seqs - v3_seqs
-    v3_only = v3_seqs - v2_seqs
+    # Find sequence overlaps (one join on the sequence digests)
+    # v2 and v3 are numbered independently: expect the official v3 IDs, not the v2 ones
+    shared, counts = join_fingerprints(v2_prints, v3_prints, id_column,
+                                       translate=lambda ids: mapping.translate(ids, 'v2', 'v3'))
+    v2_distinct = counts['common'] + counts['left_only']
 
     print(f"\n  Sequence overlap:")
-    print(f"    Common sequences: {len(common_seqs)} ({len(common_seqs)/len(v2_seqs)*100:.1f}% of v2)")
-    print(f"    v2-only sequences: {len(v2_only)}")
-    print(f"    v3-only sequences: {len(v3_only)}")
-
-    # Check if gene IDs changed for common sequences
-    gene_id_changes = []
-    for seq in list(common_seqs)[:10]:  # Sample first 10
-        v2_ids = v2_by_seq[seq]
-        v3_ids = v3_by_seq[seq]
-        if v2_ids != v3_ids:
-            gene_id_changes.append((v2_ids[0], v3_ids[0]))
-
-    if gene_id_changes:
-        print(f"\n  Sample gene ID changes for identical sequences:")
-        for v2_id, v3_id in gene_id_changes[:5]:
-            print(f"    {v2_id} (v2) → {v3_id} (v3)")
+    print(f"    Common sequences: {counts['common']} ({counts['common']/v2_distinct*100:.1f}% of v2)")
+    print(f"    v2-only sequences: {counts['left_only']}")
+    print(f"    v3-only sequences: {counts['right_only']}")
+
+    # Sequences without an identical v3 copy go to the k-mer search below
+    if counts['left_only']:
+        with IndexedFasta(v2_file) as v2_fasta:
+            v2_only = ~np.isin(v2_prints.digests, v3_prints.digests)
+            for protein_id, gene_id in zip(v2_prints.ids[v2_only].tolist(),
+                                           v2_prints.labels(id_column)[v2_only].tolist()):
+                v2_only_queries[gene_id] = v2_fasta.fetch_sequence(protein_id)
+
+    # Identical sequences whose v3 IDs are not the ones the official mapping gives
+    changed = shared[shared['changed']]
+    unmapped = int((shared['expected_ids'].map(len) == 0).sum())
+    id_changes.append(changed.assign(comparison=description))
+
+    print(f"\n  Identical sequences under a different v3 ID than the official mapping: "
+          f"{len(changed)} of {len(shared)} ({unmapped} without an official v3 ID)")
+    for v2_ids, expected, v3_ids in changed[['left_ids', 'expected_ids', 'right_ids']].head(5).itertuples(index=False):
+        print(f"    {', '.join(v2_ids)} (v2): official {', '.join(expected)}, sequence on {', '.join(v3_ids)} (v3)")
 
     return {
-        'common_seqs': len(common_seqs),
-        'v2_only': len(v2_only),
-        'v3_only': len(v3_only),
-        'v2_total': len(v2_by_id),
-        'v3_total': len(v3_by_id),
-        'overlap_pct': len(common_seqs)/len(v2_seqs)*100 if v2_seqs else 0
+        'common_seqs': counts['common'],
+        'v2_only': counts['left_only'],
+        'v3_only': counts['right_only'],
+        'v2_total': len(v2_prints),
+        'v3_total': len(v3_prints),
+        'id_changes': len(changed),
+        'unmapped': unmapped,
+        'overlap_pct': counts['common']/v2_distinct*100 if v2_distinct else 0
     }
 
 # Compare all 4 combinations
@@ -110,6 +115,53 @@ res = compare_versions(
 )
 results.append(('Our in_vivo', res))
 
+print("\n" + "="*80)
+print("WHOLE PROTEOMES")
+print("="*80)
+
+# Locus tags from the headers, so renumbered genes show up as ID changes
+res = compare_versions(
+    'GCA_002759435.2_protein.faa',
+    'GCA_002759435.3_protein.faa',
+    '5. WHOLE PROTEOME: Comparing v2 vs v3',
+    id_column='locus_tags'
+)
+results.append(('Whole proteome', res))
+
+changes = pd.concat(id_changes, ignore_index=True)
+changes = changes.assign(
+    v2_ids=changes['left_ids'].str.join(','),
+    official_v3_ids=changes['expected_ids'].str.join(','),
+    v3_ids=changes['right_ids'].str.join(','),
+)
+changes[['comparison', 'digest', 'length', 'v2_ids', 'official_v3_ids', 'v3_ids']].to_csv(
+    ID_CHANGES_PATH, sep='\t', index=False)
+print(f"\n✓ Saved all {len(changes)} ID-change groups to: {ID_CHANGES_PATH}")
+
+print("\n" + "="*80)
+print("NEAR MATCHES FOR v2 PROTEINS WITHOUT AN IDENTICAL v3 SEQUENCE")
+print("="*80)
+
+# Local k-mer search against the whole v3 proteome; identity is a k-mer estimate over
+# the v2 protein only, so coverage (shorter/longer length) shows truncations and extensions
+near_matches = search_proteins(V3_PROTEOME, v2_only_queries)
+rows = []
+print(f"\n  {'v2 gene':<14}{'best v3 hit':<14}{'~identity':>10}{'v2 aa':>7}{'v3 aa':>7}{'coverage':>10}"
+      f"  official v3")
+for gene_id, hits in near_matches.items():
+    official = mapping.get(gene_id, 'v2', 'v3', default='-')
+    best = hits[0] if hits else None
+    if best:
+        print(f"  {gene_id:<14}{best.locus_tag or best.target:<14}{best.identity:>10.0%}{best.query_length:>7}"
+              f"{best.target_length:>7}{best.coverage:>10.0%}  {official}")
+    else:
+        print(f"  {gene_id:<14}{'no hit':<14}{'-':>10}{len(v2_only_queries[gene_id]):>7}{'-':>7}{'-':>10}"
+              f"  {official}")
+    rows.extend(hit._asdict() | {'official_v3': official} for hit in hits)
+
+pd.DataFrame(rows).to_csv(NEAR_MATCHES_PATH, sep='\t', index=False)
+print(f"\n✓ Saved {len(rows)} hits for {len(near_matches)} proteins to: {NEAR_MATCHES_PATH}")
+
 print("\n" + "="*80)
 print("SUMMARY")
 print("="*80)
@@ -118,3 +170,5 @@ for name, res in results:
     print(f"\n{name}:")
     print(f"  Sequence overlap: {res['overlap_pct']:.1f}%")
     print(f"  Common: {res['common_seqs']}, v2-only: {res['v2_only']}, v3-only: {res['v3_only']}")
+    print(f"  Common sequences on a different v3 ID than the official mapping: {res['id_changes']} "
+          f"({res['unmapped']} without an official v3 ID)")
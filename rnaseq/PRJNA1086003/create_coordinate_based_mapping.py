@@ -3,121 +3,45 @@
 Create gene ID mapping between v2 and v3 based on genomic coordinates
 """
 
-import re
-from collections import defaultdict
+from annotation_index import cds_features
+from interval_overlap import partition, match_features, find_multi_matches
 
 print("="*80)
 print("CREATING COORDINATE-BASED GENE MAPPING")
 print("="*80)
 
-def parse_gff_coordinates(gff_file):
-    """Extract gene coordinates and locus_tags from GFF"""
-    genes = []
-
-    with open(gff_file) as f:
-        for line in f:
-            if line.startswith('#'):
-                continue
-            parts = line.strip().split('\t')
-            if len(parts) < 9:
-                continue
-
-            # We want CDS features
-            feature_type = parts[2]
-            if feature_type != 'CDS':
-                continue
-
-            seqid = parts[0]  # chromosome/contig
-            start = int(parts[3])
-            end = int(parts[4])
-            strand = parts[6]
-            attributes = parts[8]
-
-            # Extract locus_tag
-            locus_tag_match = re.search(r'locus_tag=([^;]+)', attributes)
-            if locus_tag_match:
-                locus_tag = locus_tag_match.group(1)
-                genes.append({
-                    'locus_tag': locus_tag,
-                    'seqid': seqid,
-                    'start': start,
-                    'end': end,
-                    'strand': strand,
-                    'midpoint': (start + end) // 2
-                })
-
-    return genes
-
-print("\nParsing v2 annotation...")
-v2_genes = parse_gff_coordinates('GCA_002759435.2_genomic.gff')
+# CDS coordinates come from the annotation index (built from the GFFs once)
+print("\nLoading v2 annotation...")
+v2_genes = cds_features('GCA_002759435.2')
 print(f"  Found {len(v2_genes)} CDS features")
 
-print("\nParsing v3 annotation...")
-v3_genes = parse_gff_coordinates('GCA_002759435.3_genomic.gff')
+print("\nLoading v3 annotation...")
+v3_genes = cds_features('GCA_002759435.3')
 print(f"  Found {len(v3_genes)} CDS features")
 
-# Group by chromosome for faster matching
-print("\nGrouping genes by chromosome...")
-v2_by_chr = defaultdict(list)
-for gene in v2_genes:
-    v2_by_chr[gene['seqid']].append(gene)
+# Group by chromosome and strand; the overlap engine joins matching partitions
+print("\nGrouping genes by chromosome and strand...")
+v2_by_chr = partition(v2_genes)
+v3_by_chr = partition(v3_genes)
 
-v3_by_chr = defaultdict(list)
-for gene in v3_genes:
-    v3_by_chr[gene['seqid']].append(gene)
+print(f"  v2 partitions: {len(v2_by_chr)} ({len({seqid for seqid, _ in v2_by_chr})} chromosomes)")
+print(f"  v3 partitions: {len(v3_by_chr)} ({len({seqid for seqid, _ in v3_by_chr})} chromosomes)")
 
-print(f"  v2 chromosomes: {list(v2_by_chr.keys())[:5]}...")
-print(f"  v3 chromosomes: {list(v3_by_chr.keys())[:5]}...")
-
-# Match genes based on overlapping coordinates
+# Match genes based on overlapping coordinates (sweep-line join per partition)
+# A match needs >50% overlap of the shorter gene
 print("\nMatching genes by coordinates...")
-mapping_v2_to_v3 = {}
-mapping_v3_to_v2 = {}
-matched = 0
-unmatched_v2 = 0
-
-for v2_gene in v2_genes:
-    chr = v2_gene['seqid']
-    v2_start = v2_gene['start']
-    v2_end = v2_gene['end']
-    v2_strand = v2_gene['strand']
-
-    # Find overlapping v3 genes on same chromosome and strand
-    best_match = None
-    best_overlap = 0
-
-    if chr in v3_by_chr:
-        for v3_gene in v3_by_chr[chr]:
-            # Must be on same strand
-            if v3_gene['strand'] != v2_strand:
-                continue
-
-            # Calculate overlap
-            overlap_start = max(v2_start, v3_gene['start'])
-            overlap_end = min(v2_end, v3_gene['end'])
-            overlap = max(0, overlap_end - overlap_start + 1)
-
-            if overlap > best_overlap:
-                best_overlap = overlap
-                best_match = v3_gene
-
-    # Consider it a match if there's significant overlap (>50% of shorter gene)
-    if best_match:
-        v2_len = v2_end - v2_start + 1
-        v3_len = best_match['end'] - best_match['start'] + 1
-        min_len = min(v2_len, v3_len)
-
-        if best_overlap / min_len > 0.5:  # At least 50% overlap
-            mapping_v2_to_v3[v2_gene['locus_tag']] = best_match['locus_tag']
-            mapping_v3_to_v2[best_match['locus_tag']] = v2_gene['locus_tag']
-            matched += 1
-        else:
-            unmatched_v2 += 1
-    else:
-        unmatched_v2 += 1
+best_matches, matched_pairs = match_features(v2_genes, v3_genes, min_fraction=0.5)
+
+mapping_v2_to_v3 = {v2_id: v3_id for v2_id, (v3_id, _) in best_matches.items()}
+one_to_many, many_to_one = find_multi_matches(matched_pairs)
+
+matched = len(mapping_v2_to_v3)
+unmatched_v2 = len({gene.locus_tag for gene in v2_genes}) - matched
 
 print(f"  Matched: {matched} genes")
 print(f"  Unmatched v2: {unmatched_v2} genes")
+print(f"  One-to-many (v2 → several v3): {len(one_to_many)}")
+print(f"  Many-to-one (several v2 → v3): {len(many_to_one)}")
 
 # Show some examples
 print("\n" + "-"*80)
@@ -133,7 +57,18 @@ with open('coordinate_based_mapping_v2_to_v3.tsv', 'w') as f:
     for v2_id, v3_id in sorted(mapping_v2_to_v3.items()):
         f.write(f"{v2_id}\t{v3_id}\n")
 
-print(f"✓ Saved to: coordinate_based_mapping_v2_to_v3.tsv")
+print("✓ Saved to: coordinate_based_mapping_v2_to_v3.tsv")
+
+# Save ambiguous matches instead of letting later hits overwrite earlier ones
+with open('coordinate_based_mapping_ambiguous.tsv', 'w') as f:
+    f.write("Gene_ID_v2\tGene_ID_v3\tOverlap_bp\tRelation\n")
+    for v2_id, v3_id, overlap in sorted(matched_pairs):
+        if v2_id in one_to_many:
+            f.write(f"{v2_id}\t{v3_id}\t{overlap}\tone-to-many\n")
+        if v3_id in many_to_one:
+            f.write(f"{v2_id}\t{v3_id}\t{overlap}\tmany-to-one\n")
+
+print("✓ Saved to: coordinate_based_mapping_ambiguous.tsv")
 
 # Test with our known genes
 print("\n" + "="*80)
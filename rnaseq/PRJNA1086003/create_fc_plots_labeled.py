@@ -9,6 +9,8 @@ import matplotlib.pyplot as plt
 from scipy import stats
 from adjustText import adjust_text
 
+from gene_ids import load_mapping, report_problems
+
 print("="*80)
 print("CREATING LABELED FOLD CHANGE COMPARISON PLOTS")
 print("="*80)
@@ -30,14 +32,18 @@ vivo_comp = pd.read_csv('vivo_deg_comparison.tsv', sep='\t')
 print(f"  In vitro: {len(vitro_comp)} overlapping DEGs")
 print(f"  In vivo: {len(vivo_comp)} overlapping DEGs")
 
-# Load official mapping to get gene names
-v2_to_v3 = pd.read_csv('official_mapping_v2_to_v3.tsv', sep='\t')
-
-# Key genes to highlight
+# Key genes to highlight, named by their v2 IDs in the paper
+mapping = load_mapping()
+key_genes_v2 = {
+    'B9J08_004109': 'SCF1/IFF4109',
+    'B9J08_004112': 'ALS4112',
+    'B9J08_001458': 'B9J08_001458',  # Top DEG
+}
+# Key genes without a single v3 counterpart are reported and left unhighlighted
+report_problems(list(key_genes_v2), mapping, 'v2', "key genes")
 key_genes = {
-    'B9J08_04863': 'SCF1/IFF4109',
-    'B9J08_04866': 'ALS4112',
-    'B9J08_03708': 'B9J08_001458',  # Top DEG
+    mapping.get(gene_v2, 'v2', 'v3'): label for gene_v2, label in key_genes_v2.items()
+    if mapping.get(gene_v2, 'v2', 'v3') is not None
 }
 
 def create_labeled_fc_plot(data, title, output_file, experiment, n_labels=15):
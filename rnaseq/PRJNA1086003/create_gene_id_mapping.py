@@ -1,28 +1,15 @@
 #!/usr/bin/env python3
 """
-Create gene ID mapping between annotation versions based on genomic coordinates
-Since v2 uses 6-digit IDs and v3 uses 5-digit IDs, we need to map them
+Create gene ID mapping between annotation versions for the paper's genes
+v2 and v3 locus tags are numbered independently, so IDs are translated with
+the official NCBI mapping rather than by re-padding the number
 """
 
 import pandas as pd
 
-# For now, let's create a simple normalization function and apply it to paper's data
-def normalize_gene_id_v2_to_v3(gene_id_v2):
-    """
-    Convert v2 6-digit gene IDs to v3 5-digit gene IDs
-    B9J08_001458 -> B9J08_01458
-    B9J08_004112 -> B9J08_04112
-    """
-    if not isinstance(gene_id_v2, str):
-        return gene_id_v2
-
-    parts = gene_id_v2.split('_')
-    if len(parts) == 2 and parts[0] == 'B9J08':
-        # Remove leading zeros but keep at least the number itself
-        numeric = parts[1].lstrip('0') or '0'
-        # Pad to 5 digits
-        return f"B9J08_{numeric.zfill(5)}"
-    return gene_id_v2
+from gene_ids import load_mapping, report_problems
+
+mapping_v2_v3 = load_mapping()
 
 # Load paper's supplementary data
 print("Loading paper's in vitro data...")
@@ -37,7 +24,8 @@ paper_vitro_data['LFC'] = pd.to_numeric(paper_vitro_data['LFC'], errors='coerce'
 paper_vitro_data['FDR'] = pd.to_numeric(paper_vitro_data['FDR'], errors='coerce')
 
 # Create v3 gene IDs
-paper_vitro_data['Gene_ID_v3'] = paper_vitro_data['Gene_ID_v2'].apply(normalize_gene_id_v2_to_v3)
+report_problems(paper_vitro_data['Gene_ID_v2'].dropna(), mapping_v2_v3, 'v2', "paper IDs")
+paper_vitro_data['Gene_ID_v3'] = mapping_v2_v3.translate(paper_vitro_data['Gene_ID_v2'], 'v2', 'v3')
 
 # Save mapping
 mapping = paper_vitro_data[['Gene_ID_v2', 'Gene_ID_v3', 'Gene_name']].drop_duplicates()
@@ -51,5 +39,5 @@ print(mapping.head(10).to_string(index=False))
 key_genes_v2 = ['B9J08_001458', 'B9J08_004112', 'B9J08_004109']
 print(f"\nKey gene mappings:")
 for gene_v2 in key_genes_v2:
-    gene_v3 = normalize_gene_id_v2_to_v3(gene_v2)
+    gene_v3 = mapping_v2_v3.get(gene_v2, 'v2', 'v3', 'NOT_MAPPED')
     print(f"  {gene_v2} -> {gene_v3}")
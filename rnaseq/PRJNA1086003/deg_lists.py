@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Vectorized DEG-list builder with v2 <-> v3 gene ID translation.
+
+All result tables are stacked into one frame, thresholded with boolean masks
+and translated with gene_ids against the official mapping, so a threshold
+sweep over many genome-wide contrasts costs a few pandas operations rather
+than one Python loop iteration per gene.
+"""
+
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+from gene_ids import MAPPING_PATH, load_mapping
+
+# One input table: name, frame, gene ID column, annotation version of that column
+# ('v2' or 'v3'), log2 fold change column and adjusted p-value column. Tables
+# without a padj_col are already DEG lists (e.g. the paper's) and are not thresholded.
+DegTable = namedtuple('DegTable', ['name', 'df', 'id_col', 'version', 'lfc_col', 'padj_col'],
+                      defaults=(None,))
+
+OUTPUT_COLUMNS = ['Gene_ID_v2', 'Gene_ID_v3', 'log2FoldChange']
+
+
+def load_official_mapping(path=MAPPING_PATH):
+    """Load the official v2 <-> v3 mapping (a gene_ids.GeneIdMapping)"""
+    return load_mapping(path)
+
+
+def stack_tables(tables):
+    """Stack DegTable inputs into one long frame with normalized column names"""
+    frames = []
+    for table in tables:
+        if table.padj_col is None:
+            padj = np.nan
+        else:
+            padj = pd.to_numeric(table.df[table.padj_col], errors='coerce').to_numpy()
+        frames.append(pd.DataFrame({
+            'table': table.name,
+            'version': table.version,
+            'thresholded': table.padj_col is not None,
+            'gene_id': table.df[table.id_col].astype(str).to_numpy(),
+            'log2FoldChange': pd.to_numeric(table.df[table.lfc_col], errors='coerce').to_numpy(),
+            'padj': padj,
+        }))
+    return pd.concat(frames, ignore_index=True)
+
+
+def significant_mask(df, lfc_threshold=1.0, padj_threshold=0.01):
+    """Boolean mask for |LFC| >= lfc_threshold and padj < padj_threshold (unthresholded tables pass)"""
+    passes = (np.abs(df['log2FoldChange']) >= lfc_threshold) & (df['padj'] < padj_threshold)
+    return passes | ~df['thresholded']
+
+
+def translate(df, mapping):
+    """Fill Gene_ID_v2 / Gene_ID_v3 for every row from its own version's gene_id"""
+    is_v2 = df['version'] == 'v2'
+    df['Gene_ID_v2'] = df['gene_id'].where(is_v2, mapping.translate(df['gene_id'], 'v3', 'v2'))
+    df['Gene_ID_v3'] = df['gene_id'].where(~is_v2, mapping.translate(df['gene_id'], 'v2', 'v3'))
+    return df
+
+
+def build_deg_lists(tables, mapping, lfc_threshold=1.0, padj_threshold=0.01):
+    """
+    Threshold and translate several DEG tables in one pass.
+
+    Returns (deg_lists, unmapped): deg_lists maps table name -> frame with
+    Gene_ID_v2, Gene_ID_v3 and log2FoldChange ('NA' where no mapping exists);
+    unmapped holds the significant rows whose ID has no single official
+    counterpart, with a status of 'unmapped' or 'one-to-many'.
+    """
+    stacked = stack_tables(tables)
+    significant = stacked[significant_mask(stacked, lfc_threshold, padj_threshold)].copy()
+    significant = translate(significant, mapping)
+
+    missing = significant['Gene_ID_v2'].isna() | significant['Gene_ID_v3'].isna()
+    unmapped = significant.loc[missing, ['table', 'version', 'gene_id', 'log2FoldChange', 'padj']]
+    is_v2 = unmapped['version'] == 'v2'
+    unmapped['status'] = mapping.status(unmapped['gene_id'], 'v2').where(
+        is_v2, mapping.status(unmapped['gene_id'], 'v3'))
+
+    significant[['Gene_ID_v2', 'Gene_ID_v3']] = significant[['Gene_ID_v2', 'Gene_ID_v3']].fillna('NA')
+    groups = dict(tuple(significant.groupby('table', sort=False)))
+    empty = pd.DataFrame(columns=OUTPUT_COLUMNS)
+    deg_lists = {
+        table.name: groups[table.name][OUTPUT_COLUMNS].reset_index(drop=True)
+        if table.name in groups else empty.copy()
+        for table in tables
+    }
+    return deg_lists, unmapped.reset_index(drop=True)
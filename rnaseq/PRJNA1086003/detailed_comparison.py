@@ -6,6 +6,8 @@ Detailed comparison with paper's supplementary data
 import pandas as pd
 import numpy as np
 
+from gene_ids import load_mapping, report_problems
+
 # Thresholds
 LFC_THRESHOLD = 1.0
 PADJ_THRESHOLD = 0.01
@@ -44,17 +46,6 @@ def parse_paper_data(file_path, experiment_name):
 
     return df
 
-def normalize_gene_id(gene_id):
-    """Normalize gene ID to 5-digit format"""
-    # B9J08_001458 -> B9J08_01458 (5 digits)
-    # B9J08_1458 -> B9J08_01458 (pad to 5 digits)
-    parts = gene_id.split('_')
-    if len(parts) == 2:
-        # Ensure 5-digit format (standard for C. auris)
-        numeric_part = parts[1].lstrip('0') or '0'  # Remove leading zeros
-        return f"{parts[0]}_{numeric_part.zfill(5)}"  # Pad to 5 digits
-    return gene_id
-
 def compare_gene_lists(our_results_file, paper_df, experiment_name, reversed_comparison=True):
     """Compare our gene list with paper's gene list"""
     print(f"\n{'='*80}")
@@ -88,7 +79,11 @@ def compare_gene_lists(our_results_file, paper_df, experiment_name, reversed_com
     if paper_genes_raw[0] == 'Gene_ID':
         paper_genes_raw = paper_genes_raw[1:]
 
-    paper_genes = set(normalize_gene_id(str(g)) for g in paper_genes_raw)
+    # Paper IDs are v2 locus tags; translate them with the official mapping
+    mapping = load_mapping()
+    paper_genes_raw = pd.Series(paper_genes_raw).astype(str)
+    report_problems(paper_genes_raw, mapping, 'v2', "paper IDs")
+    paper_genes = set(mapping.translate(paper_genes_raw, 'v2', 'v3').dropna())
     our_genes = set(our_sig['GeneID'])
 
     print(f"\nOverlap analysis:")
@@ -121,13 +116,17 @@ def compare_gene_lists(our_results_file, paper_df, experiment_name, reversed_com
 
     # Check specific key genes
     print(f"\nKey adhesin genes (SCF1, ALS4112, IFF4109):")
-    key_genes_normalized = ['B9J08_01458', 'B9J08_04112', 'B9J08_04109']
+    key_genes_v2 = ['B9J08_001458', 'B9J08_004112', 'B9J08_004109']
+    key_genes_v3 = mapping.translate(key_genes_v2, 'v2', 'v3')
 
-    for gene_id in key_genes_normalized:
+    for gene_v2, gene_id in zip(key_genes_v2, key_genes_v3):
+        if pd.isna(gene_id):
+            print(f"\n{gene_v2}: NOT_MAPPED (no single official v3 ID)")
+            continue
         in_paper = gene_id in paper_genes
         our_gene = our_df[our_df['GeneID'] == gene_id]
 
-        print(f"\n{gene_id}:")
+        print(f"\n{gene_id} ({gene_v2}):")
         print(f"  In paper's list: {in_paper}")
 
         if len(our_gene) > 0:
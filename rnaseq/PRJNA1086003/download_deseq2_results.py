@@ -3,7 +3,9 @@
 Download DESeq2 results from Galaxy for comparison with paper
 """
 
-from bioblend.galaxy import GalaxyInstance
+from download_manager import download_datasets
+from galaxy_utils.instrumentation import galaxy_instance
+from history_resolver import find_history
 
 # Galaxy connection
 GALAXY_URL = "https://usegalaxy.org"
@@ -16,63 +18,37 @@ DESEQ2_IN_VIVO_HID = 673
 
 def main():
     # Connect to Galaxy
-    gi = GalaxyInstance(url=GALAXY_URL, key=API_KEY)
+    gi = galaxy_instance(GALAXY_URL, API_KEY)
 
     # Get history ID
-    histories = gi.histories.get_histories(name=HISTORY_NAME)
-    if not histories:
-        print(f"Error: History '{HISTORY_NAME}' not found")
+    resolver, history_id = find_history(gi, HISTORY_NAME)
+    if not history_id:
         return
 
-    history_id = histories[0]['id']
-    print(f"Found history: {HISTORY_NAME} (ID: {history_id})")
-
-    # Get all datasets in the history
-    print("\nRetrieving datasets from history...")
-    datasets = gi.histories.show_history(history_id, contents=True)
-
     # Find datasets by their history item number (hid)
-    in_vitro_dataset = None
-    in_vivo_dataset = None
+    print("\nLooking up datasets in history...")
+    in_vitro_dataset = resolver.content_by_hid(history_id, DESEQ2_IN_VITRO_HID, content_type='dataset')
+    if in_vitro_dataset:
+        print(f"Found in vitro dataset #{DESEQ2_IN_VITRO_HID}: {in_vitro_dataset['name']}")
 
-    for dataset in datasets:
-        if dataset['hid'] == DESEQ2_IN_VITRO_HID:
-            in_vitro_dataset = dataset
-            print(f"Found in vitro dataset #{DESEQ2_IN_VITRO_HID}: {dataset['name']}")
-        elif dataset['hid'] == DESEQ2_IN_VIVO_HID:
-            in_vivo_dataset = dataset
-            print(f"Found in vivo dataset #{DESEQ2_IN_VIVO_HID}: {dataset['name']}")
+    in_vivo_dataset = resolver.content_by_hid(history_id, DESEQ2_IN_VIVO_HID, content_type='dataset')
+    if in_vivo_dataset:
+        print(f"Found in vivo dataset #{DESEQ2_IN_VIVO_HID}: {in_vivo_dataset['name']}")
 
-    # Download in vitro results
+    # Download both tables concurrently; unchanged files are skipped
+    targets = {}
     if in_vitro_dataset:
-        print(f"\nDownloading in vitro DESeq2 results...")
-        try:
-            gi.datasets.download_dataset(
-                dataset_id=in_vitro_dataset['id'],
-                file_path="deseq2_in_vitro_results.tsv",
-                use_default_filename=False
-            )
-            print("✓ Saved to: deseq2_in_vitro_results.tsv")
-        except Exception as e:
-            print(f"Error downloading in vitro dataset: {e}")
+        targets["deseq2_in_vitro_results.tsv"] = in_vitro_dataset['id']
     else:
         print(f"Error: Could not find dataset #{DESEQ2_IN_VITRO_HID}")
-
-    # Download in vivo results
     if in_vivo_dataset:
-        print(f"\nDownloading in vivo DESeq2 results...")
-        try:
-            gi.datasets.download_dataset(
-                dataset_id=in_vivo_dataset['id'],
-                file_path="deseq2_in_vivo_results.tsv",
-                use_default_filename=False
-            )
-            print("✓ Saved to: deseq2_in_vivo_results.tsv")
-        except Exception as e:
-            print(f"Error downloading in vivo dataset: {e}")
+        targets["deseq2_in_vivo_results.tsv"] = in_vivo_dataset['id']
     else:
         print(f"Error: Could not find dataset #{DESEQ2_IN_VIVO_HID}")
 
+    print(f"\nDownloading {len(targets)} DESeq2 result tables...")
+    download_datasets(gi, targets)
+
     print("\nDownload complete!")
 
 if __name__ == "__main__":
@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+"""
+Parallel, resumable Galaxy dataset downloads.
+
+Each dataset is streamed to <path>.part in chunks and renamed into place only
+once complete; after a dropped connection the transfer resumes from the end of
+the .part file with an HTTP Range request (or restarts if the server ignores
+Range). <path>.part.json records which dataset version the .part holds, and a
+.part left from another dataset or an older version is discarded, not resumed.
+A file is skipped when its local checksum matches the server's hash, or, for
+datasets without a server-side hash, the checksum recorded in
+.cache/downloads.json when it was last downloaded for the same dataset
+version. Re-running after a partial failure therefore only fetches what is
+missing.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+
+import requests
+from bioblend import ConnectionError as GalaxyConnectionError
+
+from galaxy_utils.fetch import MAX_CONCURRENCY, RETRY_STATUS, call_with_backoff, fetch_concurrently
+from galaxy_utils.session import galaxy_session
+
+MANIFEST_PATH = os.path.join('.cache', 'downloads.json')
+
+CHUNK_SIZE = 1 << 20
+
+# (connect, read) timeout used when the GalaxyInstance has none
+DOWNLOAD_TIMEOUT = (30, 300)
+
+# Galaxy hash_function names -> hashlib names
+HASH_FUNCTIONS = {'MD5': 'md5', 'SHA-1': 'sha1', 'SHA-256': 'sha256', 'SHA-512': 'sha512'}
+
+_manifest_lock = threading.Lock()
+# download_dataset retries and resumes by itself, so the pool does not retry
+_session = galaxy_session(pool_size=MAX_CONCURRENCY, retries=0)
+
+
+def file_digest(path, algorithm='md5'):
+    """Hex digest of a local file, read in chunks"""
+    digest = hashlib.new(algorithm)
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def load_manifest(manifest_path=MANIFEST_PATH):
+    try:
+        with open(manifest_path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def record_download(path, entry, manifest_path=MANIFEST_PATH):
+    """Remember what was downloaded to path (thread-safe)"""
+    with _manifest_lock:
+        manifest = load_manifest(manifest_path)
+        manifest[os.path.abspath(path)] = entry
+        os.makedirs(os.path.dirname(manifest_path) or '.', exist_ok=True)
+        tmp_path = manifest_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(manifest, f, indent=1)
+        os.replace(tmp_path, manifest_path)
+
+
+def expected_checksum(dataset, path, manifest):
+    """(hashlib algorithm, hex digest) the local file should have, or None if unknown"""
+    for entry in dataset.get('hashes') or []:
+        algorithm = HASH_FUNCTIONS.get(entry.get('hash_function'))
+        if algorithm:
+            return algorithm, entry['hash_value']
+
+    recorded = manifest.get(os.path.abspath(path))
+    if (recorded and recorded.get('dataset_id') == dataset['id']
+            and recorded.get('update_time') == dataset.get('update_time')
+            and recorded.get('file_size') == dataset.get('file_size')):
+        return 'md5', recorded['md5']
+    return None
+
+
+def is_up_to_date(dataset, path, manifest):
+    """True if path already holds this dataset's content"""
+    if not os.path.exists(path):
+        return False
+    if dataset.get('file_size') is not None and os.path.getsize(path) != dataset['file_size']:
+        return False
+    checksum = expected_checksum(dataset, path, manifest)
+    return checksum is not None and file_digest(path, checksum[0]) == checksum[1]
+
+
+def stream_to_part(gi, url, part_path):
+    """Append the rest of url to part_path, resuming with a Range request"""
+    offset = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+    headers = dict(gi.json_headers)
+    # Range offsets count stored bytes, so a compressed transfer could not be resumed
+    headers['Accept-Encoding'] = 'identity'
+    if offset:
+        headers['Range'] = f'bytes={offset}-'
+
+    status = None
+    received = 0
+    error = None
+    start = time.perf_counter()
+    try:
+        timeout = gi.timeout or DOWNLOAD_TIMEOUT
+        with _session.get(url, headers=headers, stream=True, timeout=timeout, verify=gi.verify) as r:
+            status = r.status_code
+            if r.status_code == 416:
+                # Nothing left to fetch; the .part is already complete
+                return
+            if r.status_code in RETRY_STATUS:
+                raise GalaxyConnectionError(f"HTTP {r.status_code} for {url}", status_code=r.status_code)
+            r.raise_for_status()
+
+            # 200 means the server ignored Range and sent everything again
+            mode = 'ab' if r.status_code == 206 else 'wb'
+            with open(part_path, mode) as f:
+                for chunk in r.iter_content(chunk_size=CHUNK_SIZE):
+                    f.write(chunk)
+                    received += len(chunk)
+    except (requests.exceptions.ChunkedEncodingError, requests.exceptions.ReadTimeout) as e:
+        # A dropped stream is retried like a dropped connection, from where it stopped
+        error = str(e)
+        raise requests.exceptions.ConnectionError(str(e)) from e
+    except Exception as e:
+        error = str(e)
+        raise
+    finally:
+        # Downloads bypass bioblend, so report them to an instrumented client directly
+        if hasattr(gi, 'record_call'):
+            gi.record_call('GET', url, status, time.perf_counter() - start,
+                           response_bytes=received, error=error and error[:200])
+
+
+def dataset_version(dataset):
+    """What a .part file must have been downloaded from for it to be resumed"""
+    return {key: dataset.get(key) for key in ('id', 'update_time', 'file_size')}
+
+
+def prepare_part(dataset, part_path):
+    """Keep part_path only if it holds this dataset version; record the version for later resumes"""
+    info_path = part_path + '.json'
+    if os.path.exists(part_path):
+        try:
+            with open(info_path) as f:
+                resumable = json.load(f) == dataset_version(dataset)
+        except (OSError, ValueError):
+            resumable = False
+        if not resumable:
+            os.remove(part_path)
+    with open(info_path, 'w') as f:
+        json.dump(dataset_version(dataset), f)
+
+
+def remove_part(part_path):
+    for stale in (part_path, part_path + '.json'):
+        if os.path.exists(stale):
+            os.remove(stale)
+
+
+def download_dataset(gi, dataset_id, path, manifest=None):
+    """
+    Download one dataset to path unless it is already there.
+
+    Returns 'skipped' or 'downloaded'; raises on failure, leaving the .part
+    file in place for the next attempt to resume from.
+    """
+    manifest = load_manifest() if manifest is None else manifest
+    dataset = call_with_backoff(gi.datasets.show_dataset, dataset_id)
+    if dataset['state'] != 'ok':
+        raise RuntimeError(f"Dataset {dataset_id} is in state '{dataset['state']}'")
+    if is_up_to_date(dataset, path, manifest):
+        return 'skipped'
+
+    file_ext = dataset.get('file_ext')
+    if not file_ext or file_ext in ('auto', '_sniff_'):
+        file_ext = 'data'
+    url = f"{gi.base_url}{dataset['download_url']}?to_ext={file_ext}"
+
+    part_path = path + '.part'
+    prepare_part(dataset, part_path)
+    call_with_backoff(stream_to_part, gi, url, part_path)
+
+    size = os.path.getsize(part_path)
+    if dataset.get('file_size') is not None and size != dataset['file_size']:
+        remove_part(part_path)
+        raise RuntimeError(f"Size mismatch for {path}: got {size}, expected {dataset['file_size']}")
+    checksum = expected_checksum(dataset, path, {})
+    if checksum and file_digest(part_path, checksum[0]) != checksum[1]:
+        remove_part(part_path)
+        raise RuntimeError(f"Checksum mismatch for {path}")
+
+    os.replace(part_path, path)
+    remove_part(part_path)
+    record_download(path, {
+        'dataset_id': dataset_id,
+        'update_time': dataset.get('update_time'),
+        'file_size': dataset.get('file_size'),
+        'md5': file_digest(path, 'md5'),
+    })
+    return 'downloaded'
+
+
+def download_datasets(gi, targets, max_workers=MAX_CONCURRENCY):
+    """
+    Download {local path: dataset id} concurrently.
+
+    Returns a dict of path -> 'downloaded' / 'skipped', or the exception for
+    paths that failed.
+    """
+    manifest = load_manifest()
+
+    def download_one(path):
+        try:
+            status = download_dataset(gi, targets[path], path, manifest)
+        except Exception as e:
+            print(f"  ✗ {path}: {e}")
+            raise
+        print(f"  {'=' if status == 'skipped' else '✓'} {path}: {status}")
+        return status
+
+    # download_dataset retries internally; a second layer would only repeat failures
+    return fetch_concurrently(download_one, list(targets), max_workers=max_workers, max_retries=0)
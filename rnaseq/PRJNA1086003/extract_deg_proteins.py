@@ -8,14 +8,17 @@ from Bio import SeqIO
 from Bio.Seq import Seq
 from Bio.SeqRecord import SeqRecord
 
+from fasta_index import IndexedFasta
+
 print("="*80)
 print("EXTRACTING PROTEIN SEQUENCES FOR DEGs")
 print("="*80)
 
 # Load protein sequences
 print("\nLoading protein sequences...")
-v2_proteins = {rec.id.split()[0]: rec for rec in SeqIO.parse("GCA_002759435.2_protein.faa", "fasta")}
-v3_proteins = {rec.id.split()[0]: rec for rec in SeqIO.parse("GCA_002759435.3_protein.faa", "fasta")}
+# Indexed stores read only the records we ask for instead of the whole proteome
+v2_proteins = IndexedFasta("GCA_002759435.2_protein.faa")
+v3_proteins = IndexedFasta("GCA_002759435.3_protein.faa")
 
 print(f"  v2 proteins loaded: {len(v2_proteins)}")
 print(f"  v3 proteins loaded: {len(v3_proteins)}")
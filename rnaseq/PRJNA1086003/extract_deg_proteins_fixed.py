@@ -6,40 +6,19 @@ Extract protein sequences for DEGs using GFF mapping
 import pandas as pd
 from Bio import SeqIO
 from Bio.SeqRecord import SeqRecord
-import re
+
+from annotation_index import locus_tag_to_protein_id
+from fasta_index import IndexedFasta
 
 print("="*80)
 print("EXTRACTING PROTEIN SEQUENCES FOR DEGs (with GFF mapping)")
 print("="*80)
 
-# Parse GFF to get locus_tag -> protein_id mapping
-def parse_gff_mapping(gff_file):
-    """Extract locus_tag to protein_id mapping from GFF"""
-    mapping = {}
-    print(f"\nParsing {gff_file}...")
-
-    with open(gff_file) as f:
-        for line in f:
-            if line.startswith('#'):
-                continue
-            parts = line.strip().split('\t')
-            if len(parts) < 9:
-                continue
-
-            feature_type = parts[2]
-            if feature_type != 'CDS':
-                continue
-
-            attributes = parts[8]
-
-            # Extract locus_tag and protein_id
-            locus_tag_match = re.search(r'locus_tag=([^;]+)', attributes)
-            protein_id_match = re.search(r'protein_id=([^;]+)', attributes)
-
-            if locus_tag_match and protein_id_match:
-                locus_tag = locus_tag_match.group(1)
-                protein_id = protein_id_match.group(1)
-                mapping[locus_tag] = protein_id
+# Load locus_tag -> protein_id mapping from the annotation index (built from the GFF once)
+def load_protein_mapping(accession):
+    """Load locus_tag to protein_id mapping for an assembly"""
+    print(f"\nLoading {accession} annotation index...")
+    mapping = locus_tag_to_protein_id(accession)
 
     print(f"  Found {len(mapping)} locus_tag -> protein_id mappings")
     if len(mapping) > 0:
@@ -51,13 +30,14 @@ def parse_gff_mapping(gff_file):
     return mapping
 
 # Load mappings
-v2_mapping = parse_gff_mapping("GCA_002759435.2_genomic.gff")
-v3_mapping = parse_gff_mapping("GCA_002759435.3_genomic.gff")
+v2_mapping = load_protein_mapping("GCA_002759435.2")
+v3_mapping = load_protein_mapping("GCA_002759435.3")
 
 # Load protein sequences
 print("\nLoading protein sequences...")
-v2_proteins = {rec.id: rec for rec in SeqIO.parse("GCA_002759435.2_protein.faa", "fasta")}
-v3_proteins = {rec.id: rec for rec in SeqIO.parse("GCA_002759435.3_protein.faa", "fasta")}
+# Indexed stores read only the records we ask for instead of the whole proteome
+v2_proteins = IndexedFasta("GCA_002759435.2_protein.faa")
+v3_proteins = IndexedFasta("GCA_002759435.3_protein.faa")
 print(f"  v2 proteins: {len(v2_proteins)}")
 print(f"  v3 proteins: {len(v3_proteins)}")
 
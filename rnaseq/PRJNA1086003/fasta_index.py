@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Indexed random-access FASTA store for the protein .faa files.
+
+A .fai-style offset index is written next to the FASTA file the first time it
+is opened and rebuilt whenever the FASTA is newer than its index. Lookups seek
+straight to a record and read only its bytes, so pulling a few hundred DEG
+proteins never loads the whole proteome. The store behaves like the dict
+returned by Bio.SeqIO.index (id -> SeqRecord); files with irregular line
+wrapping, which the offset arithmetic cannot handle, fall back to
+Bio.SeqIO.index itself.
+
+Index columns (tab-separated): NAME, LENGTH, OFFSET, LINEBASES, LINEWIDTH as in
+samtools faidx, plus HEADER_OFFSET so the description line can be recovered.
+"""
+
+import os
+from collections import namedtuple
+from collections.abc import Mapping
+
+from Bio import SeqIO
+from Bio.Seq import Seq
+from Bio.SeqRecord import SeqRecord
+
+FaiEntry = namedtuple('FaiEntry', ['length', 'offset', 'line_bases', 'line_width', 'header_offset'])
+
+
+class IrregularFastaError(ValueError):
+    """Raised when a record's line wrapping is not uniform"""
+
+
+def build_fai(fasta_path, fai_path):
+    """Scan a FASTA file once and write its offset index"""
+    entries = []
+    name = None
+
+    def finish():
+        if name is not None:
+            entries.append((name, length, offset, line_bases, line_width, header_offset))
+
+    with open(fasta_path, 'rb') as f:
+        pos = 0
+        short_line_seen = False
+        for line in f:
+            if line.startswith(b'>'):
+                finish()
+                name = line[1:].split(None, 1)[0].decode()
+                header_offset = pos
+                offset = pos + len(line)
+                length = line_bases = line_width = 0
+                short_line_seen = False
+            elif name is not None:
+                bases = len(line.rstrip(b'\r\n'))
+                if bases:
+                    if short_line_seen:
+                        raise IrregularFastaError(f"Irregular line length in record {name}")
+                    if line_bases == 0:
+                        line_bases, line_width = bases, len(line)
+                    elif bases != line_bases or len(line) != line_width:
+                        # Only the last line of a record may be shorter
+                        if bases >= line_bases:
+                            raise IrregularFastaError(f"Irregular line length in record {name}")
+                        short_line_seen = True
+                    length += bases
+            pos += len(line)
+        finish()
+
+    tmp_path = fai_path + '.tmp'
+    with open(tmp_path, 'w') as out:
+        for entry in entries:
+            out.write('\t'.join(str(x) for x in entry) + '\n')
+    os.replace(tmp_path, fai_path)
+
+
+def read_fai(fai_path):
+    """Load an offset index into a dict of name -> FaiEntry"""
+    index = {}
+    with open(fai_path) as f:
+        for line in f:
+            name, *fields = line.rstrip('\n').split('\t')
+            index[name] = FaiEntry(*map(int, fields))
+    return index
+
+
+class IndexedFasta(Mapping):
+    """Read-only id -> SeqRecord mapping backed by an on-disk offset index"""
+
+    def __init__(self, fasta_path, fai_path=None):
+        self.fasta_path = fasta_path
+        self.fai_path = fai_path or fasta_path + '.fai'
+        self._handle = None
+        self._fallback = None
+
+        try:
+            if (not os.path.exists(self.fai_path)
+                    or os.path.getmtime(self.fai_path) < os.path.getmtime(fasta_path)):
+                build_fai(fasta_path, self.fai_path)
+            self._index = read_fai(self.fai_path)
+            self._handle = open(fasta_path, 'rb')
+        except IrregularFastaError:
+            self._index = None
+            self._fallback = SeqIO.index(fasta_path, 'fasta')
+
+    def fetch_sequence(self, key):
+        """Return the sequence string for one id without building a SeqRecord"""
+        if self._fallback is not None:
+            return str(self._fallback[key].seq)
+
+        entry = self._index[key]
+        if entry.length == 0:
+            return ''
+        full_lines, remainder = divmod(entry.length, entry.line_bases)
+        nbytes = full_lines * entry.line_width + remainder
+        self._handle.seek(entry.offset)
+        raw = self._handle.read(nbytes)
+        return raw.replace(b'\n', b'').replace(b'\r', b'').decode()
+
+    def __getitem__(self, key):
+        if self._fallback is not None:
+            return self._fallback[key]
+
+        entry = self._index[key]
+        self._handle.seek(entry.header_offset)
+        description = self._handle.readline()[1:].rstrip(b'\r\n').decode()
+        return SeqRecord(
+            Seq(self.fetch_sequence(key)),
+            id=key,
+            name=key,
+            description=description
+        )
+
+    def __iter__(self):
+        if self._fallback is not None:
+            return iter(self._fallback)
+        return iter(self._index)
+
+    def __len__(self):
+        if self._fallback is not None:
+            return len(self._fallback)
+        return len(self._index)
+
+    def __contains__(self, key):
+        if self._fallback is not None:
+            return key in self._fallback
+        return key in self._index
+
+    def close(self):
+        if self._handle is not None:
+            self._handle.close()
+        if self._fallback is not None:
+            self._fallback.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Vectorized loader for NCBI feature tables (*_feature_table.txt).
+
+Only the columns the mapping code uses are read, with explicit dtypes:
+feature and class as categoricals, coordinates as integers and everything
+else as strings, instead of low_memory=False object columns for all twenty.
+old_locus_tag is pulled out of the attributes column with one
+Series.str.extract pass. Several assemblies are processed in parallel
+with a process pool.
+"""
+
+import csv
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from gff_reader import open_text
+
+OLD_LOCUS_TAG_PATTERN = r'old_locus_tag=([^;,\s]+)'
+
+# Column -> dtype for the columns we read; the rest of the table is skipped
+COLUMNS = {
+    'feature': 'category',
+    'class': 'category',
+    'genomic_accession': 'string',
+    'start': 'Int64',
+    'end': 'Int64',
+    'strand': 'category',
+    'product_accession': 'string',
+    'locus_tag': 'string',
+    'attributes': 'string',
+}
+
+MAPPING_COLUMNS = ['locus_tag', 'old_locus_tag']
+
+
+def read_feature_table(path, features=('gene', 'CDS')):
+    """
+    Feature table rows of the given feature types that have a locus_tag.
+
+    Adds an old_locus_tag column (missing where the attributes have none).
+    Plain and gzip-compressed files are accepted.
+    """
+    with open_text(path) as f:
+        header = [col.lstrip('# ') for col in f.readline().rstrip('\n').split('\t')]
+        frame = pd.read_csv(
+            f, sep='\t', header=None, names=header, usecols=list(COLUMNS),
+            dtype=COLUMNS, quoting=csv.QUOTE_NONE, keep_default_na=False, na_values=[''],
+        )
+
+    if features is not None:
+        frame = frame[frame['feature'].isin(features)]
+    frame = frame[frame['locus_tag'].notna()]
+    frame = frame.assign(
+        old_locus_tag=frame['attributes'].str.extract(OLD_LOCUS_TAG_PATTERN, expand=False)
+    )
+    return frame.reset_index(drop=True)
+
+
+def old_locus_tag_frame(path):
+    """Two-column frame (locus_tag, old_locus_tag) for the gene features of a feature table"""
+    genes = read_feature_table(path, features=('gene',))
+    genes = genes.loc[genes['old_locus_tag'].notna(), MAPPING_COLUMNS]
+    # One row per new tag, then per old tag; the last occurrence wins, as with a dict
+    genes = genes.drop_duplicates('locus_tag', keep='last').drop_duplicates('old_locus_tag', keep='last')
+    return genes.reset_index(drop=True)
+
+
+def write_mappings(mapping, old_to_new_path, new_to_old_path, old_label='Gene_ID_v2', new_label='Gene_ID_v3'):
+    """
+    Write both directions of a (locus_tag, old_locus_tag) frame, each sorted by its key.
+
+    The frame is sorted once by old tag; the new -> old file reuses that
+    order when the renumbering preserved it and is sorted separately only
+    when it did not.
+    """
+    by_old = mapping.sort_values('old_locus_tag', kind='stable')
+    by_old[['old_locus_tag', 'locus_tag']].to_csv(
+        old_to_new_path, sep='\t', index=False, header=[old_label, new_label]
+    )
+
+    by_new = by_old if by_old['locus_tag'].is_monotonic_increasing else mapping.sort_values('locus_tag')
+    by_new[['locus_tag', 'old_locus_tag']].to_csv(
+        new_to_old_path, sep='\t', index=False, header=[new_label, old_label]
+    )
+
+
+def old_locus_tag_frames(paths, max_workers=None):
+    """{path: old_locus_tag_frame(path)} for many feature tables, one process per table"""
+    paths = list(paths)
+    if len(paths) < 2:
+        return {path: old_locus_tag_frame(path) for path in paths}
+    max_workers = min(max_workers or os.cpu_count() or 1, len(paths))
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        return dict(zip(paths, pool.map(old_locus_tag_frame, paths)))
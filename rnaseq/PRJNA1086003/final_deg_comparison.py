@@ -7,6 +7,8 @@ using corrected gene ID mappings
 import pandas as pd
 import numpy as np
 
+from gene_ids import load_mapping
+
 print("="*80)
 print("FINAL DEG COMPARISON: OUR DATA vs PAPER")
 print("="*80)
@@ -127,8 +129,7 @@ print("KEY GENES FROM PAPER")
 print("="*80)
 
 # Load official mappings
-v2_to_v3 = pd.read_csv('official_mapping_v2_to_v3.tsv', sep='\t')
-mapping_dict = dict(zip(v2_to_v3['Gene_ID_v2'], v2_to_v3['Gene_ID_v3']))
+mapping = load_mapping()
 
 # Key genes mentioned in paper (v2 IDs)
 key_genes = {
@@ -140,7 +141,7 @@ key_genes = {
 
 print("\nChecking if key genes are DEGs in our analysis:")
 for name, gene_v2 in key_genes.items():
-    gene_v3 = mapping_dict.get(gene_v2, 'NOT_MAPPED')
+    gene_v3 = mapping.get(gene_v2, 'v2', 'v3', 'NOT_MAPPED')
 
     # Check in our DEG lists
     in_our_vitro = gene_v3 in our_vitro['Gene_ID_v3'].values
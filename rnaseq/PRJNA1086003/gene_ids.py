@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Gene ID translation between the v2 and v3 C. auris B9J08 annotations.
+
+The official NCBI mapping (official_mapping_v2_to_v3.tsv, written by
+extract_official_mapping.py) is the only source of truth: v2 and v3 locus
+tags are numbered independently, so no zero-padding rule converts one into
+the other (B9J08_001458 is B9J08_03708, not B9J08_01458).
+
+load_mapping() reads the TSV once per process and keeps a pickled copy in
+.cache/gene_id_mapping.pickle, reused by other processes until the TSV
+changes (size or mtime). Each direction is a hash index (pandas Index over
+the unique source IDs) aligned with an array of target IDs, so translate()
+converts a whole Series with one get_indexer call. IDs without an official
+counterpart, or with more than one, come back as missing and are reported
+by status() instead of being guessed.
+"""
+
+import os
+import pickle
+import tempfile
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+MAPPING_PATH = 'official_mapping_v2_to_v3.tsv'
+MAPPING_CACHE_PATH = os.path.join('.cache', 'gene_id_mapping.pickle')
+
+# Bump when GeneIdMapping changes, so pickles of the old class are rebuilt
+MAPPING_CACHE_VERSION = 1
+
+VERSIONS = ('v2', 'v3')
+
+# status() values
+MAPPED = 'mapped'
+UNMAPPED = 'unmapped'
+ONE_TO_MANY = 'one-to-many'
+
+
+class GeneIdMapping:
+    """Bidirectional v2 <-> v3 locus tag lookups"""
+
+    def __init__(self, v2_ids, v3_ids):
+        self.ids = {'v2': np.asarray(v2_ids, dtype=object), 'v3': np.asarray(v3_ids, dtype=object)}
+        self._index = {}
+        self._ambiguous = {}
+        for src in VERSIONS:
+            ids = pd.Series(self.ids[src])
+            duplicated = ids.duplicated(keep=False)
+            self._ambiguous[src] = pd.Index(ids[duplicated].unique())
+            # Position of each unambiguous source ID in the pair arrays
+            self._index[src] = pd.Index(ids[~duplicated])
+            self._index[src + '_pos'] = np.flatnonzero(~duplicated.to_numpy())
+
+    def __len__(self):
+        return len(self.ids['v2'])
+
+    @staticmethod
+    def _check(src, dst):
+        if src not in VERSIONS or dst not in VERSIONS or src == dst:
+            raise ValueError(f"Cannot translate {src!r} to {dst!r}; use two of {VERSIONS}")
+
+    def _positions(self, ids, src):
+        """Row of each ID in the pair arrays, -1 where there is no single one"""
+        found = self._index[src].get_indexer(ids)
+        return np.where(found >= 0, self._index[src + '_pos'][found], -1)
+
+    def translate(self, ids, src, dst):
+        """
+        Translate a Series (or list) of src IDs to dst IDs.
+
+        Unmapped and one-to-many IDs become NA; see status() for which is which.
+        """
+        self._check(src, dst)
+        ids = pd.Series(ids, dtype=object) if not isinstance(ids, pd.Series) else ids
+        positions = self._positions(ids.astype(object).str.strip(), src)
+        translated = np.where(positions >= 0, self.ids[dst][positions], None)
+        return pd.Series(translated, index=ids.index, dtype=object).where(positions >= 0)
+
+    def status(self, ids, src):
+        """Series of 'mapped', 'unmapped' or 'one-to-many' for src IDs"""
+        if src not in VERSIONS:
+            raise ValueError(f"Unknown annotation version {src!r}; use one of {VERSIONS}")
+        ids = pd.Series(ids, dtype=object) if not isinstance(ids, pd.Series) else ids
+        ids = ids.astype(object).str.strip()
+        result = np.where(self._index[src].get_indexer(ids) >= 0, MAPPED, UNMAPPED).astype(object)
+        result[ids.isin(self._ambiguous[src]).to_numpy()] = ONE_TO_MANY
+        return pd.Series(result, index=ids.index)
+
+    def get(self, gene_id, src, dst, default=None):
+        """Translate a single ID; default if it has no single counterpart"""
+        value = self.translate([gene_id], src, dst).iloc[0]
+        return default if pd.isna(value) else value
+
+    def to_dict(self, src, dst):
+        """{src ID: dst ID} for the IDs with exactly one counterpart"""
+        self._check(src, dst)
+        return dict(zip(self._index[src], self.ids[dst][self._index[src + '_pos']]))
+
+
+def report_problems(ids, mapping, src, label='IDs'):
+    """Print the IDs that translate() leaves missing; return how many there were"""
+    status = mapping.status(ids, src)
+    problems = pd.Series(ids)[status.to_numpy() != MAPPED]
+    if len(problems):
+        counts = status.value_counts()
+        print(f"  Warning: {len(problems)} {label} without a single official {src} counterpart "
+              f"({counts.get(UNMAPPED, 0)} unmapped, {counts.get(ONE_TO_MANY, 0)} one-to-many): "
+              f"{', '.join(map(str, problems[:10]))}{' ...' if len(problems) > 10 else ''}")
+    return len(problems)
+
+
+def _source_key(path):
+    st = os.stat(path)
+    return os.path.abspath(path), st.st_size, st.st_mtime_ns
+
+
+@lru_cache(maxsize=None)
+def _load(path, size, mtime_ns, cache_path):
+    key = (MAPPING_CACHE_VERSION, os.path.abspath(path), size, mtime_ns)
+    try:
+        with open(cache_path, 'rb') as f:
+            cached = pickle.load(f)
+        if cached['source'] == key:
+            return cached['mapping']
+    except (OSError, EOFError, KeyError, TypeError, ValueError, AttributeError, ImportError,
+            pickle.UnpicklingError):
+        # Missing, torn, or written by an older version of this module: rebuild it
+        pass
+
+    frame = pd.read_csv(path, sep='\t', dtype=str)
+    mapping = GeneIdMapping(frame['Gene_ID_v2'].str.strip(), frame['Gene_ID_v3'].str.strip())
+
+    cache_dir = os.path.dirname(cache_path) or '.'
+    os.makedirs(cache_dir, exist_ok=True)
+    # A private temporary file, so concurrent processes never write into each other's
+    fd, tmp_path = tempfile.mkstemp(dir=cache_dir, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            pickle.dump({'source': key, 'mapping': mapping}, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, cache_path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+    return mapping
+
+
+def load_mapping(path=MAPPING_PATH, cache_path=MAPPING_CACHE_PATH):
+    """The official mapping, loaded once per process and cached on disk across processes"""
+    return _load(path, *_source_key(path)[1:], cache_path)
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Streaming single-pass GFF3 reader shared by the mapping scripts.
+
+Lines are filtered on the feature type column before the attribute column is
+touched, and the attribute column is tokenized once into a dict instead of
+running one regex per wanted key. Plain and gzip-compressed files are both
+accepted.
+"""
+
+import gzip
+import re
+from collections import namedtuple
+from functools import lru_cache
+from urllib.parse import unquote
+
+GffRecord = namedtuple('GffRecord', ['seqid', 'type', 'start', 'end', 'strand', 'attributes'])
+
+GZIP_MAGIC = b'\x1f\x8b'
+
+# One C-level scan of the column yields every (key, value) pair
+ATTRIBUTE_RE = re.compile(r'([^=;]+)=([^;]*)')
+
+# Escaped values (mostly product names) repeat heavily across a genome
+_unquote = lru_cache(maxsize=8192)(unquote)
+
+
+def open_text(path):
+    """Open a plain or gzip-compressed text file for reading"""
+    with open(path, 'rb') as f:
+        magic = f.read(2)
+    if magic == GZIP_MAGIC:
+        return gzip.open(path, 'rt')
+    return open(path)
+
+
+def parse_attributes(column):
+    """Tokenize a GFF3 attribute column (key=value;key=value) into a dict"""
+    attributes = dict(ATTRIBUTE_RE.findall(column))
+    if '%' in column:
+        for key, value in attributes.items():
+            if '%' in value:
+                attributes[key] = _unquote(value)
+    return attributes
+
+
+def read_gff(path, feature_types=None):
+    """
+    Yield GffRecord tuples from a GFF3 file, one pass, constant memory.
+
+    feature_types limits output to those column-3 types (e.g. {'CDS'}); other
+    lines are skipped before their attributes are decoded.
+    """
+    if isinstance(feature_types, str):
+        feature_types = {feature_types}
+
+    with open_text(path) as f:
+        for line in f:
+            if line.startswith('#'):
+                if line.startswith('##FASTA'):
+                    break
+                continue
+            # Split off only the first three columns until the type has been checked
+            head = line.split('\t', 3)
+            if len(head) < 4:
+                continue
+            if feature_types is not None and head[2] not in feature_types:
+                continue
+
+            rest = head[3].rstrip('\n').split('\t')
+            if len(rest) < 6:
+                continue
+
+            yield GffRecord(
+                head[0],
+                head[2],
+                int(rest[0]),
+                int(rest[1]),
+                rest[3],
+                parse_attributes(rest[5]),
+            )
@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+Shared Galaxy history resolver with server-side filtering and a TTL cache.
+
+History names are matched by the server (q=name-contains) instead of listing
+every history and substring-matching in Python, and history contents are
+queried by history_content_type / hid / name instead of downloading the whole
+history. Resolved history name -> id and (history, type, hid) -> content id
+pairs are kept in .cache/history_cache.json for CACHE_TTL seconds, so
+repeated script starts cost no API calls at all.
+"""
+
+import json
+import os
+import tempfile
+import threading
+import time
+
+from galaxy_utils.fetch import call_with_backoff
+
+CACHE_PATH = os.path.join('.cache', 'history_cache.json')
+
+# Seconds a resolved name/hid stays valid; hids never change, names rarely do
+CACHE_TTL = 24 * 3600
+
+
+def query_history_contents(gi, history_id, content_type=None, hid=None, name=None, deleted=False):
+    """
+    History contents filtered by the server, in hid order.
+
+    content_type is 'dataset' or 'dataset_collection'; name matches as a
+    case-insensitive substring. Only matching items are transferred.
+    """
+    q = ['deleted']
+    qv = [str(deleted).lower()]
+    if content_type is not None:
+        q.append('history_content_type-eq')
+        qv.append(content_type)
+    if hid is not None:
+        q.append('hid-eq')
+        qv.append(str(hid))
+    if name is not None:
+        q.append('name-contains')
+        qv.append(name)
+
+    url = gi.histories._make_url(history_id, contents=True)
+    params = {'v': 'dev', 'q': q, 'qv': qv, 'order': 'hid-asc'}
+    return call_with_backoff(gi.histories._get, url=url, params=params)
+
+
+class HistoryResolver:
+    """Resolve history names and hids to ids for one Galaxy instance"""
+
+    def __init__(self, gi, cache_path=CACHE_PATH, ttl=CACHE_TTL):
+        self.gi = gi
+        self.cache_path = cache_path
+        self.ttl = ttl
+        self._cache = self._load_cache()
+        # Pipelines resolve from worker threads; one writer at a time
+        self._lock = threading.Lock()
+
+    # Cache handling
+
+    def _load_cache(self):
+        try:
+            with open(self.cache_path) as f:
+                cache = json.load(f)
+        except (OSError, ValueError):
+            cache = {}
+        # Ids are only meaningful on the server they came from
+        cache.setdefault(self.gi.base_url, {'histories': {}, 'contents': {}})
+        return cache
+
+    @property
+    def _entries(self):
+        return self._cache[self.gi.base_url]
+
+    def _save_cache(self):
+        cache_dir = os.path.dirname(self.cache_path) or '.'
+        os.makedirs(cache_dir, exist_ok=True)
+        # A private temporary file, so other processes never write into this one
+        fd, tmp_path = tempfile.mkstemp(dir=cache_dir, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump(self._cache, f, indent=1)
+            os.replace(tmp_path, self.cache_path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+
+    def _cached(self, section, key):
+        entry = self._entries[section].get(key)
+        if entry and time.time() - entry['time'] < self.ttl:
+            return entry['item']
+        return None
+
+    def _remember(self, section, key, item):
+        with self._lock:
+            self._entries[section][key] = {'item': item, 'time': time.time()}
+            self._save_cache()
+
+    def clear_cache(self):
+        """Forget everything cached for this Galaxy instance"""
+        with self._lock:
+            self._cache[self.gi.base_url] = {'histories': {}, 'contents': {}}
+            self._save_cache()
+
+    # Histories
+
+    def find_histories(self, name):
+        """Histories whose name contains name (case-insensitive), filtered by the server"""
+        url = self.gi.histories._make_url()
+        params = {'q': 'name-contains', 'qv': name, 'keys': 'id,name,update_time'}
+        return call_with_backoff(self.gi.histories._get, url=url, params=params)
+
+    def resolve_history(self, name, refresh=False):
+        """
+        Return {'id', 'name'} for the most recently updated history whose name
+        contains name, or None if there is none.
+        """
+        key = name.lower()
+        if not refresh:
+            cached = self._cached('histories', key)
+            if cached:
+                return cached
+
+        matches = self.find_histories(name)
+        if not matches:
+            return None
+        best = max(matches, key=lambda h: h.get('update_time') or '')
+        history = {'id': best['id'], 'name': best['name']}
+        self._remember('histories', key, history)
+        return history
+
+    # History contents
+
+    def query_contents(self, history_id, **filters):
+        """Server-side filtered history contents (see query_history_contents)"""
+        return query_history_contents(self.gi, history_id, **filters)
+
+    def content_by_hid(self, history_id, hid, content_type='dataset_collection', refresh=False):
+        """Return {'id', 'name', 'hid', 'history_content_type'} for one hid, or None"""
+        key = f"{history_id}:{content_type}:{hid}"
+        if not refresh:
+            cached = self._cached('contents', key)
+            if cached:
+                return cached
+
+        matches = self.query_contents(history_id, content_type=content_type, hid=hid)
+        if not matches:
+            return None
+        item = {k: matches[0].get(k) for k in ('id', 'name', 'hid', 'history_content_type')}
+        self._remember('contents', key, item)
+        return item
+
+    def collections(self, history_id, name=None):
+        """Non-deleted collections in a history, optionally filtered by name substring"""
+        return self.query_contents(history_id, content_type='dataset_collection', name=name)
+
+
+def find_history(gi, history_name, resolver=None):
+    """
+    Resolve a history by name for a script's main(), printing the usual messages.
+
+    Returns (resolver, history_id), or (resolver, None) if no history matches.
+    """
+    resolver = resolver or HistoryResolver(gi)
+    history = resolver.resolve_history(history_name)
+    if not history:
+        print(f"Error: History containing '{history_name}' not found")
+        return resolver, None
+    print(f"Found history: {history['name']} (ID: {history['id']})")
+    return resolver, history['id']
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Local SQLite snapshot of history contents with incremental refresh.
+
+The first refresh of a history stores every item (datasets and collections,
+deleted ones included) in .cache/history_snapshot.sqlite. Later refreshes
+only ask the server for items whose update_time is at or after the newest
+update_time already stored, so a state change or a new output costs a few
+rows instead of re-downloading the whole hid-700 history. Queries such as
+"DESeq2 outputs in error or paused state" then run locally:
+
+    snapshot = HistorySnapshot(gi, history_id)
+    snapshot.refresh()
+    stalled = snapshot.query(name='deseq', states=('error', 'paused'))
+
+The cursor is a server timestamp, so client clock skew does not matter;
+items updated in the same instant as the cursor are fetched again and
+simply overwritten.
+"""
+
+import json
+import os
+import sqlite3
+
+from galaxy_utils.fetch import call_with_backoff
+
+SNAPSHOT_PATH = os.path.join('.cache', 'history_snapshot.sqlite')
+
+# Serialized keys requested per item; enough for state queries and job lookups
+CONTENT_KEYS = [
+    'id', 'hid', 'name', 'history_content_type', 'state', 'populated_state', 'deleted', 'purged',
+    'visible', 'extension', 'collection_type', 'element_count', 'tags', 'creating_job',
+    'create_time', 'update_time',
+]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS items (
+    server TEXT NOT NULL,
+    history_id TEXT NOT NULL,
+    id TEXT NOT NULL,
+    hid INTEGER,
+    history_content_type TEXT,
+    name TEXT,
+    state TEXT,
+    deleted INTEGER,
+    update_time TEXT,
+    data TEXT NOT NULL,
+    PRIMARY KEY (server, history_id, history_content_type, id)
+);
+CREATE INDEX IF NOT EXISTS items_state ON items (server, history_id, state);
+CREATE TABLE IF NOT EXISTS syncs (
+    server TEXT NOT NULL,
+    history_id TEXT NOT NULL,
+    cursor TEXT,
+    PRIMARY KEY (server, history_id)
+);
+"""
+
+
+def contents_updated_since(gi, history_id, since=None):
+    """All history contents (deleted included) with update_time >= since, in hid order"""
+    params = {'v': 'dev', 'keys': ','.join(CONTENT_KEYS), 'order': 'hid-asc'}
+    if since:
+        params['q'] = ['update_time-ge']
+        params['qv'] = [since]
+    url = gi.histories._make_url(history_id, contents=True)
+    return call_with_backoff(gi.histories._get, url=url, params=params)
+
+
+class HistorySnapshot:
+    """Contents of one history mirrored in a local SQLite database"""
+
+    def __init__(self, gi, history_id, db_path=SNAPSHOT_PATH):
+        self.gi = gi
+        self.history_id = history_id
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(db_path) or '.', exist_ok=True)
+        self.db = sqlite3.connect(db_path)
+        self.db.executescript(SCHEMA)
+        # Ids are only meaningful on the server they came from
+        self._key = (gi.base_url, history_id)
+
+    def close(self):
+        self.db.close()
+
+    @property
+    def cursor(self):
+        """update_time of the newest item stored so far, or None before the first refresh"""
+        row = self.db.execute('SELECT cursor FROM syncs WHERE server = ? AND history_id = ?', self._key).fetchone()
+        return row[0] if row else None
+
+    def refresh(self, full=False):
+        """Fetch items updated since the last refresh (all items if full); return how many changed"""
+        since = None if full else self.cursor
+        changed = contents_updated_since(self.gi, self.history_id, since)
+
+        rows = [
+            (*self._key, item['id'], item.get('hid'), item.get('history_content_type'), item.get('name'),
+             item.get('state') or item.get('populated_state'), int(bool(item.get('deleted'))),
+             item.get('update_time'), json.dumps(item))
+            for item in changed
+        ]
+        newest = max([since or ''] + [item.get('update_time') or '' for item in changed]) or None
+        with self.db:
+            if full:
+                self.db.execute('DELETE FROM items WHERE server = ? AND history_id = ?', self._key)
+            self.db.executemany('INSERT OR REPLACE INTO items VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)', rows)
+            self.db.execute('INSERT OR REPLACE INTO syncs VALUES (?, ?, ?)', (*self._key, newest))
+        return len(changed)
+
+    def query(self, name=None, states=None, content_type=None, deleted=False):
+        """
+        Stored items in hid order, filtered locally.
+
+        name matches as a case-insensitive substring; states is an iterable of
+        states; deleted=None returns deleted and live items alike.
+        """
+        sql = ['SELECT data FROM items WHERE server = ? AND history_id = ?']
+        args = list(self._key)
+        if name is not None:
+            sql.append("AND instr(lower(name), ?) > 0")
+            args.append(name.lower())
+        if states is not None:
+            states = list(states)
+            sql.append(f"AND state IN ({', '.join('?' * len(states))})")
+            args.extend(states)
+        if content_type is not None:
+            sql.append('AND history_content_type = ?')
+            args.append(content_type)
+        if deleted is not None:
+            sql.append('AND deleted = ?')
+            args.append(int(deleted))
+        sql.append('ORDER BY hid')
+        return [json.loads(data) for (data,) in self.db.execute(' '.join(sql), args)]
+
+    def state_counts(self, name=None):
+        """{state: number of live items}, optionally for items whose name contains name"""
+        sql = 'SELECT state, count(*) FROM items WHERE server = ? AND history_id = ? AND deleted = 0'
+        args = list(self._key)
+        if name is not None:
+            sql += ' AND instr(lower(name), ?) > 0'
+            args.append(name.lower())
+        return dict(self.db.execute(sql + ' GROUP BY state', args).fetchall())
+
+
+def history_snapshot(gi, history_id, db_path=SNAPSHOT_PATH):
+    """Open the snapshot of a history and bring it up to date, printing what changed"""
+    snapshot = HistorySnapshot(gi, history_id, db_path)
+    first = snapshot.cursor is None
+    changed = snapshot.refresh()
+    if first:
+        print(f"History snapshot: stored {changed} items")
+    else:
+        print(f"History snapshot: {changed} item(s) changed since last sync")
+    return snapshot
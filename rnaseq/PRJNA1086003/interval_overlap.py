@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Sorted-interval overlap engine for matching features between two annotations.
+
+Features are partitioned by (seqid, strand) and each partition is joined with a
+sweep line over interval starts, so a join costs O((n+m) log n + k) for k
+overlapping pairs instead of comparing every feature against every other one.
+"""
+
+import heapq
+from collections import defaultdict, namedtuple
+
+# Minimal feature record; any object with these attributes works with the engine
+Feature = namedtuple('Feature', ['locus_tag', 'seqid', 'start', 'end', 'strand'])
+
+
+def feature_length(feature):
+    """Length of a 1-based, inclusive GFF interval"""
+    return feature.end - feature.start + 1
+
+
+def overlap_length(a, b):
+    """Number of bases shared by two intervals (0 if disjoint)"""
+    return max(0, min(a.end, b.end) - max(a.start, b.start) + 1)
+
+
+def partition(features):
+    """Group features by (seqid, strand)"""
+    groups = defaultdict(list)
+    for feature in features:
+        groups[(feature.seqid, feature.strand)].append(feature)
+    return groups
+
+
+def sweep_overlaps(left, right):
+    """
+    Yield (left_feature, right_feature, overlap_bp) for every overlapping pair.
+
+    Both lists must already be restricted to one seqid/strand partition.
+    Each interval is compared only against intervals of the other set that
+    are still open when it starts, so every pair is reported exactly once.
+    """
+    events = [(f.start, 0, i) for i, f in enumerate(left)]
+    events.extend((f.start, 1, j) for j, f in enumerate(right))
+    events.sort()
+
+    sides = (left, right)
+    active = ([], [])  # min-heaps of (end, index) per side
+
+    for start, side, idx in events:
+        # Drop intervals of either side that ended before this start
+        for heap in active:
+            while heap and heap[0][0] < start:
+                heapq.heappop(heap)
+
+        feature = sides[side][idx]
+        other_side = 1 - side
+        for _, other_idx in active[other_side]:
+            other = sides[other_side][other_idx]
+            pair = (feature, other) if side == 0 else (other, feature)
+            yield pair[0], pair[1], overlap_length(feature, other)
+
+        heapq.heappush(active[side], (feature.end, idx))
+
+
+def overlap_join(left, right):
+    """Yield every overlapping (left, right, overlap_bp) pair on the same seqid and strand"""
+    left_groups = partition(left)
+    right_groups = partition(right)
+    for key in sorted(left_groups.keys() & right_groups.keys()):
+        yield from sweep_overlaps(left_groups[key], right_groups[key])
+
+
+def passes_overlap_rule(a, b, overlap, min_fraction=0.5):
+    """True if the overlap covers more than min_fraction of the shorter feature"""
+    return overlap / min(feature_length(a), feature_length(b)) > min_fraction
+
+
+def match_features(query, target, min_fraction=0.5):
+    """
+    Match query features to target features by coordinate overlap.
+
+    Each query feature is assigned its largest-overlapping target (ties go to the
+    target listed first), kept only if that overlap covers more than
+    min_fraction of the shorter feature.
+
+    Returns (best, pairs): best maps query locus_tag -> (target locus_tag, overlap_bp),
+    pairs lists every (query locus_tag, target locus_tag, overlap_bp) passing the rule.
+    """
+    target_order = {id(t): i for i, t in enumerate(target)}
+    best_hit = {}
+    pair_overlap = {}
+
+    for q, t, overlap in overlap_join(query, target):
+        rank = (overlap, -target_order[id(t)])
+        current = best_hit.get(q.locus_tag)
+        if current is None or rank > current[3]:
+            best_hit[q.locus_tag] = (q, t, overlap, rank)
+        if passes_overlap_rule(q, t, overlap, min_fraction):
+            # Multi-segment CDS features repeat a locus_tag; keep the largest segment overlap
+            key = (q.locus_tag, t.locus_tag)
+            pair_overlap[key] = max(overlap, pair_overlap.get(key, 0))
+
+    best = {}
+    for q_tag, (q, t, overlap, _) in best_hit.items():
+        if passes_overlap_rule(q, t, overlap, min_fraction):
+            best[q_tag] = (t.locus_tag, overlap)
+
+    pairs = [(q_tag, t_tag, overlap) for (q_tag, t_tag), overlap in pair_overlap.items()]
+    return best, pairs
+
+
+def find_multi_matches(pairs):
+    """
+    Split matched pairs into one-to-many and many-to-one groups.
+
+    Returns (one_to_many, many_to_one): query -> [targets] for queries hitting
+    several targets, and target -> [queries] for targets hit by several queries.
+    """
+    by_query = defaultdict(list)
+    by_target = defaultdict(list)
+    for q_tag, t_tag, _ in pairs:
+        by_query[q_tag].append(t_tag)
+        by_target[t_tag].append(q_tag)
+
+    one_to_many = {q: sorted(ts) for q, ts in by_query.items() if len(ts) > 1}
+    many_to_one = {t: sorted(qs) for t, qs in by_target.items() if len(qs) > 1}
+    return one_to_many, many_to_one
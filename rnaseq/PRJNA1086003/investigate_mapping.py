@@ -63,30 +63,17 @@ print("\nThe question: Does the same locus_tag in v2 and v3 refer to the same ge
 print("Let me check if B9J08_005317 (v2) should map to B9J08_05317 (v3) or B9J08_04200 (v3)...")
 
 # Load GFF mappings to see what we actually did
-import re
+from gff_reader import read_gff
 
 def parse_gff_sample(gff_file, target_locus_tags):
     """Parse GFF to show what protein_id each locus_tag maps to"""
     results = {}
-    with open(gff_file) as f:
-        for line in f:
-            if line.startswith('#'):
-                continue
-            parts = line.strip().split('\t')
-            if len(parts) < 9:
-                continue
-            if parts[2] != 'CDS':
-                continue
-
-            attributes = parts[8]
-            locus_tag_match = re.search(r'locus_tag=([^;]+)', attributes)
-            protein_id_match = re.search(r'protein_id=([^;]+)', attributes)
-
-            if locus_tag_match and protein_id_match:
-                locus_tag = locus_tag_match.group(1)
-                protein_id = protein_id_match.group(1)
-                if locus_tag in target_locus_tags:
-                    results[locus_tag] = protein_id
+    for rec in read_gff(gff_file, feature_types={'CDS'}):
+        locus_tag = rec.attributes.get('locus_tag')
+        protein_id = rec.attributes.get('protein_id')
+
+        if locus_tag and protein_id and locus_tag in target_locus_tags:
+            results[locus_tag] = protein_id
 
     return results
 
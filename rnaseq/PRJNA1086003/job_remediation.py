@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+"""
+Batch remediation of paused and errored Galaxy jobs.
+
+find_stalled_jobs takes the error/paused items of a history snapshot, maps
+them to their creating jobs and fetches every job's details (stderr, exit
+code, inputs, metrics) concurrently in one pass. plan_remediation decides
+what to do with each job:
+
+- errored jobs are rerun, remapped onto their failed outputs when paused
+  jobs depend on them, which also releases those dependents;
+- paused jobs are resumed, unless one of their inputs comes from an errored
+  job in the same batch (its rerun resumes them).
+
+remediate carries out the plan with a bounded number of requests in flight.
+Queue wait is the time from job creation to the start of execution (the
+core start_epoch metric), or until now for a job that has not started.
+"""
+
+import time
+from collections import namedtuple
+from datetime import datetime, timezone
+
+from galaxy_utils.fetch import MAX_CONCURRENCY, fetch_concurrently
+from state_watcher import JOB_DONE_STATES
+
+STALLED_STATES = ('error', 'paused')
+
+# Reruns and resumes are writes; keep the load on the job handlers modest
+REMEDIATE_CONCURRENCY = 4
+
+# outputs: [(hid, name)] of the stalled items the job created; error: short text or None
+StalledJob = namedtuple('StalledJob', ['id', 'state', 'tool_id', 'outputs', 'inputs', 'output_ids', 'error',
+                                       'queue_wait'])
+
+
+def parse_time(value):
+    """Galaxy timestamps are naive UTC ISO strings"""
+    if not value:
+        return None
+    return datetime.fromisoformat(value).replace(tzinfo=timezone.utc)
+
+
+def job_metric(job, name):
+    for metric in job.get('job_metrics') or []:
+        if metric.get('name') == name:
+            try:
+                return float(metric.get('raw_value'))
+            except (TypeError, ValueError):
+                return None
+    return None
+
+
+def queue_wait(job, now=None):
+    """Seconds the job waited before it started, or has waited so far; None if unknown"""
+    created = parse_time(job.get('create_time'))
+    if created is None:
+        return None
+    start = job_metric(job, 'start_epoch')
+    if start is not None:
+        return max(0.0, start - created.timestamp())
+    if job.get('state') in ('new', 'queued', 'paused'):
+        now = now or datetime.now(timezone.utc)
+        return max(0.0, (now - created).total_seconds())
+    # Started, but the server does not expose metrics to this user
+    return None
+
+
+def error_summary(job, max_lines=3):
+    """Last lines of the job's stderr plus exit code, or None for a job that did not fail"""
+    if job.get('state') != 'error':
+        return None
+    stderr = job.get('tool_stderr') or job.get('stderr') or ''
+    lines = [line.strip() for line in stderr.splitlines() if line.strip()]
+    lines += [m.get('desc') for m in job.get('job_messages') or [] if m.get('desc')]
+    text = ' | '.join(lines[-max_lines:]) or 'no stderr'
+    if job.get('exit_code') is not None:
+        text = f"exit code {job['exit_code']}: {text}"
+    return text
+
+
+def find_stalled_jobs(gi, items, max_workers=MAX_CONCURRENCY):
+    """
+    Creating jobs of history items (e.g. snapshot.query(states=STALLED_STATES)).
+
+    Job details are fetched once per job, concurrently; returns a list of
+    StalledJob in order of the items' hids, plus {item id: exception} for
+    items whose job could not be looked up.
+    """
+    failures = {}
+    # Older history summaries lack creating_job; ask for those datasets directly
+    missing = [item['id'] for item in items if not item.get('creating_job')]
+    creating = {item['id']: item.get('creating_job') for item in items}
+    for dataset_id, dataset in fetch_concurrently(gi.datasets.show_dataset, missing, max_workers).items():
+        if isinstance(dataset, Exception):
+            failures[dataset_id] = dataset
+        else:
+            creating[dataset_id] = dataset.get('creating_job')
+
+    outputs = {}
+    for item in sorted(items, key=lambda i: i.get('hid') or 0):
+        if creating.get(item['id']):
+            outputs.setdefault(creating[item['id']], []).append((item.get('hid'), item.get('name')))
+
+    details = fetch_concurrently(lambda job_id: gi.jobs.show_job(job_id, full_details=True), outputs, max_workers)
+    now = datetime.now(timezone.utc)
+    jobs = []
+    for job_id, job in details.items():
+        if isinstance(job, Exception):
+            failures[job_id] = job
+            continue
+        jobs.append(StalledJob(
+            id=job_id,
+            state=job.get('state'),
+            tool_id=job.get('tool_id'),
+            outputs=outputs[job_id],
+            inputs={ref['id'] for ref in (job.get('inputs') or {}).values() if isinstance(ref, dict)},
+            output_ids={ref['id'] for ref in (job.get('outputs') or {}).values() if isinstance(ref, dict)},
+            error=error_summary(job),
+            queue_wait=queue_wait(job, now),
+        ))
+    return jobs, failures
+
+
+def plan_remediation(jobs):
+    """[(action, job)] with action 'rerun', 'resume' or 'released' (resumed by an upstream rerun)"""
+    failed_outputs = set()
+    for job in jobs:
+        if job.state == 'error':
+            failed_outputs |= job.output_ids
+
+    plan = []
+    for job in jobs:
+        if job.state == 'error':
+            plan.append(('rerun', job))
+        elif job.state == 'paused':
+            plan.append(('released' if job.inputs & failed_outputs else 'resume', job))
+    return plan
+
+
+def rerun_job(gi, job_id):
+    """Rerun a failed job, remapping onto its outputs where Galaxy allows; returns the new job ids"""
+    try:
+        result = gi.jobs.rerun_job(job_id, remap=True)
+    except ValueError:
+        # Not remappable (nothing is waiting on its outputs): plain rerun
+        result = gi.jobs.rerun_job(job_id)
+    return [job['id'] for job in result.get('jobs', [])]
+
+
+def remediate(gi, plan, max_workers=REMEDIATE_CONCURRENCY):
+    """
+    Carry out a plan; returns {job id: [job ids now doing the work]} or the exception.
+
+    Reruns go first so that the jobs they release are not resumed into the
+    same failure. Reruns are not retried, since a retried POST could start
+    a second copy; resumes are idempotent and are retried. A released job
+    whose upstream rerun failed stays paused, so it gets that job's error.
+    """
+    reruns = [job.id for action, job in plan if action == 'rerun']
+    resumes = [job.id for action, job in plan if action == 'resume']
+    results = fetch_concurrently(lambda job_id: rerun_job(gi, job_id), reruns, max_workers, max_retries=0)
+
+    def resume(job_id):
+        gi.jobs.resume_job(job_id)
+        return [job_id]
+
+    results.update(fetch_concurrently(resume, resumes, max_workers))
+    producers = {output_id: job.id for action, job in plan if action == 'rerun' for output_id in job.output_ids}
+    for action, job in plan:
+        if action != 'released':
+            continue
+        failed = [producers[input_id] for input_id in sorted(job.inputs & producers.keys())
+                  if isinstance(results.get(producers[input_id]), Exception)]
+        if failed:
+            results[job.id] = RuntimeError(f"still paused: rerun of upstream job {failed[0]} failed "
+                                           f"({results[failed[0]]})")
+        else:
+            results[job.id] = [job.id]
+    return results
+
+
+def follow_queue_waits(watcher, job_ids, submitted=None):
+    """
+    Watch job_ids until done; return {job id: seconds from submission until it left the queue}.
+
+    Measured on the local clock at poll granularity; jobs that never started
+    (still paused, or failed before running) map to None.
+    """
+    submitted = submitted or time.monotonic()
+    started = {}
+    watcher.watch_jobs(job_ids)
+    for transition in watcher.events(set(job_ids)):
+        if transition.kind == 'job' and transition.id not in started \
+                and transition.new_state not in ('new', 'queued', 'paused'):
+            started[transition.id] = time.monotonic() - submitted
+        if transition.kind == 'job' and transition.new_state in JOB_DONE_STATES:
+            print(f"  job {transition.id}: {transition.new_state}")
+    return {job_id: started.get(job_id) for job_id in job_ids}
+
+
+def format_wait(seconds):
+    if seconds is None:
+        return '?'
+    if seconds < 120:
+        return f"{seconds:.0f}s"
+    if seconds < 7200:
+        return f"{seconds / 60:.0f}m"
+    return f"{seconds / 3600:.1f}h"
+
+
+def tool_name(tool_id):
+    """'deseq2' for toolshed.g2.bx.psu.edu/repos/iuc/deseq2/deseq2/2.11.40.8+galaxy0"""
+    parts = (tool_id or '').split('/')
+    return parts[-2] if len(parts) > 2 else tool_id
+
+
+def print_stalled_report(plan):
+    print(f"{'Job':<18}{'State':<8}{'Tool':<14}{'Queued':>8}  Action     Outputs")
+    for action, job in plan:
+        outputs = ', '.join(f"#{hid}" for hid, _ in job.outputs)
+        print(f"{job.id:<18}{job.state:<8}{tool_name(job.tool_id)[:13]:<14}{format_wait(job.queue_wait):>8}"
+              f"  {action:<9}  {outputs}")
+        if job.error:
+            print(f"  {job.error}")
@@ -0,0 +1,331 @@
+#!/usr/bin/env python3
+"""
+Scored locus tag liftover between C. auris assemblies.
+
+Three kinds of evidence link a locus tag of one assembly to a locus tag of
+another:
+
+- official: the newer annotation lists the older tag as old_locus_tag
+  (the same evidence as extract_official_mapping.py);
+- coordinate: CDS features overlap on a shared sequence by more than half of
+  the shorter one (the rule of create_coordinate_based_mapping.py);
+- protein: both proteins have the same sequence (protein_fingerprints digest).
+
+Each pair of tags gets a score combining its evidence as a noisy-OR of the
+weights below, and a relation (1:1, 1:n, n:1, n:m) over the pairs with a
+score of at least MIN_SCORE. Coordinate joins run one (seqid, strand)
+partition per task and proteomes are hashed one per task, all in a single
+process pool shared by every assembly pair.
+
+Results are stored in .cache/liftover.sqlite as one clustered (WITHOUT ROWID)
+table keyed by (source, target, source_tag, target_tag), with a second index
+on target_tag for lifting in the other direction.
+
+Coordinates are only comparable on the same sequence, so sequences of two
+assemblies are joined when they share a GenBank accession or, via the
+assembly reports, the same sequence name and length. The v2 scaffolds and
+v3 chromosomes of B8441 share neither; that pair relies on the official and
+protein evidence.
+"""
+
+import csv
+import os
+import sqlite3
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import closing
+from itertools import combinations
+
+import pandas as pd
+
+from annotation_index import cds_features, locus_tag_to_protein_id, old_locus_tag_mapping
+from interval_overlap import feature_length, partition, sweep_overlaps
+from protein_fingerprints import fingerprints
+
+LIFTOVER_PATH = os.path.join('.cache', 'liftover.sqlite')
+
+# Proteome and assembly report per assembly; annotations come from
+# annotation_index.ASSEMBLIES. Missing files only remove that evidence.
+ASSEMBLIES = {
+    'GCA_002759435.2': {
+        'label': 'B8441 v2',
+        'proteins': 'GCA_002759435.2_protein.faa',
+        'report': 'GCA_002759435.2_assembly_report.txt',
+    },
+    'GCA_002759435.3': {
+        'label': 'B8441 v3',
+        'proteins': 'GCA_002759435.3_protein.faa',
+        'report': 'GCA_002759435.3_assembly_report.txt',
+    },
+    'GCA_002775015.1': {
+        'label': 'B11221',
+        'proteins': 'GCA_002775015.1_protein.faa',
+        'report': 'GCA_002775015.1_assembly_report.txt',
+    },
+}
+
+# Evidence weights, combined as 1 - prod(1 - weight)
+OFFICIAL_WEIGHT = 0.95
+PROTEIN_WEIGHT = 0.8         # divided by the number of tags sharing the sequence on the larger side
+COORDINATE_WEIGHT = 0.7      # at full overlap; see coordinate_weight()
+
+MIN_OVERLAP_FRACTION = 0.5
+MIN_SCORE = 0.5
+
+COLUMNS = ['source_tag', 'target_tag', 'score', 'official', 'protein', 'overlap_bp', 'overlap_fraction',
+           'relation']
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS liftover (
+    source TEXT NOT NULL,
+    target TEXT NOT NULL,
+    source_tag TEXT NOT NULL,
+    target_tag TEXT NOT NULL,
+    score REAL NOT NULL,
+    official INTEGER NOT NULL,
+    protein INTEGER NOT NULL,
+    overlap_bp INTEGER NOT NULL,
+    overlap_fraction REAL NOT NULL,
+    relation TEXT,
+    PRIMARY KEY (source, target, source_tag, target_tag)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS liftover_target_tag ON liftover (source, target, target_tag);
+"""
+
+
+def protein_hashes(fasta_path, protein_to_tag=None):
+    """
+    [(locus_tag, digest)] for a protein FASTA file.
+
+    Protein ids are translated with protein_to_tag where the annotation
+    knows them; otherwise the locus tag in the header is used. Records with
+    neither are skipped.
+    """
+    protein_to_tag = protein_to_tag or {}
+    prints = fingerprints(fasta_path)
+    hashes = []
+    for protein_id, header_tag, digest in zip(prints.ids.tolist(), prints.locus_tags.tolist(),
+                                              prints.digests.tolist()):
+        tag = protein_to_tag.get(protein_id) or header_tag
+        if tag:
+            hashes.append((tag, digest))
+    return hashes
+
+
+def read_assembly_report(path):
+    """{GenBank accession: (sequence name, length)} from an NCBI assembly report"""
+    sequences = {}
+    with open(path) as f:
+        header = None
+        for row in csv.reader(f, delimiter='\t'):
+            if row and row[0].startswith('# Sequence-Name'):
+                header = [col.lstrip('# ') for col in row]
+            elif header and row and not row[0].startswith('#'):
+                fields = dict(zip(header, row))
+                sequences[fields['GenBank-Accn']] = (fields['Sequence-Name'], int(fields['Sequence-Length']))
+    return sequences
+
+
+def sequence_aliases(source_report, target_report):
+    """{target seqid: source seqid} for sequences with the same name and length in both reports"""
+    by_name = {value: accession for accession, value in source_report.items()}
+    return {accession: by_name[value] for accession, value in target_report.items() if value in by_name}
+
+
+def partition_overlaps(left, right, min_fraction=MIN_OVERLAP_FRACTION):
+    """
+    [(left tag, right tag, overlap_bp, overlap fraction)] for one (seqid, strand) partition.
+
+    Multi-segment CDS features repeat a locus tag; each tag pair keeps its
+    largest segment overlap.
+    """
+    best = {}
+    for a, b, overlap in sweep_overlaps(left, right):
+        fraction = overlap / min(feature_length(a), feature_length(b))
+        if fraction <= min_fraction:
+            continue
+        key = (a.locus_tag, b.locus_tag)
+        if key not in best or overlap > best[key][0]:
+            best[key] = (overlap, fraction)
+    return [(a_tag, b_tag, overlap, fraction) for (a_tag, b_tag), (overlap, fraction) in best.items()]
+
+
+class Assembly:
+    """The annotation and proteome of one assembly, as far as they exist in the working directory"""
+
+    def __init__(self, accession):
+        self.accession = accession
+        config = ASSEMBLIES.get(accession, {})
+        self.label = config.get('label', accession)
+        try:
+            self.features = cds_features(accession)
+            self.old_tags = old_locus_tag_mapping(accession)
+            self.protein_to_tag = {pid: tag for tag, pid in locus_tag_to_protein_id(accession).items()}
+        except FileNotFoundError:
+            self.features, self.old_tags, self.protein_to_tag = [], {}, {}
+
+        proteins = config.get('proteins')
+        self.proteins = proteins if proteins and os.path.exists(proteins) else None
+        report = config.get('report')
+        self.report = read_assembly_report(report) if report and os.path.exists(report) else {}
+        self.hashes = None
+
+    @property
+    def available(self):
+        return bool(self.features or self.old_tags or self.proteins)
+
+    def locus_tags(self):
+        """Every tag of the annotation; None without one (a proteome does not list every gene)"""
+        return {feature.locus_tag for feature in self.features} or None
+
+
+def official_evidence(source, target):
+    """(source tag, target tag) pairs where either annotation names the other's tag as its old_locus_tag"""
+    pairs = set()
+    for new, old, new_is_target in [(target, source, True), (source, target, False)]:
+        known = old.locus_tags()
+        for new_tag, old_tag in new.old_tags.items():
+            if known is None or old_tag in known:
+                pairs.add((old_tag, new_tag) if new_is_target else (new_tag, old_tag))
+    return pd.DataFrame(sorted(pairs), columns=['source_tag', 'target_tag']).assign(official=1)
+
+
+def protein_evidence(source, target):
+    """Tag pairs with identical proteins; protein is the larger number of tags sharing the sequence"""
+    columns = ['source_tag', 'target_tag', 'protein']
+    if not source.hashes or not target.hashes:
+        return pd.DataFrame(columns=columns)
+    left = pd.DataFrame(source.hashes, columns=['source_tag', 'digest']).drop_duplicates()
+    right = pd.DataFrame(target.hashes, columns=['target_tag', 'digest']).drop_duplicates()
+    pairs = left.merge(right, on='digest')
+    multiplicity = pd.concat([
+        pairs.groupby('digest')['source_tag'].transform('nunique'),
+        pairs.groupby('digest')['target_tag'].transform('nunique'),
+    ], axis=1).max(axis=1)
+    pairs = pairs.assign(protein=multiplicity)[columns]
+    # A tag with several isoforms of the same sequence counts once
+    return pairs.groupby(['source_tag', 'target_tag'], as_index=False)['protein'].min()
+
+
+def coordinate_tasks(source, target):
+    """[(source partition, target partition)] of CDS features on shared sequences"""
+    aliases = sequence_aliases(source.report, target.report)
+    left = partition(source.features)
+    right = partition(f._replace(seqid=aliases.get(f.seqid, f.seqid)) for f in target.features)
+    return [(left[key], right[key]) for key in sorted(left.keys() & right.keys())]
+
+
+def coordinate_weight(fraction):
+    """
+    Weight of an overlap covering this fraction of the shorter feature.
+
+    Rises linearly from MIN_SCORE just above MIN_OVERLAP_FRACTION to
+    COORDINATE_WEIGHT at full overlap, so every overlap of more than half
+    of the shorter feature counts on its own, as the rule says.
+    """
+    above = ((fraction - MIN_OVERLAP_FRACTION) / (1 - MIN_OVERLAP_FRACTION)).clip(0, 1)
+    return (MIN_SCORE + (COORDINATE_WEIGHT - MIN_SCORE) * above).where(fraction > MIN_OVERLAP_FRACTION, 0.0)
+
+
+def combine_evidence(official, protein, coordinate, min_score=MIN_SCORE):
+    """One row per tag pair with all evidence, its score and its relation"""
+    table = official.merge(protein, on=['source_tag', 'target_tag'], how='outer')
+    table = table.merge(coordinate, on=['source_tag', 'target_tag'], how='outer')
+    table = table.astype({'source_tag': str, 'target_tag': str})
+    table['official'] = table['official'].fillna(0).astype(int)
+    table['protein'] = table['protein'].fillna(0).astype(int)
+    table['overlap_bp'] = table['overlap_bp'].fillna(0).astype(int)
+    table['overlap_fraction'] = table['overlap_fraction'].fillna(0.0).astype(float)
+
+    missing = (1 - OFFICIAL_WEIGHT * table['official'])
+    missing *= 1 - (PROTEIN_WEIGHT / table['protein'].where(table['protein'] > 0)).fillna(0.0)
+    missing *= 1 - coordinate_weight(table['overlap_fraction'])
+    table['score'] = (1 - missing).round(4)
+
+    confident = table['score'] >= min_score
+    per_source = table[confident].groupby('source_tag')['target_tag'].transform('size')
+    per_target = table[confident].groupby('target_tag')['source_tag'].transform('size')
+    many = {False: '1', True: 'n'}
+    relation = (per_target > 1).map(many) + ':' + (per_source > 1).map(many)
+    table['relation'] = relation.reindex(table.index)
+    return table[COLUMNS].sort_values(['source_tag', 'target_tag']).reset_index(drop=True)
+
+
+def build_liftover(accessions=None, max_workers=None, min_score=MIN_SCORE):
+    """
+    {(source, target): liftover table} for every pair of the given assemblies.
+
+    Pairs are ordered as in ASSEMBLIES (older assembly first); pairs where
+    either side has no annotation or proteome are left out.
+    """
+    assemblies = [Assembly(accession) for accession in accessions or ASSEMBLIES]
+    assemblies = [assembly for assembly in assemblies if assembly.available]
+    pairs = list(combinations(assemblies, 2))
+
+    max_workers = max_workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        hashing = {
+            assembly.accession: pool.submit(protein_hashes, assembly.proteins, assembly.protein_to_tag)
+            for assembly in assemblies if assembly.proteins
+        }
+        joins = {
+            (source.accession, target.accession): [
+                pool.submit(partition_overlaps, left, right) for left, right in coordinate_tasks(source, target)
+            ]
+            for source, target in pairs
+        }
+        for assembly in assemblies:
+            if assembly.accession in hashing:
+                assembly.hashes = hashing[assembly.accession].result()
+
+        tables = {}
+        for source, target in pairs:
+            key = (source.accession, target.accession)
+            overlaps = [row for future in joins[key] for row in future.result()]
+            coordinate = pd.DataFrame(overlaps, columns=['source_tag', 'target_tag', 'overlap_bp', 'overlap_fraction'])
+            tables[key] = combine_evidence(
+                official_evidence(source, target), protein_evidence(source, target), coordinate, min_score
+            )
+    return tables
+
+
+def save_liftover(tables, db_path=LIFTOVER_PATH):
+    """Replace the stored tables of the given assembly pairs"""
+    os.makedirs(os.path.dirname(db_path) or '.', exist_ok=True)
+    with closing(sqlite3.connect(db_path)) as conn, conn:
+        conn.executescript(SCHEMA)
+        for (source, target), table in tables.items():
+            conn.execute('DELETE FROM liftover WHERE source = ? AND target = ?', (source, target))
+            conn.executemany(
+                f"INSERT INTO liftover VALUES ({', '.join('?' * (len(COLUMNS) + 2))})",
+                ((source, target, *row) for row in table[COLUMNS].astype(object).where(table.notna(), None)
+                 .itertuples(index=False, name=None))
+            )
+
+
+def load_liftover(source, target, min_score=MIN_SCORE, db_path=LIFTOVER_PATH):
+    """
+    Stored pairs from source tags to target tags with score >= min_score.
+
+    Either direction works; a pair stored the other way round is returned
+    with its tag columns swapped (and 1:n read as n:1).
+    """
+    with closing(sqlite3.connect(db_path)) as conn:
+        query = f"SELECT {', '.join(COLUMNS)} FROM liftover WHERE source = ? AND target = ? AND score >= ?"
+        table = pd.read_sql_query(query, conn, params=(source, target, min_score))
+        if table.empty:
+            table = pd.read_sql_query(query, conn, params=(target, source, min_score))
+            table = table.rename(columns={'source_tag': 'target_tag', 'target_tag': 'source_tag'})
+            table['relation'] = table['relation'].replace({'1:n': 'n:1', 'n:1': '1:n'})
+    return table[COLUMNS]
+
+
+def lift(ids, source, target, min_score=MIN_SCORE, db_path=LIFTOVER_PATH):
+    """
+    Translate a Series (or list) of source tags to target tags.
+
+    Only 1:1 pairs are used; other tags come back as NA.
+    """
+    ids = pd.Series(ids, dtype=object) if not isinstance(ids, pd.Series) else ids
+    table = load_liftover(source, target, min_score, db_path)
+    unique = table[table['relation'] == '1:1'].set_index('source_tag')['target_tag']
+    return ids.map(unique)
@@ -0,0 +1,672 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the parts of the Galaxy API our bioblend scripts use.
+
+Serves histories, history contents, dataset collections, datasets (including
+downloads with Range), tools (list, show, run), tools/fetch (pasted content),
+jobs (including resume and rerun) and version from an in-memory model seeded
+with the PRJNA1086003 samples, a few errored and paused DESeq2 jobs and the
+dataset_labelling collection #260. Every request can be delayed by a fixed
+latency plus jitter and failed with a given probability (HTTP 503), and all
+requests are counted per endpoint, so scripts can be benchmarked and
+regression-tested offline:
+
+    python mock_galaxy.py --port 8080 --latency 0.05 --failure-rate 0.02
+
+then point a script at it with GALAXY_URL=http://127.0.0.1:8080.
+"""
+
+import argparse
+import csv
+import json
+import os
+import random
+import re
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlparse
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+LABELS_PATH = os.path.join(SCRIPT_DIR, '..', '..', 'dataset_labelling', 'labels.tsv')
+
+# Fixed ids used by dataset_labelling/apply_tags_260.py
+TAGS_HISTORY_ID = "bbd44e69cb8906b5713a37cc4e6846ea"
+TAGS_COLLECTION_ID = "50490a95897034a8"
+
+# Seconds a submitted job spends queued + running before it turns 'ok'
+JOB_RUNTIME = 0.5
+
+# Padding that makes the account and the project history look realistic
+FILLER_HISTORIES = 200
+FILLER_DATASETS = 300
+
+DESEQ2_LINEAGE = "toolshed.g2.bx.psu.edu/repos/iuc/deseq2/deseq2"
+
+
+def _param(name, kind, **extra):
+    return dict(name=name, type=kind, optional=False, **extra)
+
+
+def _select(name, values, multiple=False):
+    return _param(name, 'select', multiple=multiple, options=[[v, v, i == 0] for i, v in enumerate(values)],
+                  value=None if multiple else values[0])
+
+
+# Trimmed io_details inputs of the IUC DESeq2 wrapper
+DESEQ2_INPUTS = [
+    _param('select_data', 'conditional', test_param=_select('how', ['datasets_per_level', 'group_tags']), cases=[
+        {'value': 'datasets_per_level', 'inputs': [
+            _param('rep_factorName', 'repeat', min=1, max=None, inputs=[
+                _param('factorName', 'text'),
+                _param('rep_factorLevel', 'repeat', min=2, max=None, inputs=[
+                    _param('factorLevel', 'text'),
+                    _param('countsFile', 'data', multiple=True),
+                ]),
+            ]),
+        ]},
+        {'value': 'group_tags', 'inputs': [
+            _param('countsFile', 'data_collection'),
+            _param('rep_factorName', 'repeat', min=1, max=None, inputs=[
+                _param('factorName', 'text'),
+                _param('rep_factorLevel', 'repeat', min=2, max=None, inputs=[
+                    _param('factorLevel', 'text'),
+                    _param('groups', 'text'),
+                ]),
+            ]),
+        ]},
+    ]),
+    dict(_param('batch_factors', 'data'), optional=True),
+    _param('header', 'boolean'),
+    _param('tximport', 'conditional', test_param=_select('tximport_selector', ['count', 'tximport']), cases=[
+        {'value': 'count', 'inputs': []},
+        {'value': 'tximport', 'inputs': [
+            _select('txtype', ['sailfish', 'salmon', 'kallisto', 'rsem']),
+            _param('mapping_format', 'conditional',
+                   test_param=_select('mapping_format_selector', ['gtf', 'tabular']), cases=[
+                       {'value': 'gtf', 'inputs': [_param('gtf_file', 'data')]},
+                       {'value': 'tabular', 'inputs': [_param('tabular_file', 'data')]},
+                   ]),
+        ]},
+    ]),
+    _select('esf', ['', 'ratio', 'poscounts', 'iterate']),
+    _select('fit_type', ['1', '2', '3']),
+    _param('advanced_options', 'section', inputs=[
+        _param('outlier_replace_off', 'boolean'),
+        _param('outlier_filter_off', 'boolean'),
+        _param('auto_mean_filter_off', 'boolean'),
+        _param('use_beta_priors', 'boolean'),
+    ]),
+    _param('output_options', 'section', inputs=[
+        _select('output_selector', ['pdf', 'normCounts', 'normRLog', 'normVST', 'many_contrasts'], multiple=True),
+        _param('alpha_ma', 'float', min=0, max=1),
+    ]),
+]
+
+# Installed tools: (id, name, version, io_details inputs)
+TOOLS = [
+    (f"{DESEQ2_LINEAGE}/2.11.40.7+galaxy0", 'DESeq2', '2.11.40.7+galaxy0', DESEQ2_INPUTS),
+    (f"{DESEQ2_LINEAGE}/2.11.40.8+galaxy0", 'DESeq2', '2.11.40.8+galaxy0', DESEQ2_INPUTS),
+    ("toolshed.g2.bx.psu.edu/repos/devteam/fastqc/fastqc/0.74+galaxy0", 'FastQC', '0.74+galaxy0', []),
+    ("toolshed.g2.bx.psu.edu/repos/iuc/featurecounts/featurecounts/2.0.3+galaxy2", 'featureCounts',
+     '2.0.3+galaxy2', []),
+]
+
+
+def now():
+    return datetime.utcnow()
+
+
+def iso(ts):
+    return ts.isoformat(timespec='microseconds')
+
+
+class MockGalaxy:
+    """In-memory Galaxy model; all public methods are thread-safe"""
+
+    def __init__(self, data_dir=SCRIPT_DIR, labels_path=LABELS_PATH,
+                 filler_histories=FILLER_HISTORIES, filler_datasets=FILLER_DATASETS,
+                 job_runtime=JOB_RUNTIME):
+        self.data_dir = data_dir
+        self.labels_path = labels_path
+        self.filler_histories = filler_histories
+        self.filler_datasets = filler_datasets
+        self.job_runtime = job_runtime
+        self.lock = threading.RLock()
+        self.reset()
+
+    # Model
+
+    def reset(self):
+        """Drop all state and counters and reseed"""
+        with self.lock:
+            self._next_id = 0x1000
+            self.histories = {}
+            self.datasets = {}
+            self.collections = {}
+            self.jobs = {}
+            self.requests = Counter()
+            self.seed()
+
+    def new_id(self):
+        self._next_id += 1
+        return f"{self._next_id:016x}"
+
+    def add_history(self, name, history_id=None):
+        history_id = history_id or self.new_id()
+        self.histories[history_id] = {
+            'id': history_id, 'name': name, 'update_time': iso(now()),
+            'deleted': False, 'next_hid': 1, 'contents': [],
+        }
+        return history_id
+
+    def _next_hid(self, history_id):
+        history = self.histories[history_id]
+        hid = history['next_hid']
+        history['next_hid'] += 1
+        history['update_time'] = iso(now())
+        return hid
+
+    def add_dataset(self, history_id, name, content=b'', file_ext='tabular', tags=None, state='ok'):
+        dataset_id = self.new_id()
+        ts = iso(now())
+        self.datasets[dataset_id] = {
+            'id': dataset_id, 'hid': self._next_hid(history_id), 'name': name,
+            'history_id': history_id, 'history_content_type': 'dataset', 'state': state,
+            'file_ext': file_ext, 'file_size': len(content), 'tags': list(tags or []),
+            'deleted': False, 'visible': True, 'create_time': ts, 'update_time': ts,
+            'download_url': f"/api/datasets/{dataset_id}/display", 'hashes': [],
+            'creating_job': None, 'content': content,
+        }
+        self.histories[history_id]['contents'].append(('dataset', dataset_id))
+        return dataset_id
+
+    def add_collection(self, history_id, name, elements, collection_id=None, collection_type='list'):
+        """elements is a list of (identifier, dataset id)"""
+        collection_id = collection_id or self.new_id()
+        ts = iso(now())
+        self.collections[collection_id] = {
+            'id': collection_id, 'hid': self._next_hid(history_id), 'name': name,
+            'history_id': history_id, 'history_content_type': 'dataset_collection',
+            'collection_type': collection_type, 'populated_state': 'ok', 'deleted': False,
+            'visible': True, 'create_time': ts, 'update_time': ts, 'tags': [],
+            'element_count': len(elements), 'elements': list(elements),
+        }
+        self.histories[history_id]['contents'].append(('dataset_collection', collection_id))
+        return collection_id
+
+    def add_job(self, history_id, tool_id, output_ids, final_state='ok', inputs=None, params=None, stderr='',
+                age=0):
+        """
+        A job created age seconds ago that runs for job_runtime and ends in
+        final_state; 'paused' jobs never start.
+        """
+        job_id = self.new_id()
+        ts = now() - timedelta(seconds=age)
+        self.jobs[job_id] = {
+            'id': job_id, 'tool_id': tool_id, 'history_id': history_id,
+            'created': ts, 'create_time': iso(ts), 'outputs': output_ids,
+            'final_state': final_state, 'inputs': list(inputs or []), 'params': params or {},
+            'stderr': stderr, 'started': None,
+        }
+        for dataset_id in output_ids:
+            self.datasets[dataset_id]['creating_job'] = job_id
+        return job_id
+
+    def seed(self):
+        """PRJNA1086003 project history, the collection #260 history and filler"""
+        for i in range(self.filler_histories):
+            self.add_history(f"Unnamed history {i}")
+
+        history_id = self.add_history('prjna1086003')
+        for i in range(self.filler_datasets):
+            self.add_dataset(history_id, f"featureCounts on data {i}", b'gene\tcount\n')
+
+        groups = {}
+        for experiment in ('in_vitro', 'in_vivo'):
+            path = os.path.join(self.data_dir, f'samples_{experiment}.tsv')
+            with open(path) as f:
+                groups[experiment] = [
+                    (row['Run'], row['Sample Name'], row['strain'])
+                    for row in csv.DictReader(f, delimiter='\t')
+                ]
+
+        counts = {}
+        for experiment, samples in groups.items():
+            for i, (run, sample_name, _) in enumerate(samples):
+                content = f"gene\t{run}\nB9J08_000001\t{100 * (i + 1)}\n".encode()
+                counts[run] = self.add_dataset(history_id, run, content, tags=[sample_name])
+
+        all_runs = [run for samples in groups.values() for run, _, _ in samples]
+        while self.histories[history_id]['next_hid'] < 601:
+            self._next_hid(history_id)
+        self.add_collection(history_id, 'PRJNA1086003 counts', [(run, counts[run]) for run in all_runs])
+        for experiment, samples in groups.items():
+            self.add_collection(
+                history_id, f'PRJNA1086003_{experiment}', [(run, counts[run]) for run, _, _ in samples]
+            )
+
+        self.seed_stalled_jobs(history_id)
+
+        tags_history = self.add_history('dataset labelling', history_id=TAGS_HISTORY_ID)
+        elements = []
+        if os.path.exists(self.labels_path):
+            with open(self.labels_path) as f:
+                for row in csv.reader(f, delimiter='\t'):
+                    if row:
+                        elements.append((row[0], self.add_dataset(tags_history, row[0], b'@r\nACGT\n+\nIIII\n')))
+        self.add_collection(tags_history, 'collection 260', elements, collection_id=TAGS_COLLECTION_ID)
+
+    def seed_stalled_jobs(self, history_id):
+        """An errored DESeq2 run, a job paused behind it and a DESeq2 run paused on its own"""
+        def outputs(names, state):
+            return [self.add_dataset(history_id, name, b'', state=state) for name in names]
+
+        deseq2_id = TOOLS[1][0]
+        failed = outputs(['DESeq2 result file on data 602', 'DESeq2 plots on data 602'], 'error')
+        self.add_job(history_id, deseq2_id, failed, final_state='error', params={'header': True}, age=7200,
+                     stderr="Error in DESeqDataSet(se, design = design, ignoreRank) :\n"
+                            "  every gene contains at least one zero, cannot compute log geometric means")
+        annotated = outputs([f'Annotate DESeq2/DEXSeq output tables on data {self.datasets[failed[0]]["hid"]}'],
+                            'paused')
+        self.add_job(history_id, 'toolshed.g2.bx.psu.edu/repos/iuc/deg_annotate/deg_annotate/1.1.0',
+                     annotated, final_state='paused', inputs=failed[:1], age=7100)
+        paused = outputs(['DESeq2 result file on data 603', 'DESeq2 plots on data 603'], 'paused')
+        self.add_job(history_id, deseq2_id, paused, final_state='paused', params={'header': True}, age=3600)
+
+    # Views
+
+    def job_state(self, job):
+        if job['final_state'] == 'paused':
+            return 'paused'
+        elapsed = (now() - job['created']).total_seconds()
+        if elapsed < self.job_runtime * 0.3:
+            return 'queued'
+        if elapsed < self.job_runtime:
+            return 'running'
+        return job['final_state']
+
+    def refresh_job(self, job):
+        """Advance a job (and its outputs) according to the wall clock"""
+        state = self.job_state(job)
+        if job.get('state') != state:
+            if state not in ('new', 'queued', 'paused') and job['started'] is None:
+                job['started'] = job['created'] + timedelta(seconds=self.job_runtime * 0.3)
+            job['state'] = state
+            job['update_time'] = iso(now())
+            for dataset_id in job['outputs']:
+                dataset = self.datasets[dataset_id]
+                dataset['state'] = state
+                dataset['update_time'] = job['update_time']
+        return job
+
+    def dataset_view(self, dataset_id):
+        dataset = self.datasets[dataset_id]
+        if dataset['creating_job'] in self.jobs:
+            self.refresh_job(self.jobs[dataset['creating_job']])
+        return {k: v for k, v in dataset.items() if k != 'content'}
+
+    def job_view(self, job_id, full=False):
+        job = self.refresh_job(self.jobs[job_id])
+        view = {k: job[k] for k in ('id', 'tool_id', 'history_id', 'state', 'create_time', 'update_time')}
+        if full:
+            view['inputs'] = {f'input{i}': {'id': dataset_id, 'src': 'hda'} for i, dataset_id in enumerate(job['inputs'])}
+            view['outputs'] = {f'output{i}': {'id': dataset_id, 'src': 'hda'}
+                               for i, dataset_id in enumerate(job['outputs'])}
+            failed = job['state'] == 'error'
+            view.update(stderr=job['stderr'] if failed else '', tool_stderr=job['stderr'] if failed else '',
+                        exit_code=1 if failed else (0 if job['state'] == 'ok' else None), job_messages=[])
+            view['job_metrics'] = [] if job['started'] is None else [
+                {'plugin': 'core', 'name': 'start_epoch', 'raw_value': str(job['started'].replace(tzinfo=timezone.utc).timestamp())}
+            ]
+        return view
+
+    def resume_job(self, job_id):
+        """Start a paused job from scratch; returns its outputs"""
+        job = self.jobs[job_id]
+        if job['final_state'] == 'paused':
+            job.update(final_state='ok', created=now(), started=None)
+        return job['outputs']
+
+    def paused_dependents(self, job_id):
+        outputs = set(self.jobs[job_id]['outputs'])
+        return [j for j in self.jobs.values() if j['final_state'] == 'paused' and outputs & set(j['inputs'])]
+
+    def collection_view(self, collection_id, elements=True):
+        collection = self.collections[collection_id]
+        view = {k: v for k, v in collection.items() if k != 'elements'}
+        if elements:
+            view['elements'] = [
+                {
+                    'element_identifier': identifier,
+                    'element_index': i,
+                    'element_type': 'hda',
+                    'object': {k: v for k, v in self.dataset_view(dataset_id).items()
+                               if k in ('id', 'name', 'state', 'tags', 'file_ext', 'file_size', 'hid')},
+                }
+                for i, (identifier, dataset_id) in enumerate(collection['elements'])
+            ]
+        return view
+
+    def contents(self, history_id):
+        for kind, item_id in self.histories[history_id]['contents']:
+            if kind == 'dataset':
+                yield self.dataset_view(item_id)
+            else:
+                yield self.collection_view(item_id, elements=False)
+
+
+def parse_filters(query):
+    """Galaxy-style q/qv pairs -> list of (attribute, op, value)"""
+    filters = []
+    for q, qv in zip(query.get('q', []), query.get('qv', [])):
+        attr, _, op = q.partition('-')
+        filters.append((attr, op or 'eq', qv))
+    return filters
+
+
+def matches(item, filters):
+    for attr, op, value in filters:
+        actual = item.get(attr)
+        if isinstance(actual, bool):
+            actual, value = str(actual).lower(), value.lower()
+        actual = '' if actual is None else str(actual)
+        if op == 'eq' and actual != value:
+            return False
+        if op == 'contains' and value.lower() not in actual.lower():
+            return False
+        if op == 'ge' and not actual >= value:
+            return False
+        if op == 'le' and not actual <= value:
+            return False
+    return True
+
+
+def select_keys(items, query):
+    keys = query.get('keys', [''])[0]
+    if not keys:
+        return items
+    wanted = keys.split(',')
+    return [{k: item.get(k) for k in wanted} for item in items]
+
+
+class MockGalaxyHandler(BaseHTTPRequestHandler):
+    """Routes requests to the server's MockGalaxy model"""
+
+    protocol_version = 'HTTP/1.1'
+
+    ROUTES = [
+        ('GET', r'/api/version', 'version'),
+        ('GET', r'/api/histories', 'list_histories'),
+        ('GET', r'/api/histories/(?P<history_id>\w+)', 'show_history'),
+        ('GET', r'/api/histories/(?P<history_id>\w+)/contents', 'list_contents'),
+        ('POST', r'/api/histories/(?P<history_id>\w+)/contents', 'create_collection'),
+        ('GET', r'/api/histories/(?P<history_id>\w+)/contents/dataset_collections/(?P<collection_id>\w+)',
+         'show_collection'),
+        ('GET', r'/api/histories/(?P<history_id>\w+)/contents/(?P<dataset_id>\w+)', 'show_dataset'),
+        ('PUT', r'/api/histories/(?P<history_id>\w+)/contents/(?P<dataset_id>\w+)', 'update_dataset'),
+        ('GET', r'/api/datasets', 'list_datasets'),
+        ('GET', r'/api/datasets/(?P<dataset_id>\w+)', 'show_dataset'),
+        ('GET', r'/api/datasets/(?P<dataset_id>\w+)/display', 'display_dataset'),
+        ('GET', r'/api/tools', 'list_tools'),
+        ('POST', r'/api/tools', 'run_tool'),
+        ('POST', r'/api/tools/fetch', 'fetch'),
+        ('GET', r'/api/tools/(?P<tool_id>.+)', 'show_tool'),
+        ('GET', r'/api/jobs', 'list_jobs'),
+        ('GET', r'/api/jobs/(?P<job_id>\w+)', 'show_job'),
+        ('PUT', r'/api/jobs/(?P<job_id>\w+)/resume', 'resume_job'),
+        ('GET', r'/api/jobs/(?P<job_id>\w+)/build_for_rerun', 'build_for_rerun'),
+    ]
+
+    def log_message(self, *args):
+        pass
+
+    @property
+    def galaxy(self):
+        return self.server.galaxy
+
+    def do_GET(self):
+        self.dispatch('GET')
+
+    def do_POST(self):
+        self.dispatch('POST')
+
+    def do_PUT(self):
+        self.dispatch('PUT')
+
+    def dispatch(self, method):
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        length = int(self.headers.get('Content-Length') or 0)
+        body = json.loads(self.rfile.read(length) or b'{}') if length else {}
+
+        for route_method, pattern, name in self.ROUTES:
+            match = re.fullmatch(pattern, url.path)
+            if route_method == method and match:
+                break
+        else:
+            return self.send_json({'err_msg': f'No route for {method} {url.path}'}, 404)
+
+        with self.galaxy.lock:
+            self.galaxy.requests[name] += 1
+
+        server = self.server
+        if server.latency or server.jitter:
+            time.sleep(server.latency + random.uniform(0, server.jitter))
+        if server.failure_rate and random.random() < server.failure_rate:
+            return self.send_json({'err_msg': 'Injected failure'}, 503)
+
+        try:
+            with self.galaxy.lock:
+                getattr(self, name)(query=query, body=body, **match.groupdict())
+        except KeyError as e:
+            self.send_json({'err_msg': f'Object not found: {e}'}, 404)
+
+    def send_json(self, payload, status=200):
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    # Endpoints
+
+    def version(self, **_):
+        self.send_json({'version_major': '23.1', 'version_minor': '1'})
+
+    def list_histories(self, query, **_):
+        histories = [
+            {k: v for k, v in h.items() if k not in ('contents', 'next_hid')}
+            for h in self.galaxy.histories.values()
+        ]
+        histories = [h for h in histories if matches(h, parse_filters(query))]
+        histories.sort(key=lambda h: h['update_time'], reverse=True)
+        self.send_json(select_keys(histories, query))
+
+    def show_history(self, history_id, query, **_):
+        if query.get('contents'):
+            return self.list_contents(history_id=history_id, query={})
+        history = self.galaxy.histories[history_id]
+        self.send_json({k: v for k, v in history.items() if k not in ('contents', 'next_hid')})
+
+    def list_contents(self, history_id, query, **_):
+        filters = parse_filters(query)
+        if 'types' in query:
+            filters.append(('history_content_type', 'eq', query['types'][0]))
+        items = [item for item in self.galaxy.contents(history_id) if matches(item, filters)]
+        if query.get('order', [''])[0] == 'hid-dsc':
+            items.reverse()
+        self.send_json(select_keys(items, query))
+
+    def show_collection(self, collection_id, **_):
+        self.send_json(self.galaxy.collection_view(collection_id))
+
+    def create_collection(self, history_id, body, **_):
+        elements = [(e['name'], e['id']) for e in body['element_identifiers']]
+        missing = [dataset_id for _, dataset_id in elements if dataset_id not in self.galaxy.datasets]
+        if missing:
+            return self.send_json({'err_msg': f'Unknown datasets: {missing}'}, 400)
+        collection_id = self.galaxy.add_collection(
+            history_id, body['name'], elements, collection_type=body.get('collection_type', 'list')
+        )
+        self.send_json(self.galaxy.collection_view(collection_id))
+
+    def show_dataset(self, dataset_id, **_):
+        self.send_json(self.galaxy.dataset_view(dataset_id))
+
+    def update_dataset(self, dataset_id, body, **_):
+        dataset = self.galaxy.datasets[dataset_id]
+        for key in ('tags', 'name', 'visible'):
+            if key in body:
+                dataset[key] = body[key]
+        dataset['update_time'] = iso(now())
+        self.send_json(self.galaxy.dataset_view(dataset_id))
+
+    def list_datasets(self, query, **_):
+        items = [self.galaxy.dataset_view(i) for i in self.galaxy.datasets]
+        if 'history_id' in query:
+            items = [d for d in items if d['history_id'] == query['history_id'][0]]
+        items = [d for d in items if matches(d, parse_filters(query))]
+        items.sort(key=lambda d: d['update_time'], reverse=True)
+        offset = int(query.get('offset', ['0'])[0])
+        limit = int(query.get('limit', ['500'])[0])
+        self.send_json(items[offset:offset + limit])
+
+    def display_dataset(self, dataset_id, **_):
+        content = self.galaxy.datasets[dataset_id]['content']
+        start = 0
+        status = 200
+        match = re.fullmatch(r'bytes=(\d+)-', self.headers.get('Range', ''))
+        if match:
+            start = int(match.group(1))
+            if start >= len(content) and content:
+                self.send_response(416)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+            status = 206
+        data = content[start:]
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/octet-stream')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _tool_response(self, history_id, tool_id, output_ids):
+        job_id = self.galaxy.add_job(history_id, tool_id, output_ids)
+        self.send_json({
+            'outputs': [self.galaxy.dataset_view(i) for i in output_ids],
+            'jobs': [self.galaxy.job_view(job_id)],
+            'output_collections': [],
+            'implicit_collections': [],
+        })
+
+    def list_tools(self, **_):
+        self.send_json([{'id': tool_id, 'name': name, 'version': version, 'model_class': 'Tool'}
+                        for tool_id, name, version, _ in TOOLS])
+
+    def show_tool(self, tool_id, **_):
+        # A versionless Tool Shed id resolves to the newest installed version (TOOLS is oldest first)
+        tool_id = unquote(tool_id)
+        for known_id, name, version, inputs in reversed(TOOLS):
+            if known_id == tool_id or known_id.startswith(tool_id + '/'):
+                return self.send_json({'id': known_id, 'name': name, 'version': version, 'inputs': inputs})
+        self.send_json({'err_msg': f'Tool {tool_id} not found'}, 404)
+
+    def run_tool(self, body, **_):
+        history_id = body['history_id']
+        tool_id = body['tool_id']
+        remap_job_id = (body.get('inputs') or {}).get('rerun_remap_job_id')
+        if remap_job_id:
+            # The new job takes over the failed job's outputs and releases its paused dependents
+            for job in self.galaxy.paused_dependents(remap_job_id):
+                self.galaxy.resume_job(job['id'])
+            output_ids, self.galaxy.jobs[remap_job_id]['outputs'] = self.galaxy.jobs[remap_job_id]['outputs'], []
+            return self._tool_response(history_id, tool_id, output_ids)
+        if 'deseq2' in tool_id:
+            names = [('deseq_out', 'DESeq2 result file'), ('plots', 'DESeq2 plots'),
+                     ('counts_out', 'Normalized counts')]
+        else:
+            names = [('output', f'{tool_id} output')]
+        output_ids = []
+        for output_name, label in names:
+            content = b'GeneID\tbase mean\tlog2(FC)\tStdErr\tWald-Stats\tP-value\tP-adj\n'
+            dataset_id = self.galaxy.add_dataset(history_id, label, content, state='new')
+            self.galaxy.datasets[dataset_id]['output_name'] = output_name
+            output_ids.append(dataset_id)
+        self._tool_response(history_id, tool_id, output_ids)
+
+    def fetch(self, body, **_):
+        history_id = body['history_id']
+        output_ids = []
+        for target in body.get('targets', []):
+            for element in target.get('elements', []):
+                if element.get('src') != 'pasted':
+                    return self.send_json({'err_msg': 'Only pasted elements are supported'}, 400)
+                content = element.get('paste_content', '').encode()
+                output_ids.append(self.galaxy.add_dataset(
+                    history_id, element.get('name', 'Pasted Entry'), content,
+                    file_ext=element.get('ext', 'auto'), state='queued'
+                ))
+        self._tool_response(history_id, '__DATA_FETCH__', output_ids)
+
+    def list_jobs(self, query, **_):
+        jobs = [self.galaxy.job_view(job_id) for job_id in self.galaxy.jobs]
+        if 'history_id' in query:
+            jobs = [j for j in jobs if j['history_id'] == query['history_id'][0]]
+        if 'state' in query:
+            jobs = [j for j in jobs if j['state'] in query['state']]
+        jobs.sort(key=lambda j: j['update_time'], reverse=True)
+        self.send_json(jobs[:int(query.get('limit', ['500'])[0])])
+
+    def show_job(self, job_id, query, **_):
+        full = query.get('full', [''])[0].lower() == 'true'
+        self.send_json(self.galaxy.job_view(job_id, full=full))
+
+    def resume_job(self, job_id, **_):
+        output_ids = self.galaxy.resume_job(job_id)
+        self.send_json([{'id': dataset_id, 'src': 'hda'} for dataset_id in output_ids])
+
+    def build_for_rerun(self, job_id, **_):
+        job = self.galaxy.jobs[job_id]
+        self.send_json({
+            'id': job['tool_id'], 'history_id': job['history_id'], 'state_inputs': dict(job['params']),
+            'job_remap': job['state'] == 'error' and bool(self.galaxy.paused_dependents(job_id)),
+        })
+
+
+def start_server(galaxy=None, host='127.0.0.1', port=0, latency=0.0, jitter=0.0, failure_rate=0.0):
+    """Start a mock server in a background thread; returns (server, base URL)"""
+    server = ThreadingHTTPServer((host, port), MockGalaxyHandler)
+    server.daemon_threads = True
+    server.galaxy = galaxy or MockGalaxy()
+    server.latency = latency
+    server.jitter = jitter
+    server.failure_rate = failure_rate
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a local mock Galaxy API server")
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--latency', type=float, default=0.0, help="seconds added to every request")
+    parser.add_argument('--jitter', type=float, default=0.0, help="extra random latency, up to this many seconds")
+    parser.add_argument('--failure-rate', type=float, default=0.0, help="fraction of requests answered with 503")
+    args = parser.parse_args()
+
+    server, url = start_server(port=args.port, latency=args.latency, jitter=args.jitter,
+                               failure_rate=args.failure_rate)
+    print(f"Mock Galaxy listening on {url} (Ctrl-C to stop)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
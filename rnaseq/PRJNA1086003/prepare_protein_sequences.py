@@ -10,6 +10,8 @@ from Bio import Entrez, SeqIO
 import time
 import requests
 
+from gene_ids import load_mapping, report_problems
+
 # Set email for Entrez
 Entrez.email = "your_email@example.com"
 
@@ -17,25 +19,8 @@ Entrez.email = "your_email@example.com"
 LFC_THRESHOLD = 1.0
 PADJ_THRESHOLD = 0.01
 
-def normalize_gene_id_v2_to_v3(gene_id):
-    """Convert v2 (6-digit) to v3 (5-digit)"""
-    if not isinstance(gene_id, str):
-        return gene_id
-    parts = gene_id.split('_')
-    if len(parts) == 2 and parts[0] == 'B9J08':
-        numeric = parts[1].lstrip('0') or '0'
-        return f"B9J08_{numeric.zfill(5)}"
-    return gene_id
-
-def normalize_gene_id_v3_to_v2(gene_id):
-    """Convert v3 (5-digit) to v2 (6-digit)"""
-    if not isinstance(gene_id, str):
-        return gene_id
-    parts = gene_id.split('_')
-    if len(parts) == 2 and parts[0] == 'B9J08':
-        numeric = parts[1]
-        return f"B9J08_{numeric.zfill(6)}"
-    return gene_id
+# Official v2 <-> v3 mapping; IDs without a single counterpart are written as 'NA'
+mapping = load_mapping()
 
 # Load paper's DEGs
 print("Loading paper's DEGs...")
@@ -46,13 +31,15 @@ paper_vitro = paper_vitro_raw.iloc[2:].copy()
 paper_vitro.columns = ['Gene_ID_v2', 'LFC', 'FDR', 'Gene_name', 'Description']
 paper_vitro['LFC'] = pd.to_numeric(paper_vitro['LFC'], errors='coerce')
 paper_vitro = paper_vitro.dropna(subset=['LFC'])
-paper_vitro['Gene_ID_v3'] = paper_vitro['Gene_ID_v2'].apply(normalize_gene_id_v2_to_v3)
+report_problems(paper_vitro['Gene_ID_v2'], mapping, 'v2', "paper in vitro IDs")
+paper_vitro['Gene_ID_v3'] = mapping.translate(paper_vitro['Gene_ID_v2'], 'v2', 'v3').fillna('NA')
 
 paper_vivo = paper_vivo_raw.iloc[2:].copy()
 paper_vivo.columns = ['Gene_ID_v2', 'LFC', 'FDR', 'Gene_name', 'Description']
 paper_vivo['LFC'] = pd.to_numeric(paper_vivo['LFC'], errors='coerce')
 paper_vivo = paper_vivo.dropna(subset=['LFC'])
-paper_vivo['Gene_ID_v3'] = paper_vivo['Gene_ID_v2'].apply(normalize_gene_id_v2_to_v3)
+report_problems(paper_vivo['Gene_ID_v2'], mapping, 'v2', "paper in vivo IDs")
+paper_vivo['Gene_ID_v3'] = mapping.translate(paper_vivo['Gene_ID_v2'], 'v2', 'v3').fillna('NA')
 
 print(f"  Paper in vitro DEGs: {len(paper_vitro)}")
 print(f"  Paper in vivo DEGs: {len(paper_vivo)}")
@@ -70,14 +57,16 @@ our_vitro_sig = our_vitro[
     (np.abs(our_vitro['log2FoldChange']) >= LFC_THRESHOLD)
 ].copy()
 our_vitro_sig['Gene_ID_v3'] = our_vitro_sig['GeneID']
-our_vitro_sig['Gene_ID_v2'] = our_vitro_sig['GeneID'].apply(normalize_gene_id_v3_to_v2)
+report_problems(our_vitro_sig['GeneID'], mapping, 'v3', "our in vitro IDs")
+our_vitro_sig['Gene_ID_v2'] = mapping.translate(our_vitro_sig['GeneID'], 'v3', 'v2').fillna('NA')
 
 our_vivo_sig = our_vivo[
     (our_vivo['padj'] < PADJ_THRESHOLD) &
     (np.abs(our_vivo['log2FoldChange']) >= LFC_THRESHOLD)
 ].copy()
 our_vivo_sig['Gene_ID_v3'] = our_vivo_sig['GeneID']
-our_vivo_sig['Gene_ID_v2'] = our_vivo_sig['GeneID'].apply(normalize_gene_id_v3_to_v2)
+report_problems(our_vivo_sig['GeneID'], mapping, 'v3', "our in vivo IDs")
+our_vivo_sig['Gene_ID_v2'] = mapping.translate(our_vivo_sig['GeneID'], 'v3', 'v2').fillna('NA')
 
 print(f"  Our in vitro DEGs: {len(our_vitro_sig)}")
 print(f"  Our in vivo DEGs: {len(our_vivo_sig)}")
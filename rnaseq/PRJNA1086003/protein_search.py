@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""
+Local k-mer similarity search over a protein .faa, for near-identical matches.
+
+The index holds, for every amino acid 5-mer of the proteome, the proteins
+containing it: sorted k-mer codes, CSR offsets and a postings array, plus
+the protein ids, header locus tags and lengths. It is built once per FASTA
+and saved under .cache/protein_search/ as .npy files, which query processes
+open memory-mapped, so every worker shares one copy in the page cache.
+
+A query is reduced to its minimizers (the smallest hashed k-mer of each
+window of WINDOW consecutive k-mers), each minimizer is looked up with one
+searchsorted over the index keys and the hits per protein are counted with
+bincount. The fraction of query minimizers found in a protein (containment)
+estimates identity over the query: with identity p, a k-mer survives with
+probability about p^k, so identity ~ containment^(1/k). That identity
+only covers the query: a fragment of a longer protein reads 100%, so every
+hit also carries both lengths and coverage (shorter length over longer
+length). This is an estimate for ranking and triage, not an alignment; it
+reads low for short or low-complexity proteins.
+
+Batches of queries are split across processes:
+
+    hits = search_proteins('GCA_002759435.3_protein.faa', {'B9J08_001458': sequence})
+"""
+
+import os
+import shutil
+import tempfile
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from Bio.SeqIO.FastaIO import SimpleFastaParser
+from numpy.lib.stride_tricks import sliding_window_view
+
+from protein_fingerprints import header_locus_tag
+
+SEARCH_INDEX_DIR = os.path.join('.cache', 'protein_search')
+
+K = 5
+WINDOW = 4
+ALPHABET = 'ACDEFGHIKLMNPQRSTVWY'
+
+# K-mers found in more proteins than this (repeats, low complexity) are not indexed
+MAX_POSTINGS = 200
+
+TOP_HITS = 5
+MIN_CONTAINMENT = 0.1
+
+# One entry per (query, target) hit, best first per query
+Hit = namedtuple('Hit', ['query', 'target', 'locus_tag', 'shared', 'minimizers', 'containment', 'identity',
+                         'query_length', 'target_length', 'coverage'])
+
+_CODES = np.full(256, -1, dtype=np.int64)
+_CODES[np.frombuffer(ALPHABET.encode(), dtype=np.uint8)] = np.arange(len(ALPHABET))
+_CODES[np.frombuffer(ALPHABET.lower().encode(), dtype=np.uint8)] = np.arange(len(ALPHABET))
+
+INDEX_ARRAYS = ('keys', 'offsets', 'postings', 'ids', 'locus_tags', 'lengths')
+
+
+def kmer_codes(sequence, k=K):
+    """Integer code of every k-mer of a protein, in order; -1 where a k-mer has a non-standard residue"""
+    residues = _CODES[np.frombuffer(sequence.strip().rstrip('*').encode(), dtype=np.uint8)]
+    if len(residues) < k:
+        return np.empty(0, dtype=np.int64)
+    windows = sliding_window_view(residues, k)
+    codes = windows @ (len(ALPHABET) ** np.arange(k - 1, -1, -1, dtype=np.int64))
+    return np.where((windows >= 0).all(axis=1), codes, -1)
+
+
+def _hash(codes):
+    # Multiplicative hash so minimizers are not biased towards alanine-rich k-mers
+    return (codes.astype(np.uint64) * np.uint64(0x9E3779B97F4A7C15)) >> np.uint64(32)
+
+
+def minimizers(sequence, k=K, window=WINDOW):
+    """Distinct minimizer codes of a protein (all of its k-mers if it is shorter than one window)"""
+    codes = kmer_codes(sequence, k)
+    if len(codes) >= window:
+        hashed = np.where(codes >= 0, _hash(codes), np.iinfo(np.uint64).max)
+        positions = sliding_window_view(hashed, window).argmin(axis=1) + np.arange(len(codes) - window + 1)
+        codes = codes[positions]
+    return np.unique(codes[codes >= 0])
+
+
+def build_search_index(fasta_path, index_dir, k=K, max_postings=MAX_POSTINGS):
+    """Index every distinct k-mer of every protein of a FASTA file and save the arrays in index_dir"""
+    ids, locus_tags, lengths, codes, owners = [], [], [], [], []
+    with open(fasta_path) as f:
+        for header, sequence in SimpleFastaParser(f):
+            protein_codes = np.unique(kmer_codes(sequence, k))
+            protein_codes = protein_codes[protein_codes >= 0]
+            codes.append(protein_codes)
+            owners.append(np.full(len(protein_codes), len(ids), dtype=np.uint32))
+            ids.append(header.split(None, 1)[0])
+            locus_tags.append(header_locus_tag(header))
+            lengths.append(len(sequence.strip().rstrip('*')))
+
+    codes = np.concatenate(codes) if codes else np.empty(0, dtype=np.int64)
+    owners = np.concatenate(owners) if owners else np.empty(0, dtype=np.uint32)
+    order = np.argsort(codes, kind='stable')
+    keys, counts = np.unique(codes[order], return_counts=True)
+
+    keep = counts <= max_postings
+    postings = owners[order][np.repeat(keep, counts)]
+    arrays = {
+        'keys': keys[keep].astype(np.uint32),
+        'offsets': np.concatenate([[0], np.cumsum(counts[keep])]).astype(np.uint32),
+        'postings': postings,
+        'ids': np.asarray(ids, dtype=str),
+        'locus_tags': np.asarray(locus_tags, dtype=str),
+        'lengths': np.asarray(lengths, dtype=np.uint32),
+    }
+
+    # Build in a private directory and rename it into place; a concurrent
+    # builder of the same index may win the rename, which is just as good
+    tmp_dir = tempfile.mkdtemp(dir=os.path.dirname(index_dir) or '.', prefix='.building-')
+    try:
+        for name, array in arrays.items():
+            np.save(os.path.join(tmp_dir, name + '.npy'), array)
+        try:
+            os.rename(tmp_dir, index_dir)
+        except OSError:
+            if not os.path.isdir(index_dir):
+                raise
+    finally:
+        if os.path.isdir(tmp_dir):
+            shutil.rmtree(tmp_dir)
+
+
+def search_index_path(fasta_path, index_root=SEARCH_INDEX_DIR):
+    """Index directory of a FASTA file, building it first if the file is new or changed"""
+    st = os.stat(fasta_path)
+    index_dir = os.path.join(index_root, f"{os.path.basename(fasta_path)}.{st.st_size}.{st.st_mtime_ns}")
+    if not os.path.isdir(index_dir):
+        print(f"  Building k-mer index for {fasta_path}...")
+        os.makedirs(index_root, exist_ok=True)
+        build_search_index(fasta_path, index_dir)
+    return index_dir
+
+
+class SearchIndex:
+    """Memory-mapped k-mer index of one proteome"""
+
+    def __init__(self, index_dir):
+        for name in INDEX_ARRAYS:
+            setattr(self, name, np.load(os.path.join(index_dir, name + '.npy'), mmap_mode='r'))
+
+    def __len__(self):
+        return len(self.ids)
+
+    def counts(self, codes):
+        """Number of the given k-mer codes found in each protein"""
+        found = np.searchsorted(self.keys, codes)
+        inside = found < len(self.keys)
+        found = found[inside]
+        found = found[self.keys[found] == codes[inside]]
+        starts = self.offsets[found].astype(np.int64)
+        sizes = self.offsets[found + 1].astype(np.int64) - starts
+        if not sizes.sum():
+            return np.zeros(len(self), dtype=np.int64)
+        positions = np.repeat(starts - np.cumsum(sizes) + sizes, sizes) + np.arange(sizes.sum())
+        return np.bincount(self.postings[positions], minlength=len(self))
+
+    def search(self, name, sequence, top=TOP_HITS, min_containment=MIN_CONTAINMENT):
+        """Best hits of one query sequence"""
+        codes = minimizers(sequence).astype(np.uint32)
+        if not len(codes):
+            return []
+        counts = self.counts(codes)
+        query_length = len(sequence.strip().rstrip('*'))
+        best = np.argsort(-counts, kind='stable')[:top]
+        hits = []
+        for target in best.tolist():
+            containment = counts[target] / len(codes)
+            if counts[target] == 0 or containment < min_containment:
+                break
+            hits.append(Hit(
+                query=name,
+                target=str(self.ids[target]),
+                locus_tag=str(self.locus_tags[target]) or None,
+                shared=int(counts[target]),
+                minimizers=len(codes),
+                containment=round(float(containment), 4),
+                identity=round(float(containment ** (1 / K)), 4),
+                query_length=query_length,
+                target_length=int(self.lengths[target]),
+                coverage=round(min(query_length, int(self.lengths[target]))
+                               / max(query_length, int(self.lengths[target]), 1), 4),
+            ))
+        return hits
+
+
+_worker_index = None
+
+
+def _open_worker_index(index_dir):
+    global _worker_index
+    _worker_index = SearchIndex(index_dir)
+
+
+def _search_batch(batch, top, min_containment):
+    return [_worker_index.search(name, sequence, top, min_containment) for name, sequence in batch]
+
+
+def search_proteins(fasta_path, queries, top=TOP_HITS, min_containment=MIN_CONTAINMENT, max_workers=None):
+    """
+    {query name: [Hit, ...] best first} for a batch of queries against a proteome.
+
+    queries is a dict or iterable of (name, sequence). The proteome index is
+    built on first use; queries are split into one chunk per worker process.
+    """
+    queries = list(queries.items() if isinstance(queries, dict) else queries)
+    index_dir = search_index_path(fasta_path)
+    max_workers = min(max_workers or os.cpu_count() or 1, len(queries)) or 1
+
+    if max_workers == 1:
+        index = SearchIndex(index_dir)
+        results = [index.search(name, sequence, top, min_containment) for name, sequence in queries]
+    else:
+        batches = [queries[i::max_workers] for i in range(max_workers)]
+        with ProcessPoolExecutor(max_workers, initializer=_open_worker_index, initargs=(index_dir,)) as pool:
+            chunks = list(pool.map(_search_batch, batches, [top] * max_workers, [min_containment] * max_workers))
+        results = [None] * len(queries)
+        for i, chunk in enumerate(chunks):
+            results[i::max_workers] = chunk
+    return {name: hits for (name, _), hits in zip(queries, results)}
@@ -1,104 +1,126 @@
 #!/usr/bin/env python3
 """
 Resume paused DESeq2 jobs and check errors.
+
+Without options, reports every paused or errored job behind the DESeq2
+outputs (error text, queue wait, planned action) and follows unfinished
+outputs. With --remediate, errored jobs are rerun and paused ones resumed in
+one concurrent batch, and the rerun/resumed jobs are followed until done.
 """
 
-from bioblend.galaxy import GalaxyInstance
+import argparse
+import os
+import time
+
+from galaxy_utils.instrumentation import galaxy_instance
+from history_resolver import find_history
+from history_snapshot import history_snapshot
+from job_remediation import (
+    REMEDIATE_CONCURRENCY,
+    STALLED_STATES,
+    find_stalled_jobs,
+    follow_queue_waits,
+    format_wait,
+    plan_remediation,
+    print_stalled_report,
+    remediate,
+)
+from state_watcher import DATASET_DONE_STATES, StateWatcher
 
 # Galaxy connection details
-GALAXY_URL = "https://usegalaxy.org"
-API_KEY = "YOUR_GALAXY_API_KEY"
+GALAXY_URL = os.environ.get("GALAXY_URL", "https://usegalaxy.org")
+API_KEY = os.environ.get("GALAXY_API_KEY", "YOUR_GALAXY_API_KEY")
 HISTORY_NAME = "prjna1086003"
 
+# Give up following unfinished DESeq2 datasets after this many seconds
+WATCH_TIMEOUT = 2 * 3600
+
 def main():
+    parser = argparse.ArgumentParser(description="Report and fix paused or errored DESeq2 jobs")
+    parser.add_argument('--remediate', action='store_true', help="rerun errored jobs and resume paused ones")
+    parser.add_argument('--max-workers', type=int, default=REMEDIATE_CONCURRENCY,
+                        help="reruns/resumes in flight at once")
+    args = parser.parse_args()
+
     # Connect to Galaxy
-    gi = GalaxyInstance(url=GALAXY_URL, key=API_KEY)
+    gi = galaxy_instance(GALAXY_URL, API_KEY)
 
     # Get the history
-    all_histories = gi.histories.get_histories()
-    history = None
-    for h in all_histories:
-        if HISTORY_NAME.lower() in h['name'].lower():
-            history = h
-            break
-
-    if not history:
-        print(f"Error: History containing '{HISTORY_NAME}' not found")
+    resolver, history_id = find_history(gi, HISTORY_NAME)
+    if not history_id:
         return
 
-    history_id = history['id']
-    print(f"Found history: {history['name']} (ID: {history_id})")
-
-    # Get all datasets
-    history_contents = gi.histories.show_history(history_id, contents=True, deleted=False)
-
-    # Find DESeq2 datasets
-    deseq_datasets = [item for item in history_contents if 'deseq' in item.get('name', '').lower()]
+    # Find DESeq2 datasets in the local snapshot (only changed items are fetched)
+    snapshot = history_snapshot(gi, history_id)
+    deseq_datasets = snapshot.query(name='deseq', content_type='dataset')
 
     print(f"\nFound {len(deseq_datasets)} DESeq2-related datasets")
+    for state, count in sorted(snapshot.state_counts(name='deseq').items(), key=lambda kv: str(kv[0])):
+        print(f"  {state}: {count}")
 
-    # Check each dataset
-    for ds in deseq_datasets:
-        hid = ds.get('hid')
-        name = ds.get('name')
-        state = ds.get('state')
-        dataset_id = ds.get('id')
-
-        print(f"\n#{hid}: {name}")
-        print(f"  State: {state}")
+    # One pass over the jobs behind every paused or errored output
+    stalled = [ds for ds in deseq_datasets if ds.get('state') in STALLED_STATES]
+    jobs, failures = find_stalled_jobs(gi, stalled)
+    plan = plan_remediation(jobs)
 
-        if state == 'error':
-            # Get error details
-            try:
-                dataset_info = gi.datasets.show_dataset(dataset_id)
-                if 'misc_info' in dataset_info:
-                    print(f"  Error info: {dataset_info.get('misc_info', 'No error info')}")
-            except Exception as e:
-                print(f"  Could not get error details: {e}")
-
-        elif state == 'paused':
-            # Try to resume the job
-            try:
-                # First, check if we can get the job info
-                print(f"  Attempting to resume...")
-
-                # Get job ID for this dataset
-                job_id = ds.get('creating_job')
-                if job_id:
-                    print(f"  Job ID: {job_id}")
-
-                    # Check job details
-                    try:
-                        job_info = gi.jobs.show_job(job_id)
-                        print(f"  Job state: {job_info.get('state')}")
-
-                        # Note: Paused jobs usually require manual intervention in Galaxy
-                        # They may be waiting for user input or approval
-                        print(f"  → This job requires manual action in Galaxy interface")
-                    except Exception as e:
-                        print(f"  Could not get job info: {e}")
-                else:
-                    print(f"  No job ID found")
-
-            except Exception as e:
-                print(f"  Could not resume: {e}")
-
-    print(f"\n\n{'='*70}")
-    print("Summary")
+    print(f"\n{'='*70}")
+    print(f"Stalled jobs: {len(plan)}")
     print(f"{'='*70}")
-    print(f"\nPaused jobs typically need manual action in Galaxy web interface.")
-    print(f"Please visit: https://usegalaxy.org/u/cartman/h/prjna1086003")
-    print(f"\nTo resume paused jobs:")
-    print(f"1. Click on the paused dataset (yellow)")
-    print(f"2. Look for a 'Resume' or 'Run' button")
-    print(f"3. Provide any required parameters")
+    if plan:
+        print_stalled_report(plan)
+    for item_id, error in failures.items():
+        print(f"  Could not look up job for {item_id}: {error}")
+
+    watcher = StateWatcher(gi, history_id, timeout=WATCH_TIMEOUT)
+    if plan and args.remediate:
+        print(f"\nRemediating {len(plan)} job(s), {args.max_workers} at a time...")
+        submitted = time.monotonic()
+        results = remediate(gi, plan, max_workers=args.max_workers)
+        followed = []
+        for action, job in plan:
+            result = results.get(job.id)
+            if isinstance(result, Exception):
+                print(f"  ✗ {action} {job.id}: {result}")
+                continue
+            print(f"  ✓ {action} {job.id} -> {', '.join(result)}")
+            followed.extend(result)
+
+        if followed:
+            print(f"\nFollowing {len(followed)} job(s)...")
+            try:
+                waits = follow_queue_waits(watcher, followed, submitted)
+            except TimeoutError as e:
+                print(f"  {e}")
+                waits = {}
+            print(f"\nQueue wait after remediation:")
+            for job_id in followed:
+                print(f"  {job_id}: {format_wait(waits.get(job_id))} "
+                      f"(final state: {watcher.states['job'].get(job_id) or 'unknown'})")
+        snapshot.refresh()
+    elif plan:
+        print(f"\nRun with --remediate to rerun errored jobs and resume paused ones.")
+
+    # Follow anything still queued or running until it settles
+    unfinished = [ds['id'] for ds in deseq_datasets if ds.get('state') not in DATASET_DONE_STATES]
+    if unfinished:
+        print(f"\nWatching {len(unfinished)} unfinished DESeq2 datasets...")
+        watcher.watch_datasets(unfinished)
+        try:
+            watcher.wait()
+        except TimeoutError as e:
+            print(f"  {e}")
 
     # Look for the most recent results
+    deseq_datasets = snapshot.query(name='deseq', content_type='dataset')
     result_files = [ds for ds in deseq_datasets if 'result file' in ds.get('name', '').lower()]
     plot_files = [ds for ds in deseq_datasets if 'plots' in ds.get('name', '').lower()]
 
-    print(f"\n\nDESeq2 Result files: {len(result_files)}")
+    print(f"\n\n{'='*70}")
+    print("Summary")
+    print(f"{'='*70}")
+    print(f"DESeq2 Result files: {len(result_files)}")
     print(f"DESeq2 Plot files: {len(plot_files)}")
+    print(f"Still paused or errored: {len(snapshot.query(name='deseq', states=STALLED_STATES))}")
 
 if __name__ == "__main__":
     main()
@@ -4,10 +4,15 @@ Run DESeq2 in Galaxy to replicate the differential expression analysis from the
 Comparing AR0382 (aggregative) vs AR0387 (non-aggregative) strains.
 """
 
-from bioblend.galaxy import GalaxyInstance
 import time
 import csv
 
+from bioblend import ConnectionError as GalaxyConnectionError
+
+from galaxy_utils.instrumentation import galaxy_instance
+from history_resolver import find_history
+from tool_registry import DESEQ2_TOOL, ToolRegistry
+
 # Galaxy connection details
 GALAXY_URL = "https://usegalaxy.org"
 API_KEY = "YOUR_GALAXY_API_KEY"
@@ -22,13 +27,6 @@ def read_strain_mapping(tsv_file):
             mapping[row['Run']] = row['strain']
     return mapping
 
-def find_tool_id(gi, tool_name):
-    """Find the tool ID for DESeq2."""
-    tools = gi.tools.get_tools(name=tool_name)
-    if tools:
-        return tools[0]['id']
-    return None
-
 def run_deseq2(gi, history_id, collection_id, collection_name, experiment_type, strain_mapping):
     """
     Run DESeq2 on a collection.
@@ -43,51 +41,51 @@ def run_deseq2(gi, history_id, collection_id, collection_name, experiment_type,
     print(f"Collection: {collection_name}")
     print(f"{'='*60}")
 
-    # Find DESeq2 tool
-    deseq2_tool_id = "toolshed.g2.bx.psu.edu/repos/iuc/deseq2/deseq2/2.11.40.8+galaxy0"
+    # Find the newest installed DESeq2 (cached for a day)
+    registry = ToolRegistry(gi)
+    deseq2_tool_id = registry.resolve(DESEQ2_TOOL)['id']
 
     print(f"\nUsing DESeq2 tool: {deseq2_tool_id}")
 
     # Get collection details to identify factor levels
-    history_contents = gi.histories.show_history(history_id, contents=True)
-    collection = None
-    for item in history_contents:
-        if item.get('id') == collection_id and item.get('history_content_type') == 'dataset_collection':
-            collection = item
-            break
-
-    if not collection:
+    try:
+        collection_details = gi.histories.show_dataset_collection(history_id, collection_id)
+    except GalaxyConnectionError:
         print(f"Error: Collection not found")
         return None
 
-    collection_details = gi.histories.show_dataset_collection(history_id, collection_id)
     elements = collection_details.get('elements', [])
 
     # Identify factor levels using strain mapping
     ar0382_samples = []
     ar0387_samples = []
+    # Count datasets of each level, passed to DESeq2 directly
+    ar0382_datasets = []
+    ar0387_datasets = []
 
     for elem in elements:
         name = elem.get('element_identifier', '')
+        dataset = {'src': 'hda', 'id': elem['object']['id']}
         # Find the SRR ID in the element name
         for srr_id, strain in strain_mapping.items():
             if srr_id in name:
                 if strain == 'AR0382':
                     ar0382_samples.append(name)
+                    ar0382_datasets.append(dataset)
                 elif strain == 'AR0387':
                     ar0387_samples.append(name)
+                    ar0387_datasets.append(dataset)
                 break
 
     print(f"\nAR0382 samples (n={len(ar0382_samples)}): {ar0382_samples}")
     print(f"AR0387 samples (n={len(ar0387_samples)}): {ar0387_samples}")
 
     # Prepare factor information
-    # We need to create a factor file that maps samples to conditions
     factor_name = "strain"
 
     # For DESeq2, we need to specify:
-    # 1. The count matrix (our collection)
-    # 2. Factor information (which samples belong to which group)
+    # 1. The factor (strain)
+    # 2. The count datasets of each factor level (which samples belong to which group)
     # 3. Comparison to make (AR0382 vs AR0387)
 
     print(f"\nPreparing DESeq2 analysis:")
@@ -99,44 +97,43 @@ def run_deseq2(gi, history_id, collection_id, collection_name, experiment_type,
     # DESeq2 parameters based on the paper:
     # - LFC threshold: 1 (≥ |1|)
     # - FDR: 0.01 (< 0.01)
+    # Both are applied in post-processing; the tool has no threshold parameters.
 
     deseq2_params = {
         'select_data': {
-            'rep_factorName': [factor_name],
-            'rep_factorLevel': [
+            'how': 'datasets_per_level',
+            'rep_factorName': [
                 {
-                    'factorLevel': 'AR0382',
-                    'countsFile': [{'src': 'hdca', 'id': collection_id}]
-                },
-                {
-                    'factorLevel': 'AR0387',
-                    'countsFile': [{'src': 'hdca', 'id': collection_id}]
+                    'factorName': factor_name,
+                    'rep_factorLevel': [
+                        {
+                            'factorLevel': 'AR0382',
+                            'countsFile': ar0382_datasets
+                        },
+                        {
+                            'factorLevel': 'AR0387',
+                            'countsFile': ar0387_datasets
+                        }
+                    ]
                 }
-            ],
-            'how': 'collections',
-            'tximport|txtype': 'none',
-            'tximport|mapping_format|gtf_file': None
+            ]
+        },
+        'tximport': {
+            'tximport_selector': 'count'
         },
         'output_options': {
-            'output_normalized': 'true',
-            'output_rlog': 'true'
+            'output_selector': ['normCounts', 'normRLog']
         },
         'advanced_options': {
-            'use_beta_priors': 'false',
-            'alpha': '0.01',  # FDR threshold from paper
-            'lfcThreshold': '1'  # Log2 fold change threshold from paper
+            'use_beta_priors': False
         }
     }
 
     try:
         print(f"\nSubmitting DESeq2 job...")
 
-        # Run the tool
-        result = gi.tools.run_tool(
-            history_id=history_id,
-            tool_id=deseq2_tool_id,
-            tool_inputs=deseq2_params
-        )
+        # Validate against the tool's schema, then run it
+        result = registry.run_tool(history_id, DESEQ2_TOOL, deseq2_params)
 
         print(f"✓ DESeq2 job submitted successfully!")
         print(f"  Job ID: {result.get('id', 'N/A')}")
@@ -152,30 +149,18 @@ def run_deseq2(gi, history_id, collection_id, collection_name, experiment_type,
 
 def main():
     # Connect to Galaxy
-    gi = GalaxyInstance(url=GALAXY_URL, key=API_KEY)
+    gi = galaxy_instance(GALAXY_URL, API_KEY)
 
     # Get the history
-    all_histories = gi.histories.get_histories()
-    history = None
-    for h in all_histories:
-        if HISTORY_NAME.lower() in h['name'].lower():
-            history = h
-            break
-
-    if not history:
-        print(f"Error: History containing '{HISTORY_NAME}' not found")
+    resolver, history_id = find_history(gi, HISTORY_NAME)
+    if not history_id:
         return
 
-    history_id = history['id']
-    print(f"Found history: {history['name']} (ID: {history_id})")
-
     # Get the collections
-    history_contents = gi.histories.show_history(history_id, contents=True)
-
     in_vitro_collection = None
     in_vivo_collection = None
 
-    for item in history_contents:
+    for item in resolver.collections(history_id):
         if item.get('history_content_type') == 'dataset_collection':
             if 'in_vitro' in item['name']:
                 in_vitro_collection = item
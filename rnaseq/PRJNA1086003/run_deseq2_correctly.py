@@ -1,12 +1,18 @@
 #!/usr/bin/env python3
 """
 Run DESeq2 CORRECTLY using collections.
-Feed the entire collection and provide factor information to tell DESeq2 which samples are which.
+Split the collection's datasets by strain into DESeq2 factor levels, and keep the
+sample -> strain assignment in the history as a factor file.
 """
 
-from bioblend.galaxy import GalaxyInstance
 import csv
 
+from batch_upload import UploadItem, upload_batch
+from galaxy_utils.instrumentation import galaxy_instance
+from history_resolver import find_history
+from state_watcher import StateWatcher, print_transition
+from tool_registry import DESEQ2_TOOL, InvalidToolParameters, ToolRegistry
+
 # Galaxy connection details
 GALAXY_URL = "https://usegalaxy.org"
 API_KEY = "YOUR_GALAXY_API_KEY"
@@ -24,7 +30,9 @@ def read_strain_mapping(tsv_file):
 def create_factor_file(gi, history_id, collection_id, strain_mapping, factor_filename):
     """
     Create a factor file that maps samples in the collection to their conditions.
-    This file tells DESeq2 which samples belong to which factor level.
+    It records which samples went into which DESeq2 factor level.
+
+    Returns the new dataset's id, or None if the upload failed.
     """
 
     # Get collection details
@@ -51,23 +59,15 @@ def create_factor_file(gi, history_id, collection_id, strain_mapping, factor_fil
 
     factor_content = "".join(factor_lines)
 
-    # Write factor file to disk first
-    local_factor_path = f"/tmp/{factor_filename}"
-    with open(local_factor_path, 'w') as f:
-        f.write(factor_content)
-
-    print(f"✓ Created local factor file: {local_factor_path}")
-
-    # Upload factor file to Galaxy
+    # Upload factor file to Galaxy straight from memory
     try:
-        result = gi.tools.upload_file(
-            local_factor_path,
-            history_id,
-            file_name=factor_filename,
-            file_type='tabular'
+        datasets, jobs = upload_batch(
+            gi, history_id, [UploadItem(name=factor_filename, file_type='tabular', content=factor_content)]
         )
+        factor_dataset_id = datasets[factor_filename]['id']
         print(f"✓ Uploaded factor file to Galaxy: {factor_filename}")
-        return result
+        print(f"  Factor file dataset ID: {factor_dataset_id}")
+        return factor_dataset_id
     except Exception as e:
         print(f"✗ Error uploading factor file: {e}")
         return None
@@ -89,8 +89,8 @@ def run_deseq2_with_collection(gi, history_id, collection_id, collection_name,
 
     print(f"\nCollection has {len(elements)} samples:")
 
-    ar0382_count = 0
-    ar0387_count = 0
+    # Count datasets per strain: the factor levels DESeq2 compares
+    level_datasets = {'AR0382': [], 'AR0387': []}
 
     for elem in elements:
         sample_name = elem.get('element_identifier', '')
@@ -98,91 +98,61 @@ def run_deseq2_with_collection(gi, history_id, collection_id, collection_name,
         for srr_id, sample_strain in strain_mapping.items():
             if srr_id in sample_name:
                 strain = sample_strain
-                if strain == 'AR0382':
-                    ar0382_count += 1
-                elif strain == 'AR0387':
-                    ar0387_count += 1
+                if strain in level_datasets:
+                    level_datasets[strain].append({'src': 'hda', 'id': elem['object']['id']})
                 break
         print(f"  - {sample_name}: {strain}")
 
-    print(f"\nSummary: {ar0382_count} AR0382 samples, {ar0387_count} AR0387 samples")
-
-    # Create factor file
-    factor_filename = f"factor_file_{experiment_type.replace(' ', '_')}.tsv"
-    factor_file = create_factor_file(gi, history_id, collection_id, strain_mapping, factor_filename)
-
-    if not factor_file:
-        print("✗ Failed to create factor file")
-        return None
-
-    # Get the factor file dataset ID from the upload result
-    import time
-
-    # The upload result contains the created datasets
-    factor_dataset_id = None
-    if factor_file and 'outputs' in factor_file:
-        for output in factor_file['outputs']:
-            if output.get('name') == factor_filename:
-                factor_dataset_id = output.get('id')
-                print(f"  Factor file dataset ID: {factor_dataset_id}")
-                break
-
-    # If not found in outputs, search history
-    if not factor_dataset_id:
-        print("  Searching history for factor file...")
-        time.sleep(3)  # Wait for upload to complete
-        history_contents = gi.histories.show_history(history_id, contents=True)
-        for item in reversed(history_contents):  # Check most recent first
-            if item.get('name') == factor_filename and item.get('state') != 'deleted':
-                factor_dataset_id = item.get('id')
-                print(f"  Found factor file dataset ID: {factor_dataset_id}")
-                break
-
-    if not factor_dataset_id:
-        print("✗ Could not find uploaded factor file")
-        return None
-
-    # Now run DESeq2 with the collection and factor file
-    print(f"\nSubmitting DESeq2 job...")
+    print(f"\nSummary: {len(level_datasets['AR0382'])} AR0382 samples, "
+          f"{len(level_datasets['AR0387'])} AR0387 samples")
 
-    deseq2_tool_id = "toolshed.g2.bx.psu.edu/repos/iuc/deseq2/deseq2/2.11.40.8+galaxy0"
+    registry = ToolRegistry(gi)
 
-    # DESeq2 parameters - using the collection with a factor file
+    # FDR < 0.01 and |LFC| >= 1 from the paper are applied in post-processing;
+    # the tool has no threshold parameters
     deseq2_params = {
         'select_data': {
-            'how': 'datasets_vs_factors',  # This mode uses factor file
-            'countsFile': {
-                'src': 'hdca',
-                'id': collection_id
-            },
-            'factorFile': {
-                'src': 'hda',
-                'id': factor_dataset_id
-            },
-            'tximport': {
-                'txtype': 'none'
-            }
+            'how': 'datasets_per_level',
+            'rep_factorName': [
+                {
+                    'factorName': 'strain',
+                    'rep_factorLevel': [
+                        {'factorLevel': level, 'countsFile': datasets}
+                        for level, datasets in level_datasets.items()
+                    ]
+                }
+            ]
+        },
+        'tximport': {
+            'tximport_selector': 'count'
         },
         'advanced_options': {
-            'use_beta_priors': False,
-            'alpha': 0.01,  # FDR < 0.01 from paper
-            'lfcThreshold': 0  # Filter for |LFC| >= 1 in post-processing
+            'use_beta_priors': False
         },
         'output_options': {
-            'output_normalized': True,
-            'output_rlog': False
-        },
-        'tximport': {
-            'txtype': 'none'
+            'output_selector': ['normCounts']
         }
     }
 
+    # Check the request before anything is uploaded
     try:
-        result = gi.tools.run_tool(
-            history_id=history_id,
-            tool_id=deseq2_tool_id,
-            tool_inputs=deseq2_params
-        )
+        registry.validate(DESEQ2_TOOL, deseq2_params)
+    except InvalidToolParameters as e:
+        print(f"✗ {e}")
+        return None
+
+    # Record which sample went into which level next to the results
+    factor_filename = f"factor_file_{experiment_type.replace(' ', '_')}.tsv"
+    factor_dataset_id = create_factor_file(gi, history_id, collection_id, strain_mapping, factor_filename)
+
+    if not factor_dataset_id:
+        print("✗ Failed to create factor file")
+        return None
+
+    print(f"\nSubmitting DESeq2 job...")
+
+    try:
+        result = registry.run_tool(history_id, DESEQ2_TOOL, deseq2_params)
         print(f"✓ DESeq2 job submitted!")
         print(f"  Job outputs: {len(result.get('outputs', []))}")
         for output in result.get('outputs', []):
@@ -198,30 +168,18 @@ def run_deseq2_with_collection(gi, history_id, collection_id, collection_name,
 
 def main():
     # Connect to Galaxy
-    gi = GalaxyInstance(url=GALAXY_URL, key=API_KEY)
+    gi = galaxy_instance(GALAXY_URL, API_KEY)
 
     # Get the history
-    all_histories = gi.histories.get_histories()
-    history = None
-    for h in all_histories:
-        if HISTORY_NAME.lower() in h['name'].lower():
-            history = h
-            break
-
-    if not history:
-        print(f"Error: History containing '{HISTORY_NAME}' not found")
+    resolver, history_id = find_history(gi, HISTORY_NAME)
+    if not history_id:
         return
 
-    history_id = history['id']
-    print(f"Found history: {history['name']}")
-
     # Get the collections
-    history_contents = gi.histories.show_history(history_id, contents=True)
-
     in_vitro_collection = None
     in_vivo_collection = None
 
-    for item in history_contents:
+    for item in resolver.collections(history_id, name='PRJNA1086003_in_v'):
         if item.get('history_content_type') == 'dataset_collection':
             name = item['name']
             # Get the original collections (not the sub-collections we created)
@@ -262,11 +220,28 @@ def main():
         in_vivo_strains
     )
 
+    # Watch both DESeq2 runs together until they finish
+    watcher = StateWatcher(gi, history_id)
+    for result in (in_vitro_result, in_vivo_result):
+        if result:
+            watcher.watch_jobs(job['id'] for job in result.get('jobs', []))
+    final_states = {}
+    if watcher.pending():
+        print(f"\nWaiting for {len(watcher.pending())} DESeq2 job(s)...")
+        try:
+            for transition in watcher.events():
+                print_transition(transition)
+        except TimeoutError as e:
+            print(f"✗ {e}")
+        final_states = watcher.states['job']
+
     print(f"\n{'='*70}")
     print("SUMMARY")
     print(f"{'='*70}")
     print(f"In vitro DESeq2: {'✓ Success' if in_vitro_result else '✗ Failed'}")
     print(f"In vivo DESeq2: {'✓ Success' if in_vivo_result else '✗ Failed'}")
+    for job_id, state in final_states.items():
+        print(f"  Job {job_id}: {state}")
     print(f"\nExpected from paper:")
     print(f"  In vitro: ~76 DEGs (LFC ≥ |1|, FDR < 0.01)")
     print(f"  In vivo: ~259 DEGs (LFC ≥ |1|, FDR < 0.01)")
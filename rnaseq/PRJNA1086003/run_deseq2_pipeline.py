@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""
+End-to-end DESeq2 pipeline: split -> DESeq2 -> download -> compare.
+
+Both contrasts (in vitro and in vivo) go through every stage together: their
+collections are read, split into strain sub-collections and submitted to
+DESeq2 concurrently, one shared watcher follows all DESeq2 jobs, and each
+contrast's result table is downloaded the moment its own job finishes. The
+chain takes about as long as the slowest contrast rather than the sum of both.
+"""
+
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+import analyze_deseq2_results
+from collection_fingerprints import FingerprintIndex
+from download_manager import download_dataset
+from galaxy_utils.fetch import collection_elements_with_tags, fetch_concurrently
+from galaxy_utils.instrumentation import galaxy_instance
+from history_resolver import find_history
+from run_deseq2_with_tags import (
+    create_strain_collection,
+    deseq2_params,
+    find_experiment_collections,
+    split_by_strain,
+)
+from state_watcher import StateWatcher, print_transition
+from tool_registry import DESEQ2_TOOL, ToolRegistry
+
+# Galaxy connection details
+GALAXY_URL = "https://usegalaxy.org"
+API_KEY = "YOUR_GALAXY_API_KEY"
+HISTORY_NAME = "prjna1086003"
+
+# One DESeq2 contrast: label, key into find_experiment_collections, result file
+ContrastSpec = namedtuple('ContrastSpec', ['experiment_type', 'collection_key', 'output_path'])
+
+CONTRASTS = [
+    ContrastSpec('in vitro', 'in_vitro', 'deseq2_in_vitro_results.tsv'),
+    ContrastSpec('in vivo', 'in_vivo', 'deseq2_in_vivo_results.tsv'),
+]
+
+STRAINS = ['AR0382', 'AR0387']
+
+# DESeq2 output holding the results table
+RESULT_OUTPUT_NAME = 'deseq_out'
+
+
+def result_dataset(run_result):
+    """Pick the DESeq2 results table from a run_tool response"""
+    for output in run_result.get('outputs', []):
+        if output.get('output_name') == RESULT_OUTPUT_NAME:
+            return output
+    for output in run_result.get('outputs', []):
+        if 'result file' in output.get('name', '').lower():
+            return output
+    return None
+
+
+def main():
+    # Connect to Galaxy
+    gi = galaxy_instance(GALAXY_URL, API_KEY)
+
+    resolver, history_id = find_history(gi, HISTORY_NAME)
+    if not history_id:
+        return
+
+    in_vitro_collection, in_vivo_collection = find_experiment_collections(resolver, history_id)
+    collections = {'in_vitro': in_vitro_collection, 'in_vivo': in_vivo_collection}
+    if not all(collections.values()):
+        print("Error: Could not find both in_vitro and in_vivo collections")
+        return
+    specs = {spec.experiment_type: spec for spec in CONTRASTS}
+    base = {spec.experiment_type: collections[spec.collection_key] for spec in CONTRASTS}
+
+    # Stage 1: read both collections and split them by strain
+    print(f"\n{'='*70}")
+    print("Stage 1: splitting collections by strain")
+    print(f"{'='*70}")
+    elements = fetch_concurrently(
+        lambda exp: collection_elements_with_tags(gi, history_id, base[exp]['id']), specs
+    )
+    split = {}
+    for exp, result in elements.items():
+        if isinstance(result, Exception):
+            print(f"✗ {exp}: could not read {base[exp]['name']}: {result}")
+            continue
+        split[exp] = dict(zip(STRAINS, split_by_strain(result)))
+        counts = ', '.join(f"{len(split[exp][s])} {s}" for s in STRAINS)
+        print(f"  {exp}: #{base[exp]['hid']} {base[exp]['name']} -> {counts}")
+
+    # Collection creation is not idempotent, so no automatic retries; identical
+    # sub-collections from earlier runs are reused
+    index = FingerprintIndex(gi, history_id)
+    created = fetch_concurrently(
+        lambda key: create_strain_collection(
+            gi, history_id, f"{base[key[0]]['name']}_{key[1]}", split[key[0]][key[1]], index
+        ),
+        [(exp, strain) for exp in split for strain in STRAINS],
+        max_retries=0
+    )
+    sub_collections = {}
+    for (exp, strain), result in created.items():
+        if isinstance(result, Exception):
+            print(f"✗ {exp}: error creating {strain} collection: {result}")
+            continue
+        collection, is_new = result
+        action = "created" if is_new else "reusing existing"
+        print(f"✓ {exp}: {action} {strain} sub-collection (#{collection.get('hid')})")
+        sub_collections.setdefault(exp, {})[strain] = collection['id']
+    ready = [exp for exp in split if len(sub_collections.get(exp, {})) == len(STRAINS)]
+
+    # Stage 2: submit both DESeq2 runs at once
+    print(f"\n{'='*70}")
+    print("Stage 2: submitting DESeq2")
+    print(f"{'='*70}")
+    # Resolve and validate up front so a bad parameter dict submits nothing
+    registry = ToolRegistry(gi)
+    params = {exp: deseq2_params(sub_collections[exp]['AR0382'], sub_collections[exp]['AR0387'])
+              for exp in ready}
+    for exp in ready:
+        registry.validate(DESEQ2_TOOL, params[exp])
+    print(f"DESeq2 {registry.resolve(DESEQ2_TOOL)['version']}, parameters validated")
+    submitted = fetch_concurrently(
+        lambda exp: registry.run_tool(history_id, DESEQ2_TOOL, params[exp]),
+        ready,
+        max_retries=0
+    )
+    watcher = StateWatcher(gi, history_id)
+    jobs = {}
+    results = {}
+    for exp, result in submitted.items():
+        output = None if isinstance(result, Exception) else result_dataset(result)
+        if output is None:
+            print(f"✗ {exp}: DESeq2 submission failed: {result}")
+            continue
+        jobs[exp] = [job['id'] for job in result.get('jobs', [])]
+        results[exp] = output
+        watcher.watch_jobs(jobs[exp])
+        print(f"✓ {exp}: DESeq2 submitted (jobs: {', '.join(jobs[exp])})")
+
+    # Stage 3: follow all jobs; download each table as soon as its job is done
+    print(f"\n{'='*70}")
+    print("Stage 3: waiting for DESeq2 and downloading results")
+    print(f"{'='*70}")
+    downloads = {}
+    job_states = {}
+    with ThreadPoolExecutor(max_workers=len(CONTRASTS)) as pool:
+        try:
+            for transition in watcher.events():
+                print_transition(transition)
+                for exp in jobs:
+                    if exp in job_states or not all(watcher.is_done('job', j) for j in jobs[exp]):
+                        continue
+                    job_states[exp] = [watcher.states['job'][j] for j in jobs[exp]]
+                    if all(state == 'ok' for state in job_states[exp]):
+                        print(f"  {exp}: downloading {results[exp]['name']} -> {specs[exp].output_path}")
+                        downloads[exp] = pool.submit(
+                            download_dataset, gi, results[exp]['id'], specs[exp].output_path
+                        )
+        except TimeoutError as e:
+            print(f"✗ {e}")
+
+        downloaded = []
+        for exp, future in downloads.items():
+            try:
+                status = future.result()
+                downloaded.append(exp)
+                print(f"✓ {exp}: {specs[exp].output_path} {status}")
+            except Exception as e:
+                print(f"✗ {exp}: download failed: {e}")
+
+    print(f"\n{'='*70}")
+    print("SUMMARY")
+    print(f"{'='*70}")
+    for spec in CONTRASTS:
+        exp = spec.experiment_type
+        states = ', '.join(job_states.get(exp, [])) or 'not finished'
+        status = '✓' if exp in downloaded else '✗'
+        print(f"{status} {exp}: DESeq2 job state(s): {states}")
+
+    # Stage 4: compare with the paper once both tables are in place
+    if len(downloaded) == len(CONTRASTS):
+        analyze_deseq2_results.main()
+    else:
+        print("\nSkipping comparison: not all result tables were downloaded")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,7 +3,9 @@
 Run DESeq2 the CORRECT way using separate collections for each factor level.
 """
 
-from bioblend.galaxy import GalaxyInstance
+from galaxy_utils.instrumentation import galaxy_instance
+from history_resolver import find_history
+from tool_registry import DESEQ2_TOOL, ToolRegistry
 
 # Galaxy connection details
 GALAXY_URL = "https://usegalaxy.org"
@@ -25,48 +27,43 @@ def run_deseq2_with_separate_collections(gi, history_id, collection_82_id, colle
     print(f"Factor level '87' (AR0387): Collection #{collection_87_id}")
     print(f"Factor level '82' (AR0382): Collection #{collection_82_id}")
 
-    deseq2_tool_id = "toolshed.g2.bx.psu.edu/repos/iuc/deseq2/deseq2/2.11.40.8+galaxy0"
+    registry = ToolRegistry(gi)
 
-    # DESeq2 parameters using collections mode
+    # One counts collection per factor level. FDR < 0.01 and |LFC| >= 1 are
+    # applied in post-processing; the tool has no threshold parameters.
     deseq2_params = {
         'select_data': {
-            'how': 'collection_paired',  # Use paired collections mode
-            'collection_mode': {
-                'collection_mode_selector': 'datasets',
-                'factorName': 'strain',
-                'factors': [
-                    {
-                        'factorLevel': '87',
-                        'countsFile': {'src': 'hdca', 'id': collection_87_id}
-                    },
-                    {
-                        'factorLevel': '82',
-                        'countsFile': {'src': 'hdca', 'id': collection_82_id}
-                    }
-                ]
-            }
+            'how': 'datasets_per_level',
+            'rep_factorName': [
+                {
+                    'factorName': 'strain',
+                    'rep_factorLevel': [
+                        {
+                            'factorLevel': '87',
+                            'countsFile': {'src': 'hdca', 'id': collection_87_id}
+                        },
+                        {
+                            'factorLevel': '82',
+                            'countsFile': {'src': 'hdca', 'id': collection_82_id}
+                        }
+                    ]
+                }
+            ]
         },
         'tximport': {
-            'txtype': 'none'
+            'tximport_selector': 'count'
         },
         'advanced_options': {
-            'use_beta_priors': False,
-            'alpha': 0.01,  # FDR threshold
-            'lfcThreshold': 0  # Will filter for |LFC| >= 1 later
+            'use_beta_priors': False
         },
         'output_options': {
-            'output_normalized': True,
-            'output_rlog': False
+            'output_selector': ['normCounts']
         }
     }
 
     try:
         print(f"\nSubmitting DESeq2 job...")
-        result = gi.tools.run_tool(
-            history_id=history_id,
-            tool_id=deseq2_tool_id,
-            tool_inputs=deseq2_params
-        )
+        result = registry.run_tool(history_id, DESEQ2_TOOL, deseq2_params)
         print(f"✓ DESeq2 job submitted!")
         print(f"  Outputs: {len(result.get('outputs', []))}")
         for output in result.get('outputs', []):
@@ -80,38 +77,18 @@ def run_deseq2_with_separate_collections(gi, history_id, collection_82_id, colle
 
 def main():
     # Connect to Galaxy
-    gi = GalaxyInstance(url=GALAXY_URL, key=API_KEY)
+    gi = galaxy_instance(GALAXY_URL, API_KEY)
 
     # Get history
-    all_histories = gi.histories.get_histories()
-    history = None
-    for h in all_histories:
-        if HISTORY_NAME.lower() in h['name'].lower():
-            history = h
-            break
-
-    if not history:
-        print(f"Error: History '{HISTORY_NAME}' not found")
+    resolver, history_id = find_history(gi, HISTORY_NAME)
+    if not history_id:
         return
 
-    history_id = history['id']
-    print(f"Found history: {history['name']}")
-
-    # Get all collections
-    history_contents = gi.histories.show_history(history_id, contents=True)
-
-    collections = {}
-    for item in history_contents:
-        if item.get('history_content_type') == 'dataset_collection':
-            hid = item.get('hid')
-            name = item.get('name')
-            collections[hid] = {'id': item.get('id'), 'name': name}
-
-    # Find the sub-collections we created
-    in_vitro_82 = collections.get(641)
-    in_vitro_87 = collections.get(645)
-    in_vivo_82 = collections.get(651)
-    in_vivo_87 = collections.get(656)
+    # Find the sub-collections we created, by hid
+    in_vitro_82 = resolver.content_by_hid(history_id, 641)
+    in_vitro_87 = resolver.content_by_hid(history_id, 645)
+    in_vivo_82 = resolver.content_by_hid(history_id, 651)
+    in_vivo_87 = resolver.content_by_hid(history_id, 656)
 
     print(f"\nFound collections:")
     print(f"  In vitro AR0382 (#641): {in_vitro_82['name'] if in_vitro_82 else 'NOT FOUND'}")
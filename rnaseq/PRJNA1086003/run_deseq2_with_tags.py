@@ -4,15 +4,102 @@ Run DESeq2 using group tags in Galaxy collections.
 This uses Galaxy's built-in support for analyzing collections based on group tags.
 """
 
-from bioblend.galaxy import GalaxyInstance
 import json
+import os
+
+from collection_fingerprints import FingerprintIndex, ensure_collection
+from collection_groups import element_identifiers
+from galaxy_utils.fetch import collection_elements_with_tags
+from galaxy_utils.instrumentation import galaxy_instance
+from galaxy_utils.sample_groups import GroupIndex
+from history_resolver import find_history
+from tool_registry import DESEQ2_TOOL, InvalidToolParameters, ToolRegistry
 
 # Galaxy connection details
-GALAXY_URL = "https://usegalaxy.org"
-API_KEY = "YOUR_GALAXY_API_KEY"
+GALAXY_URL = os.environ.get("GALAXY_URL", "https://usegalaxy.org")
+API_KEY = os.environ.get("GALAXY_API_KEY", "YOUR_GALAXY_API_KEY")
 HISTORY_NAME = "prjna1086003"
 
-def run_deseq2_with_group_tags(gi, history_id, collection_id, collection_name, experiment_type):
+# Run accession -> strain, with sample names (the group tags) as aliases
+SAMPLES_TSV = "samples.tsv"
+
+def split_by_strain(elements, samples_path=SAMPLES_TSV):
+    """Split collection elements into (AR0382, AR0387) lists by run accession or group tag."""
+    index = GroupIndex.from_tsv(samples_path, 'strain')
+
+    usable = []
+    for elem in elements:
+        if 'error' in elem:
+            print(f"  Error processing {elem.get('element_identifier', '')}: {elem['error']}")
+        else:
+            usable.append(elem)
+
+    match = index.match(usable)
+    for elem in match.unmatched:
+        print(f"  Warning: Could not determine strain for {elem.get('element_identifier', '')}")
+    for elem, strains in match.ambiguous:
+        print(f"  Warning: {elem.get('element_identifier', '')} matches several strains: {', '.join(strains)}")
+
+    return match.groups.get('AR0382', []), match.groups.get('AR0387', [])
+
+def create_strain_collection(gi, history_id, name, elements, index=None):
+    """
+    List collection of already-uploaded datasets; an identical existing one is
+    reused. Returns (collection, created).
+    """
+    return ensure_collection(gi, history_id, name, element_identifiers(elements), index=index)
+
+def deseq2_params(ar0382_coll_id, ar0387_coll_id):
+    """
+    DESeq2 parameters comparing two strain sub-collections.
+
+    FDR < 0.01 and LFC >= 1 from the paper are applied in post-processing;
+    the tool itself has no alpha or LFC threshold parameter.
+    """
+    return {
+        'select_data': {
+            'how': 'datasets_per_level',
+            'rep_factorName': [
+                {
+                    'factorName': 'strain',
+                    'rep_factorLevel': [
+                        {
+                            'factorLevel': 'AR0382',
+                            'countsFile': {'src': 'hdca', 'id': ar0382_coll_id}
+                        },
+                        {
+                            'factorLevel': 'AR0387',
+                            'countsFile': {'src': 'hdca', 'id': ar0387_coll_id}
+                        }
+                    ]
+                }
+            ]
+        },
+        'header': True,
+        'tximport': {'tximport_selector': 'count'},
+        'output_options': {
+            'output_selector': ['pdf', 'normCounts']
+        },
+        'advanced_options': {
+            'use_beta_priors': False
+        }
+    }
+
+def find_experiment_collections(resolver, history_id):
+    """Return (in_vitro, in_vivo) original collections, skipping the _AR sub-collections."""
+    in_vitro_collection = None
+    in_vivo_collection = None
+
+    for item in resolver.collections(history_id):
+        if item.get('history_content_type') == 'dataset_collection':
+            if 'in_vitro' in item['name'] and '_AR' not in item['name']:
+                in_vitro_collection = item
+            elif 'in_vivo' in item['name'] and '_AR' not in item['name']:
+                in_vivo_collection = item
+
+    return in_vitro_collection, in_vivo_collection
+
+def run_deseq2_with_group_tags(gi, history_id, collection_id, collection_name, experiment_type, registry=None):
     """
     Run DESeq2 using the group tags we added to samples.
 
@@ -25,51 +112,13 @@ def run_deseq2_with_group_tags(gi, history_id, collection_id, collection_name, e
     print(f"Collection: {collection_name}")
     print(f"{'='*70}")
 
-    # Get collection details
-    collection_details = gi.histories.show_dataset_collection(history_id, collection_id)
-    elements = collection_details.get('elements', [])
+    # Get collection elements; tags come from the collection payload itself
+    elements = collection_elements_with_tags(gi, history_id, collection_id)
 
     print(f"\nCollection has {len(elements)} elements")
 
     # Organize elements by strain based on tags or sample info
-    ar0382_elements = []
-    ar0387_elements = []
-
-    for elem in elements:
-        elem_id = elem.get('element_identifier', '')
-        dataset_id = elem['object']['id']
-
-        # Get dataset tags
-        try:
-            dataset_info = gi.datasets.show_dataset(dataset_id)
-            tags = dataset_info.get('tags', [])
-
-            # Determine strain from tags or name
-            is_ar0382 = False
-            is_ar0387 = False
-
-            for tag in tags:
-                if 'AR0382' in tag or '82' in tag:
-                    is_ar0382 = True
-                elif 'AR0387' in tag or '87' in tag:
-                    is_ar0387 = True
-
-            # If no tags worked, use element identifier
-            if not is_ar0382 and not is_ar0387:
-                if '82' in elem_id and '87' not in elem_id:
-                    is_ar0382 = True
-                elif '87' in elem_id:
-                    is_ar0387 = True
-
-            if is_ar0382:
-                ar0382_elements.append(elem)
-            elif is_ar0387:
-                ar0387_elements.append(elem)
-            else:
-                print(f"  Warning: Could not determine strain for {elem_id}")
-
-        except Exception as e:
-            print(f"  Error processing {elem_id}: {e}")
+    ar0382_elements, ar0387_elements = split_by_strain(elements)
 
     print(f"\nAR0382 samples: {len(ar0382_elements)}")
     for elem in ar0382_elements:
@@ -79,27 +128,17 @@ def run_deseq2_with_group_tags(gi, history_id, collection_id, collection_name, e
     for elem in ar0387_elements:
         print(f"  - {elem.get('element_identifier')}")
 
-    # Create sub-collections for each strain
+    # Create sub-collections for each strain, reusing identical ones from earlier runs
     print(f"\nCreating sub-collections for each strain...")
+    index = FingerprintIndex(gi, history_id)
 
     # Create AR0382 collection
     try:
-        ar0382_collection = gi.histories.create_dataset_collection(
-            history_id=history_id,
-            collection_description={
-                'collection_type': 'list',
-                'name': f'{collection_name}_AR0382',
-                'element_identifiers': [
-                    {
-                        'id': elem['object']['id'],
-                        'name': elem['element_identifier'],
-                        'src': 'hda'
-                    }
-                    for elem in ar0382_elements
-                ]
-            }
+        ar0382_collection, created = create_strain_collection(
+            gi, history_id, f'{collection_name}_AR0382', ar0382_elements, index
         )
-        print(f"✓ Created AR0382 sub-collection (#{ar0382_collection.get('hid')})")
+        action = "Created" if created else "Reusing existing"
+        print(f"✓ {action} AR0382 sub-collection (#{ar0382_collection.get('hid')})")
         ar0382_coll_id = ar0382_collection['id']
     except Exception as e:
         print(f"✗ Error creating AR0382 collection: {e}")
@@ -107,22 +146,11 @@ def run_deseq2_with_group_tags(gi, history_id, collection_id, collection_name, e
 
     # Create AR0387 collection
     try:
-        ar0387_collection = gi.histories.create_dataset_collection(
-            history_id=history_id,
-            collection_description={
-                'collection_type': 'list',
-                'name': f'{collection_name}_AR0387',
-                'element_identifiers': [
-                    {
-                        'id': elem['object']['id'],
-                        'name': elem['element_identifier'],
-                        'src': 'hda'
-                    }
-                    for elem in ar0387_elements
-                ]
-            }
+        ar0387_collection, created = create_strain_collection(
+            gi, history_id, f'{collection_name}_AR0387', ar0387_elements, index
         )
-        print(f"✓ Created AR0387 sub-collection (#{ar0387_collection.get('hid')})")
+        action = "Created" if created else "Reusing existing"
+        print(f"✓ {action} AR0387 sub-collection (#{ar0387_collection.get('hid')})")
         ar0387_coll_id = ar0387_collection['id']
     except Exception as e:
         print(f"✗ Error creating AR0387 collection: {e}")
@@ -131,48 +159,18 @@ def run_deseq2_with_group_tags(gi, history_id, collection_id, collection_name, e
     # Now run DESeq2 with separate collections
     print(f"\nRunning DESeq2 comparing AR0382 vs AR0387...")
 
-    deseq2_tool_id = "toolshed.g2.bx.psu.edu/repos/iuc/deseq2/deseq2/2.11.40.8+galaxy0"
-
-    # DESeq2 parameters with separate collections
-    deseq2_params = {
-        'select_data': {
-            'how': 'collections',
-            'rep_factorName': ['strain'],
-            'rep_factorLevel': [
-                {
-                    'factorLevel': 'AR0382',
-                    'countsFile': [{'src': 'hdca', 'id': ar0382_coll_id}]
-                },
-                {
-                    'factorLevel': 'AR0387',
-                    'countsFile': [{'src': 'hdca', 'id': ar0387_coll_id}]
-                }
-            ],
-            'tximport': {'txtype': 'none'}
-        },
-        'output_options': {
-            'output_normalized': True,
-            'output_rlog': False
-        },
-        'advanced_options': {
-            'use_beta_priors': False,
-            'alpha': 0.01,  # FDR < 0.01 from paper
-            'lfcThreshold': 0  # We'll filter for LFC >= 1 in post-processing
-        }
-    }
-
+    registry = registry or ToolRegistry(gi)
     try:
-        result = gi.tools.run_tool(
-            history_id=history_id,
-            tool_id=deseq2_tool_id,
-            tool_inputs=deseq2_params
-        )
+        result = registry.run_tool(history_id, DESEQ2_TOOL, deseq2_params(ar0382_coll_id, ar0387_coll_id))
         print(f"✓ DESeq2 job submitted!")
         print(f"  Outputs created: {len(result.get('outputs', []))}")
         for output in result.get('outputs', [])[:5]:
             print(f"    - {output.get('name', 'Unnamed')}")
 
         return result
+    except InvalidToolParameters as e:
+        print(f"✗ DESeq2 parameters rejected before submission: {e}")
+        return None
     except Exception as e:
         print(f"✗ Error running DESeq2: {e}")
         import traceback
@@ -181,35 +179,15 @@ def run_deseq2_with_group_tags(gi, history_id, collection_id, collection_name, e
 
 def main():
     # Connect to Galaxy
-    gi = GalaxyInstance(url=GALAXY_URL, key=API_KEY)
+    gi = galaxy_instance(GALAXY_URL, API_KEY)
 
     # Get the history
-    all_histories = gi.histories.get_histories()
-    history = None
-    for h in all_histories:
-        if HISTORY_NAME.lower() in h['name'].lower():
-            history = h
-            break
-
-    if not history:
-        print(f"Error: History containing '{HISTORY_NAME}' not found")
+    resolver, history_id = find_history(gi, HISTORY_NAME)
+    if not history_id:
         return
 
-    history_id = history['id']
-    print(f"Found history: {history['name']}")
-
     # Get the collections
-    history_contents = gi.histories.show_history(history_id, contents=True)
-
-    in_vitro_collection = None
-    in_vivo_collection = None
-
-    for item in history_contents:
-        if item.get('history_content_type') == 'dataset_collection':
-            if 'in_vitro' in item['name'] and '_AR' not in item['name']:
-                in_vitro_collection = item
-            elif 'in_vivo' in item['name'] and '_AR' not in item['name']:
-                in_vivo_collection = item
+    in_vitro_collection, in_vivo_collection = find_experiment_collections(resolver, history_id)
 
     if not in_vitro_collection or not in_vivo_collection:
         print("Error: Could not find both in_vitro and in_vivo collections")
@@ -219,13 +197,19 @@ def main():
     print(f"  In vitro: #{in_vitro_collection['hid']} - {in_vitro_collection['name']}")
     print(f"  In vivo: #{in_vivo_collection['hid']} - {in_vivo_collection['name']}")
 
+    # Newest installed DESeq2 and its input schema, cached for a day
+    registry = ToolRegistry(gi)
+    tool = registry.resolve(DESEQ2_TOOL)
+    print(f"  DESeq2: {tool['version']}")
+
     # Run DESeq2 for in vitro
     in_vitro_result = run_deseq2_with_group_tags(
         gi,
         history_id,
         in_vitro_collection['id'],
         in_vitro_collection['name'],
-        "in vitro"
+        "in vitro",
+        registry
     )
 
     # Run DESeq2 for in vivo
@@ -234,7 +218,8 @@ def main():
         history_id,
         in_vivo_collection['id'],
         in_vivo_collection['name'],
-        "in vivo"
+        "in vivo",
+        registry
     )
 
     print(f"\n{'='*70}")
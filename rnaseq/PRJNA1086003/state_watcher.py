@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Watch many Galaxy jobs and datasets until they reach a terminal state.
+
+Each poll is one jobs index call for the history (plus one datasets index call
+for datasets updated since the last poll) rather than one request per item,
+so watching dozens of jobs costs the same as watching one. The poll interval
+starts short, grows while nothing changes and snaps back after every state
+transition; a global timeout bounds the whole wait. Transitions are yielded
+as they are seen, so a chained step can start as soon as its own inputs are
+ready instead of after a guessed sleep.
+"""
+
+import time
+from collections import namedtuple
+
+from bioblend.galaxy.datasets import TERMINAL_STATES
+from bioblend.galaxy.jobs import JOB_TERMINAL_STATES
+
+from galaxy_utils.fetch import call_with_backoff, fetch_concurrently
+
+# 'paused' needs a resume (or an upstream fix) before it moves again, so a
+# watcher treats it as done and leaves the decision to the caller
+DATASET_DONE_STATES = TERMINAL_STATES | {'paused'}
+JOB_DONE_STATES = JOB_TERMINAL_STATES | {'paused'}
+
+MIN_INTERVAL = 1.0
+MAX_INTERVAL = 30.0
+BACKOFF_FACTOR = 1.5
+DEFAULT_TIMEOUT = 4 * 3600
+
+# kind is 'job' or 'dataset'; old_state is None on the first observation
+Transition = namedtuple('Transition', ['kind', 'id', 'old_state', 'new_state'])
+
+
+class StateWatcher:
+    """Track the states of a set of jobs and datasets in one history"""
+
+    def __init__(self, gi, history_id, min_interval=MIN_INTERVAL, max_interval=MAX_INTERVAL,
+                 timeout=DEFAULT_TIMEOUT):
+        self.gi = gi
+        self.history_id = history_id
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.timeout = timeout
+        self.states = {'job': {}, 'dataset': {}}
+        self._datasets_since = None
+
+    def watch_jobs(self, job_ids):
+        """Add job ids to the watch set"""
+        for job_id in job_ids:
+            self.states['job'].setdefault(job_id, None)
+
+    def watch_datasets(self, dataset_ids):
+        """Add dataset ids to the watch set"""
+        for dataset_id in dataset_ids:
+            self.states['dataset'].setdefault(dataset_id, None)
+
+    def is_done(self, kind, item_id):
+        done = JOB_DONE_STATES if kind == 'job' else DATASET_DONE_STATES
+        return self.states[kind].get(item_id) in done
+
+    def pending(self, kind=None):
+        """(kind, id) pairs not yet in a done state"""
+        kinds = [kind] if kind else ['job', 'dataset']
+        return [(k, item_id) for k in kinds for item_id in self.states[k]
+                if not self.is_done(k, item_id)]
+
+    # Polling
+
+    def _poll_jobs(self):
+        pending = {item_id for _, item_id in self.pending('job')}
+        if not pending:
+            return {}
+        jobs = call_with_backoff(
+            self.gi.jobs.get_jobs, history_id=self.history_id, order_by='update_time'
+        )
+        seen = {job['id']: job['state'] for job in jobs if job['id'] in pending}
+
+        # Older jobs can fall off the end of the index page; ask for those directly
+        missing = pending - set(seen)
+        if missing:
+            for job_id, job in fetch_concurrently(self.gi.jobs.show_job, missing).items():
+                if not isinstance(job, Exception):
+                    seen[job_id] = job['state']
+        return seen
+
+    def _poll_datasets(self):
+        pending = {item_id for _, item_id in self.pending('dataset')}
+        if not pending:
+            return {}
+
+        if self._datasets_since is None:
+            # First look: ask for each dataset once, concurrently
+            fetched = fetch_concurrently(self.gi.datasets.show_dataset, pending)
+            datasets = [ds for ds in fetched.values() if not isinstance(ds, Exception)]
+        else:
+            datasets = call_with_backoff(
+                self.gi.datasets.get_datasets, history_id=self.history_id,
+                update_time_min=self._datasets_since, order='update_time-dsc'
+            )
+
+        # Server timestamps avoid any dependence on the local clock
+        times = [ds['update_time'] for ds in datasets if ds.get('update_time')]
+        if times:
+            self._datasets_since = max(times + [self._datasets_since or ''])
+        return {ds['id']: ds['state'] for ds in datasets if ds['id'] in pending}
+
+    def poll(self):
+        """Refresh all pending states once; return the list of transitions"""
+        transitions = []
+        for kind, seen in (('job', self._poll_jobs()), ('dataset', self._poll_datasets())):
+            for item_id, state in seen.items():
+                old_state = self.states[kind][item_id]
+                if state != old_state:
+                    self.states[kind][item_id] = state
+                    transitions.append(Transition(kind, item_id, old_state, state))
+        return transitions
+
+    def events(self, ids=None):
+        """
+        Yield transitions until every watched item (or every id in ids) is done.
+
+        Raises TimeoutError if that takes longer than the watcher's timeout.
+        """
+        deadline = time.monotonic() + self.timeout
+        interval = self.min_interval
+
+        def waiting():
+            return [p for p in self.pending() if ids is None or p[1] in ids]
+
+        while True:
+            transitions = self.poll()
+            yield from transitions
+            if not waiting():
+                return
+
+            interval = self.min_interval if transitions else min(self.max_interval, interval * BACKOFF_FACTOR)
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise TimeoutError(f"Timed out waiting for {len(waiting())} job(s)/dataset(s)")
+            time.sleep(min(interval, remaining))
+
+    def wait(self, ids=None, verbose=True):
+        """Block until the given ids (default: all) are done; return their final states"""
+        for transition in self.events(ids):
+            if verbose:
+                print_transition(transition)
+        return {
+            item_id: state
+            for kind in self.states for item_id, state in self.states[kind].items()
+            if ids is None or item_id in ids
+        }
+
+
+def print_transition(transition):
+    old_state = transition.old_state or '-'
+    print(f"  {transition.kind} {transition.id}: {old_state} -> {transition.new_state}")
+
+
+def wait_for_datasets(gi, history_id, dataset_ids, timeout=DEFAULT_TIMEOUT, verbose=True):
+    """Convenience wrapper: watch datasets until done and return id -> final state"""
+    watcher = StateWatcher(gi, history_id, timeout=timeout)
+    watcher.watch_datasets(dataset_ids)
+    return watcher.wait(verbose=verbose)
@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+"""
+Cached Galaxy tool resolution and local validation of tool parameters.
+
+A tool is named by its versionless Tool Shed id (e.g. DESEQ2_TOOL below).
+ToolRegistry resolves it to the newest installed version and stores that
+version's input schema (show_tool io_details, trimmed to what validation
+needs) in .cache/tool_registry.json, once per Galaxy server per day.
+
+Parameter dicts are checked against the schema before submission: conditional
+and select values, booleans and numbers, repeat sizes and dataset references.
+A malformed job fails in milliseconds with the offending parameter paths
+instead of being queued and then erroring or pausing on the server. Keys the
+tool does not know are reported as warnings, since Galaxy silently ignores
+them and runs with the default instead.
+"""
+
+import json
+import os
+import tempfile
+import threading
+import time
+
+from bioblend import ConnectionError as GalaxyConnectionError
+
+from galaxy_utils.fetch import call_with_backoff
+
+DESEQ2_TOOL = "toolshed.g2.bx.psu.edu/repos/iuc/deseq2/deseq2"
+
+TOOL_CACHE_PATH = os.path.join('.cache', 'tool_registry.json')
+
+# Seconds a resolved tool version and schema stay valid
+TOOL_CACHE_TTL = 24 * 3600
+
+DATA_SOURCES = {'data': {'hda', 'hdca', 'ldda', 'dce'}, 'data_collection': {'hdca', 'dce'}}
+
+
+class InvalidToolParameters(ValueError):
+    """Tool inputs that the tool's schema rejects; errors lists every problem"""
+
+    def __init__(self, tool_id, errors):
+        self.tool_id = tool_id
+        self.errors = errors
+        super().__init__(f"Invalid parameters for {tool_id}:\n  " + "\n  ".join(errors))
+
+
+def compact_inputs(inputs):
+    """Keep only the parts of show_tool io_details inputs that validation uses"""
+    compact = []
+    for param in inputs:
+        entry = {'name': param['name'], 'type': param.get('type')}
+        for key in ('optional', 'multiple', 'min', 'max'):
+            if param.get(key) is not None:
+                entry[key] = param[key]
+        if param.get('type') == 'select' and param.get('options'):
+            entry['options'] = [str(option[1]) for option in param['options']]
+        if param.get('type') in ('select', 'boolean') and param.get('value') is not None:
+            entry['value'] = param['value']
+        if param.get('type') == 'conditional':
+            entry['test_param'] = compact_inputs([param['test_param']])[0]
+            entry['cases'] = {str(case['value']): compact_inputs(case.get('inputs', []))
+                              for case in param.get('cases', [])}
+        if param.get('type') in ('repeat', 'section'):
+            entry['inputs'] = compact_inputs(param.get('inputs', []))
+        compact.append(entry)
+    return compact
+
+
+def expand_flat_keys(params):
+    """Turn Galaxy's flat 'section|param' keys into nested dicts"""
+    nested = {}
+    for key, value in params.items():
+        if isinstance(value, dict):
+            value = expand_flat_keys(value)
+        elif isinstance(value, list):
+            value = [expand_flat_keys(item) if isinstance(item, dict) else item for item in value]
+        parts = key.split('|')
+        target = nested
+        for part in parts[:-1]:
+            target = target.setdefault(part, {})
+        if isinstance(value, dict) and isinstance(target.get(parts[-1]), dict):
+            target[parts[-1]].update(value)
+        else:
+            target[parts[-1]] = value
+    return nested
+
+
+def _check_data(param, value, path, errors):
+    items = value.get('values', [value]) if isinstance(value, dict) else value
+    if not isinstance(items, list):
+        errors.append(f"{path}: expected a dataset reference like {{'src': 'hda', 'id': ...}}, got {value!r}")
+        return
+    if len(items) > 1 and not param.get('multiple'):
+        errors.append(f"{path}: takes a single dataset, got {len(items)}")
+    allowed = DATA_SOURCES[param['type']]
+    for item in items:
+        if not isinstance(item, dict) or not item.get('id'):
+            errors.append(f"{path}: expected a dataset reference with 'src' and 'id', got {item!r}")
+        elif item.get('src') not in allowed:
+            errors.append(f"{path}: src must be one of {sorted(allowed)}, got {item.get('src')!r}")
+
+
+def _check_value(param, value, path, errors):
+    kind = param['type']
+    if kind == 'select' and param.get('options'):
+        if isinstance(value, list):
+            values = value
+            if not param.get('multiple'):
+                errors.append(f"{path}: takes a single value, got {value!r}")
+        else:
+            # Multiple selects also accept a comma-separated string
+            values = str(value).split(',') if param.get('multiple') else [value]
+        for item in values:
+            if str(item) not in param['options']:
+                errors.append(f"{path}: {item!r} is not one of {param['options']}")
+    elif kind == 'boolean':
+        if value not in (True, False) and str(value).lower() not in ('true', 'false'):
+            errors.append(f"{path}: expected true/false, got {value!r}")
+    elif kind in ('integer', 'float'):
+        try:
+            number = int(value) if kind == 'integer' else float(value)
+        except (TypeError, ValueError):
+            errors.append(f"{path}: expected {kind}, got {value!r}")
+            return
+        if param.get('min') is not None and number < param['min']:
+            errors.append(f"{path}: {number} is below the minimum {param['min']}")
+        if param.get('max') is not None and number > param['max']:
+            errors.append(f"{path}: {number} is above the maximum {param['max']}")
+    elif kind in DATA_SOURCES:
+        _check_data(param, value, path, errors)
+    elif kind in ('text', 'hidden'):
+        if not isinstance(value, (str, int, float)):
+            errors.append(f"{path}: expected text, got {value!r}")
+
+
+def default_case(param):
+    """Case a conditional takes when its test param is not given (None if the schema cannot tell)"""
+    test = param['test_param']
+    default = test.get('value')
+    if default is None and test.get('options'):
+        default = test['options'][0]
+    if default is None:
+        return None
+    default = str(default).lower() if test['type'] == 'boolean' else str(default)
+    return default if default in param['cases'] else None
+
+
+def _check_inputs(inputs, values, path, errors, warnings):
+    if not isinstance(values, dict):
+        errors.append(f"{path or 'inputs'}: expected a dict of parameters, got {values!r}")
+        return
+    known = {param['name'] for param in inputs}
+    for key in values:
+        if key not in known:
+            warnings.append(f"{path}{key}: not a parameter of this tool (Galaxy would ignore it)")
+
+    for param in inputs:
+        name = param['name']
+        param_path = f"{path}{name}"
+        if values.get(name) is None:
+            if param['type'] in DATA_SOURCES and not param.get('optional'):
+                errors.append(f"{param_path}: required dataset input is missing")
+            continue
+        value = values[name]
+
+        if param['type'] == 'conditional':
+            if not isinstance(value, dict):
+                errors.append(f"{param_path}: expected a dict, got {value!r}")
+                continue
+            test = param['test_param']
+            selected = value.get(test['name'])
+            if selected is None:
+                # Galaxy falls back to the default case; check the other keys against it
+                default = default_case(param)
+                if default is None:
+                    continue
+                warnings.append(f"{param_path}|{test['name']}: not given, Galaxy uses the default case {default!r}")
+                _check_inputs(param['cases'][default], value, f"{param_path}|", errors, warnings)
+                continue
+            case = param['cases'].get(str(selected).lower() if test['type'] == 'boolean' else str(selected))
+            if case is None:
+                errors.append(f"{param_path}|{test['name']}: {selected!r} is not one of {list(param['cases'])}")
+                continue
+            _check_inputs([test] + case, value, f"{param_path}|", errors, warnings)
+        elif param['type'] == 'section':
+            _check_inputs(param['inputs'], value, f"{param_path}|", errors, warnings)
+        elif param['type'] == 'repeat':
+            if not isinstance(value, list):
+                errors.append(f"{param_path}: expected a list of blocks, got {value!r}")
+                continue
+            if param.get('min') is not None and len(value) < param['min']:
+                errors.append(f"{param_path}: needs at least {param['min']} block(s), got {len(value)}")
+            if param.get('max') is not None and len(value) > param['max']:
+                errors.append(f"{param_path}: allows at most {param['max']} block(s), got {len(value)}")
+            for i, block in enumerate(value):
+                _check_inputs(param['inputs'], block, f"{param_path}_{i}|", errors, warnings)
+        else:
+            _check_value(param, value, param_path, errors)
+
+
+def validate_tool_inputs(schema_inputs, params):
+    """Return (errors, warnings) for params checked against a compact input schema"""
+    errors, warnings = [], []
+    _check_inputs(schema_inputs, expand_flat_keys(params), '', errors, warnings)
+    return errors, warnings
+
+
+class ToolRegistry:
+    """Newest installed version and input schema of tools on one Galaxy server"""
+
+    def __init__(self, gi, cache_path=TOOL_CACHE_PATH, ttl=TOOL_CACHE_TTL):
+        self.gi = gi
+        self.cache_path = cache_path
+        self.ttl = ttl
+        try:
+            with open(cache_path) as f:
+                self._cache = json.load(f)
+        except (OSError, ValueError):
+            self._cache = {}
+        # Tool versions differ between servers
+        self._cache.setdefault(gi.base_url, {})
+        self._lock = threading.Lock()
+
+    def _save(self):
+        cache_dir = os.path.dirname(self.cache_path) or '.'
+        os.makedirs(cache_dir, exist_ok=True)
+        # A private temporary file, so concurrent writers never share one
+        fd, tmp_path = tempfile.mkstemp(dir=cache_dir, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump(self._cache, f)
+            os.replace(tmp_path, self.cache_path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+
+    def resolve(self, tool, refresh=False):
+        """
+        Return {'id', 'name', 'version', 'inputs'} for the newest installed
+        version of tool (a versionless Tool Shed id, or a plain tool id).
+        """
+        entries = self._cache[self.gi.base_url]
+        entry = entries.get(tool)
+        if entry and not refresh and time.time() - entry['time'] < self.ttl:
+            return entry
+
+        # Galaxy resolves a versionless Tool Shed id to the newest installed
+        # version itself, so this needs no listing of the whole toolbox
+        try:
+            details = call_with_backoff(self.gi.tools.show_tool, tool.rstrip('/'), io_details=True)
+        except GalaxyConnectionError as e:
+            if e.status_code in (400, 404):
+                raise LookupError(f"Tool {tool} is not installed on {self.gi.base_url}") from e
+            raise
+        entry = {
+            'id': details['id'],
+            'name': details.get('name'),
+            'version': details.get('version'),
+            'inputs': compact_inputs(details.get('inputs', [])),
+            'time': time.time(),
+        }
+        with self._lock:
+            entries[tool] = entry
+            self._save()
+        return entry
+
+    def validate(self, tool, params):
+        """Raise InvalidToolParameters if params do not fit the tool; return the warnings"""
+        entry = self.resolve(tool)
+        errors, warnings = validate_tool_inputs(entry['inputs'], params)
+        if errors:
+            raise InvalidToolParameters(entry['id'], errors)
+        return warnings
+
+    def run_tool(self, history_id, tool, tool_inputs):
+        """Validate tool_inputs locally, then submit them to the newest version of tool"""
+        entry = self.resolve(tool)
+        for warning in self.validate(tool, tool_inputs):
+            print(f"  Warning: {warning}")
+        return self.gi.tools.run_tool(history_id=history_id, tool_id=entry['id'], tool_inputs=tool_inputs)
@@ -3,7 +3,9 @@
 Upload FASTA files to Galaxy history
 """
 
-from bioblend.galaxy import GalaxyInstance
+from batch_upload import UploadItem, upload_batch
+from galaxy_utils.instrumentation import galaxy_instance
+from history_resolver import find_history
 
 # Galaxy connection
 GALAXY_URL = "https://usegalaxy.org"
@@ -30,43 +32,28 @@ def main():
     print("="*80)
 
     # Connect to Galaxy
-    gi = GalaxyInstance(url=GALAXY_URL, key=API_KEY)
+    gi = galaxy_instance(GALAXY_URL, API_KEY)
 
     # Get history
-    histories = gi.histories.get_histories(name=HISTORY_NAME)
-    if not histories:
-        print(f"Error: History '{HISTORY_NAME}' not found")
+    resolver, history_id = find_history(gi, HISTORY_NAME)
+    if not history_id:
         return
 
-    history_id = histories[0]['id']
-    print(f"\nFound history: {HISTORY_NAME} (ID: {history_id})")
-
-    # Upload each file
+    # Upload all files in one fetch request
     print(f"\nUploading {len(files_to_upload)} files...")
+    items = [
+        UploadItem(name=name, file_type=file_type, path=file_path)
+        for file_path, name, file_type in files_to_upload
+    ]
     uploaded = []
-
-    for file_path, name, file_type in files_to_upload:
-        print(f"\n  Uploading: {name}...")
-        print(f"    File: {file_path}")
-
-        try:
-            result = gi.tools.upload_file(
-                path=file_path,
-                history_id=history_id,
-                file_name=name,
-                file_type=file_type
-            )
-
-            # Get dataset info
-            if result and 'outputs' in result:
-                dataset_id = result['outputs'][0]['id']
-                print(f"    ✓ Uploaded as dataset #{result['outputs'][0]['hid']}")
-                uploaded.append((name, dataset_id))
-            else:
-                print(f"    ✗ Upload failed")
-
-        except Exception as e:
-            print(f"    ✗ Error: {e}")
+    try:
+        datasets, jobs = upload_batch(gi, history_id, items)
+        for item in items:
+            dataset = datasets[item.name]
+            print(f"  ✓ {item.name} ({item.path}) -> dataset #{dataset.get('hid')}")
+            uploaded.append((item.name, dataset['id']))
+    except Exception as e:
+        print(f"  ✗ Error: {e}")
 
     print("\n" + "="*80)
     print("UPLOAD SUMMARY")
@@ -76,7 +63,7 @@ def main():
 
     print("\nUploaded datasets:")
     for name, dataset_id in uploaded:
-        print(f"  - {name}")
+        print(f"  - {name} ({dataset_id})")
 
 if __name__ == "__main__":
     main()
@@ -4,8 +4,9 @@ Script to reorganize Galaxy collection #260 into condition-specific collections
 for differential expression analysis with DESeq2
 """
 
-import requests
-import json
+from galaxy_utils.fetch import fetch_concurrently
+from galaxy_utils.sample_groups import ACCESSION_PATTERN, GroupIndex, print_match_report
+from galaxy_utils.session import galaxy_session
 
 # Galaxy connection info
 API_KEY = "YOUR_GALAXY_API_KEY"
@@ -13,7 +14,8 @@ GALAXY_URL = "https://usegalaxy.org"
 HISTORY_ID = "bbd44e69cb8906b5713a37cc4e6846ea"
 COLLECTION_ID = "50490a95897034a8"
 
-headers = {"x-api-key": API_KEY}
+# One pooled keep-alive session for every request in this script
+session = galaxy_session(API_KEY)
 
 # Sample to condition mapping
 SAMPLE_MAPPING = {
@@ -35,7 +37,8 @@ CONDITIONS = {
 def get_collection_elements():
     """Get all elements from the original collection"""
     url = f"{GALAXY_URL}/api/dataset_collections/{COLLECTION_ID}"
-    response = requests.get(url, headers=headers)
+    response = session.get(url)
+    response.raise_for_status()
     collection_info = response.json()
     return collection_info.get('elements', [])
 
@@ -69,7 +72,7 @@ def create_collection(name, elements, collection_type="list"):
         "hide_source_items": False
     }
 
-    response = requests.post(url, headers=headers, json=payload)
+    response = session.post(url, json=payload)
 
     if response.status_code in [200, 201]:
         print(f"✓ Created collection: {name}")
@@ -90,42 +93,45 @@ def main():
     print("\n1. Fetching original collection elements...")
     elements = get_collection_elements()
 
-    # Create mapping of SRR to element details
-    element_map = {}
-    for element in elements:
-        details = get_element_details(element)
-        element_map[details['identifier']] = details
-        print(f"   Found: {details['identifier']} → {SAMPLE_MAPPING[details['identifier']]['name']}")
+    # Match elements to conditions by exact run accession
+    match = GroupIndex(CONDITIONS).match(elements)
+    print_match_report(match)
 
     # Create condition-specific collections
     print("\n2. Creating condition-specific collections...")
-    created_collections = {}
-
-    for condition_name, srr_list in CONDITIONS.items():
-        print(f"\n   Creating: {condition_name}")
-
-        # Gather elements for this condition
-        condition_elements = []
-        for srr in srr_list:
-            if srr in element_map:
-                element = element_map[srr]
-                sample_info = SAMPLE_MAPPING[srr]
-                # Rename with meaningful names
-                element['identifier'] = sample_info['name']
-                condition_elements.append(element)
-                print(f"     - {srr} ({sample_info['name']}, replicate {sample_info['replicate']})")
-
-        # Create the collection
-        result = create_collection(condition_name, condition_elements)
-        if result:
-            created_collections[condition_name] = result
+    condition_elements = {}
+    for condition_name, matched in match.groups.items():
+        print(f"\n   {condition_name}")
+        condition_elements[condition_name] = []
+        for element in matched:
+            details = get_element_details(element)
+            # Elements matched through a tag may carry no accession in their identifier
+            found = ACCESSION_PATTERN.search(details['identifier'])
+            if found is None or found.group() not in SAMPLE_MAPPING:
+                print(f"     Warning: no known run accession in '{details['identifier']}', skipping it")
+                continue
+            srr = found.group()
+            sample_info = SAMPLE_MAPPING[srr]
+            print(f"     - {srr} ({sample_info['name']}, replicate {sample_info['replicate']})")
+            # Rename with meaningful names
+            details['identifier'] = sample_info['name']
+            condition_elements[condition_name].append(details)
+
+    # All conditions in one batch over the shared session; no retries, creation is not idempotent
+    results = fetch_concurrently(
+        lambda condition_name: create_collection(condition_name, condition_elements[condition_name]),
+        [name for name, matched in condition_elements.items() if matched],
+        max_retries=0
+    )
+    created_collections = {name: result for name, result in results.items()
+                           if result and not isinstance(result, Exception)}
 
     # Summary
     print("\n" + "=" * 60)
     print("Summary")
     print("=" * 60)
     print(f"Original collection: Counts Table (#{COLLECTION_ID})")
-    print(f"Total samples: {len(element_map)}")
+    print(f"Total samples: {len(elements)}")
     print(f"\nNew collections created: {len(created_collections)}")
     for name, info in created_collections.items():
         print(f"  - {name} (HID: {info.get('hid', 'N/A')})")